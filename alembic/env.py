@@ -12,7 +12,19 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 from backend.core.config import settings
-from backend.models import match, message, pair, pet, photo, user  # noqa: F401
+from backend.models import (  # noqa: F401
+    like_edge,
+    match,
+    match_stats,
+    media_blob,
+    message,
+    message_archive,
+    pair,
+    pair_outbox,
+    pet,
+    photo,
+    user,
+)
 
 config = context.config
 
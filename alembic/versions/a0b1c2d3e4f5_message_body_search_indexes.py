@@ -0,0 +1,48 @@
+"""message body full-text search indexes
+
+Revision ID: a0b1c2d3e4f5
+Revises: f9a0b1c2d3e4
+Create Date: 2026-10-19 17:00:00
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a0b1c2d3e4f5"
+down_revision: Union[str, Sequence[str], None] = "f9a0b1c2d3e4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_INDEXES = (
+    ("ix_message_body_search", "message"),
+    ("ix_message_archive_body_search", "message_archive"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite keeps its FTS5 table outside Alembic; init_db creates and fills it.
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for name, table in SEARCH_INDEXES:
+        op.create_index(
+            name,
+            table,
+            [sa.text("to_tsvector('simple'::regconfig, body)")],
+            unique=False,
+            postgresql_using="gin",
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for name, table in SEARCH_INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,48 @@
+"""add user_match_stats table
+
+Revision ID: a4b5c6d7e8f9
+Revises: f3a4b5c6d7e8
+Create Date: 2026-10-19 12:00:00
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a4b5c6d7e8f9"
+down_revision: Union[str, Sequence[str], None] = "f3a4b5c6d7e8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "user_match_stats",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("undecided", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("liked", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("passed", sa.Integer(), nullable=False, server_default="0"),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.execute("""
+        INSERT INTO user_match_stats (user_id, undecided, liked, passed)
+        SELECT
+            owner_user_id,
+            SUM(CASE WHEN decision = 'undecided' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN decision = 'liked' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN decision = 'passed' THEN 1 ELSE 0 END)
+        FROM match
+        GROUP BY owner_user_id
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("user_match_stats")
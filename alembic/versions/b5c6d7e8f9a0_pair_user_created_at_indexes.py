@@ -0,0 +1,44 @@
+"""pair (user, created_at) composite indexes
+
+Revision ID: b5c6d7e8f9a0
+Revises: a4b5c6d7e8f9
+Create Date: 2026-10-19 13:00:00
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b5c6d7e8f9a0"
+down_revision: Union[str, Sequence[str], None] = "a4b5c6d7e8f9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_pair_user_low_id_created_at",
+        "pair",
+        ["user_low_id", "created_at"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_pair_user_high_id_created_at",
+        "pair",
+        ["user_high_id", "created_at"],
+        unique=False,
+    )
+    op.drop_index("ix_pair_user_low_id", table_name="pair")
+    op.drop_index("ix_pair_user_high_id", table_name="pair")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("ix_pair_user_high_id", "pair", ["user_high_id"], unique=False)
+    op.create_index("ix_pair_user_low_id", "pair", ["user_low_id"], unique=False)
+    op.drop_index("ix_pair_user_high_id_created_at", table_name="pair")
+    op.drop_index("ix_pair_user_low_id_created_at", table_name="pair")
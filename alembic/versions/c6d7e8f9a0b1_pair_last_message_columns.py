@@ -0,0 +1,46 @@
+"""pair last message columns
+
+Revision ID: c6d7e8f9a0b1
+Revises: b5c6d7e8f9a0
+Create Date: 2026-10-19 14:00:00
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c6d7e8f9a0b1"
+down_revision: Union[str, Sequence[str], None] = "b5c6d7e8f9a0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("pair", sa.Column("last_message_id", sa.Integer(), nullable=True))
+    op.add_column("pair", sa.Column("last_message_at", sa.DateTime(), nullable=True))
+    op.execute("""
+        UPDATE pair
+        SET last_message_id = (
+                SELECT MAX(m.id) FROM message AS m WHERE m.pair_id = pair.id
+            )
+        """)
+    op.execute("""
+        UPDATE pair
+        SET last_message_at = (
+                SELECT m.created_at FROM message AS m
+                WHERE m.id = pair.last_message_id
+            )
+        WHERE last_message_id IS NOT NULL
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("pair", "last_message_at")
+    op.drop_column("pair", "last_message_id")
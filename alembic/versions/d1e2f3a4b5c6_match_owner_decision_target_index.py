@@ -0,0 +1,33 @@
+"""match owner/decision/target composite index
+
+Revision ID: d1e2f3a4b5c6
+Revises: c8c6c2f3a890
+Create Date: 2026-10-19 09:00:00
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d1e2f3a4b5c6"
+down_revision: Union[str, Sequence[str], None] = "c8c6c2f3a890"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_match_owner_decision_target",
+        "match",
+        ["owner_user_id", "decision", "target_pet_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_match_owner_decision_target", table_name="match")
@@ -0,0 +1,60 @@
+"""content-addressed media blobs
+
+Revision ID: d3e4f5a6b7c8
+Revises: c2d3e4f5a6b7
+Create Date: 2026-10-19 20:00:00
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+import sqlmodel
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d3e4f5a6b7c8"
+down_revision: Union[str, Sequence[str], None] = "c2d3e4f5a6b7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "media_blob",
+        sa.Column(
+            "sha256", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False
+        ),
+        sa.Column("filename", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("mime_type", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("sha256"),
+        sa.UniqueConstraint("filename"),
+    )
+    # Photos with identical content now share one filename.
+    op.drop_constraint("photo_filename_key", "photo", type_="unique")
+    op.create_index(op.f("ix_photo_filename"), "photo", ["filename"], unique=False)
+    op.create_index(op.f("ix_photo_sha256"), "photo", ["sha256"], unique=False)
+    # One blob per content already uploaded, referenced by every photo of it.
+    op.execute("""
+        INSERT INTO media_blob
+            (sha256, filename, mime_type, size_bytes, ref_count, created_at)
+        SELECT sha256, min(filename), min(mime_type), min(size_bytes),
+               count(*), min(created_at)
+        FROM photo
+        WHERE sha256 IS NOT NULL
+        GROUP BY sha256
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_photo_sha256"), table_name="photo")
+    op.drop_index(op.f("ix_photo_filename"), table_name="photo")
+    op.create_unique_constraint("photo_filename_key", "photo", ["filename"])
+    op.drop_table("media_blob")
@@ -0,0 +1,35 @@
+"""message (pair_id, created_at, id) index
+
+Revision ID: d7e8f9a0b1c2
+Revises: c6d7e8f9a0b1
+Create Date: 2026-10-19 15:00:00
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d7e8f9a0b1c2"
+down_revision: Union[str, Sequence[str], None] = "c6d7e8f9a0b1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_message_pair_id_created_at_id",
+        "message",
+        ["pair_id", "created_at", "id"],
+        unique=False,
+    )
+    op.drop_index("ix_message_pair_id", table_name="message")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("ix_message_pair_id", "message", ["pair_id"], unique=False)
+    op.drop_index("ix_message_pair_id_created_at_id", table_name="message")
@@ -0,0 +1,46 @@
+"""add like_edge table
+
+Revision ID: e2f3a4b5c6d7
+Revises: d1e2f3a4b5c6
+Create Date: 2026-10-19 10:00:00
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2f3a4b5c6d7"
+down_revision: Union[str, Sequence[str], None] = "d1e2f3a4b5c6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "like_edge",
+        sa.Column("liker_user_id", sa.Integer(), nullable=False),
+        sa.Column("target_owner_id", sa.Integer(), nullable=False),
+        sa.Column("like_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["liker_user_id"], ["user.id"]),
+        sa.ForeignKeyConstraint(["target_owner_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("liker_user_id", "target_owner_id"),
+    )
+    op.execute("""
+        INSERT INTO like_edge (liker_user_id, target_owner_id, like_count)
+        SELECT m.owner_user_id, p.owner_id, COUNT(*)
+        FROM match AS m
+        JOIN pet AS p ON p.id = m.target_pet_id
+        WHERE m.decision = 'liked' AND m.owner_user_id <> p.owner_id
+        GROUP BY m.owner_user_id, p.owner_id
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("like_edge")
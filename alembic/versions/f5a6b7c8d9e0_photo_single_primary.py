@@ -0,0 +1,48 @@
+"""at most one primary photo per pet
+
+Revision ID: f5a6b7c8d9e0
+Revises: e4f5a6b7c8d9
+Create Date: 2026-10-19 22:00:00
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f5a6b7c8d9e0"
+down_revision: Union[str, Sequence[str], None] = "e4f5a6b7c8d9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep only the newest primary of any pet that raced into having several.
+    op.execute(sa.text("""
+            UPDATE photo AS p SET is_primary = false
+            WHERE p.is_primary AND EXISTS (
+                SELECT 1 FROM photo AS q
+                WHERE q.pet_id = p.pet_id AND q.is_primary AND q.id > p.id
+            )
+            """))
+    # The partial unique index (pet_id) WHERE is_primary, as an exclusion
+    # constraint so primary switches can defer the check to commit.
+    op.create_exclude_constraint(
+        "ux_photo_pet_id_primary",
+        "photo",
+        ("pet_id", "="),
+        using="btree",
+        where="is_primary",
+        deferrable=True,
+        initially="IMMEDIATE",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("ux_photo_pet_id_primary", "photo")
@@ -0,0 +1,64 @@
+"""pair read receipts and unread counters
+
+Revision ID: f9a0b1c2d3e4
+Revises: e8f9a0b1c2d3
+Create Date: 2026-10-19 16:00:00
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f9a0b1c2d3e4"
+down_revision: Union[str, Sequence[str], None] = "e8f9a0b1c2d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for side in ("low", "high"):
+        op.add_column(
+            "pair",
+            sa.Column(f"user_{side}_last_read_message_id", sa.Integer(), nullable=True),
+        )
+        op.add_column(
+            "pair",
+            sa.Column(
+                f"user_{side}_unread_count",
+                sa.Integer(),
+                nullable=False,
+                server_default="0",
+            ),
+        )
+        # Seed from the old rule: a participant has read everything up to
+        # their own latest message.
+        op.execute(f"""
+            UPDATE pair
+            SET user_{side}_last_read_message_id = (
+                    SELECT MAX(m.id) FROM message AS m
+                    WHERE m.pair_id = pair.id
+                      AND m.sender_user_id = pair.user_{side}_id
+                )
+            """)
+        op.execute(f"""
+            UPDATE pair
+            SET user_{side}_unread_count = (
+                    SELECT COUNT(m.id) FROM message AS m
+                    WHERE m.pair_id = pair.id
+                      AND m.sender_user_id <> pair.user_{side}_id
+                      AND m.id > COALESCE(pair.user_{side}_last_read_message_id, 0)
+                )
+            """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for side in ("high", "low"):
+        op.drop_column("pair", f"user_{side}_unread_count")
+        op.drop_column("pair", f"user_{side}_last_read_message_id")
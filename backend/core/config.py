@@ -41,6 +41,60 @@ class Settings(BaseSettings):
         "image/png",
         "image/webp",
     )
+    # Pair creation via the transactional outbox (disabled: detect inline)
+    PAIR_OUTBOX_ENABLED: bool = False
+    PAIR_OUTBOX_WORKER: bool = True
+    PAIR_OUTBOX_USE_LEASES: bool = False
+    PAIR_OUTBOX_BATCH_SIZE: int = 100
+    PAIR_OUTBOX_POLL_SECONDS: float = 0.5
+    PAIR_OUTBOX_LEASE_SECONDS: int = 30
+    # Processed outbox rows are pruned once older than this
+    PAIR_OUTBOX_RETENTION_SECONDS: int = 7 * 24 * 3600
+    PAIR_OUTBOX_PRUNE_INTERVAL_SECONDS: float = 300.0
+    # Realtime fan-out: "memory" (single process) or "redis"
+    REALTIME_BROKER: str = "memory"
+    REALTIME_REDIS_URL: str = "redis://localhost:6379/0"
+    # Group commit for message inserts (disabled: one commit per message)
+    MESSAGE_BATCH_ENABLED: bool = False
+    MESSAGE_BATCH_MAX_SIZE: int = 64
+    MESSAGE_BATCH_MAX_DELAY_MS: float = 5.0
+    MESSAGE_BATCH_SQLITE_SYNCHRONOUS: str | None = None
+    PAIR_MEMBER_CACHE_SIZE: int = 10_000
+    # Cold message archival (scripts/archive_messages.py)
+    MESSAGE_ARCHIVE_AFTER_DAYS: int = 90
+    MESSAGE_ARCHIVE_BATCH_SIZE: int = 1_000
+    # Resized copies rendered after upload on a process pool ("webp" or "jpeg")
+    PHOTO_DERIVATIVE_SIZES: tuple[int, ...] = (200, 800)
+    PHOTO_DERIVATIVE_FORMAT: str = "webp"
+    PHOTO_DERIVATIVE_QUALITY: int = 80
+    PHOTO_DERIVATIVE_WORKERS: int = 2
+    # Checked from the image header while the upload streams in
+    PHOTO_MAX_PIXELS: int = 40_000_000
+    PHOTO_MAX_SIDE: int = 12_000
+    PHOTO_SNIFF_MAX_BYTES: int = 256 * 1024
+    # Batch uploads: files per request and parallel moves into storage
+    PHOTO_MAX_FILES_PER_REQUEST: int = 10
+    PHOTO_UPLOAD_CONCURRENCY: int = 4
+    # Media storage: "local" (MEDIA_DIR) or "s3" (any S3-compatible endpoint)
+    MEDIA_STORAGE: str = "local"
+    MEDIA_S3_BUCKET: str = "petmatch-media"
+    MEDIA_S3_ENDPOINT_URL: str | None = None
+    MEDIA_S3_REGION: str = "us-east-1"
+    MEDIA_S3_ACCESS_KEY_ID: str | None = None
+    MEDIA_S3_SECRET_ACCESS_KEY: str | None = None
+    MEDIA_S3_PUBLIC_BASE_URL: str | None = None
+    MEDIA_UPLOAD_URL_TTL_SECONDS: int = 900
+    # Local media serving: "" sends files from the app, "x-accel-redirect"
+    # (nginx) or "x-sendfile" (Apache/lighttpd) hands them to the proxy
+    MEDIA_OFFLOAD: str = ""
+    MEDIA_OFFLOAD_PREFIX: str = "/protected-media"
+    MEDIA_CACHE_MAX_AGE_SECONDS: int = 3600
+    # Flat -> ab/cd/<name> layout migration (scripts/shard_media.py)
+    MEDIA_SHARD_BATCH_SIZE: int = 500
+    # Orphan file / dangling row sweep (scripts/reconcile_media.py); files
+    # younger than the grace period may belong to an upload in flight
+    MEDIA_RECONCILE_BATCH_SIZE: int = 1_000
+    MEDIA_RECONCILE_GRACE_SECONDS: int = 3600
 
     model_config = SettingsConfigDict(
         env_file=ENV_FILE,
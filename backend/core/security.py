@@ -42,6 +42,12 @@ def create_access_token(sub: str, *, minutes: int | None = None) -> str:
     return token
 
 
+def create_scoped_token(claims: dict[str, Any], *, seconds: int) -> str:
+    """Short-lived signed token carrying ``claims`` (e.g. an upload grant)."""
+    payload = {**claims, "exp": datetime.utcnow() + timedelta(seconds=seconds)}
+    return jwt.encode(payload, settings.jwt_secret, algorithm=_ALGO)
+
+
 def decode_token(token: str) -> dict[str, Any]:
     return cast(
         dict[str, Any],
@@ -5,17 +5,32 @@ from pathlib import Path
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
-from fastapi.staticfiles import StaticFiles
 
+import backend.core.db as db_module
 from backend.core.config import settings
-from backend.core.db import init_db
-from backend.routers import auth, matches, messages, pairs, pets, photos
+from backend.routers import auth, matches, messages, pairs, pets, photos, realtime
+from backend.services.media_files import MediaFiles
+from backend.services.message_search_service import ensure_message_search
+from backend.services.message_service import close_message_writer
+from backend.services.pair_outbox_service import PairOutboxWorker
+from backend.services.photo_derivatives import close_derivative_pool
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
-    init_db()
-    yield
+    db_module.init_db()
+    ensure_message_search(db_module.engine)
+    outbox_worker: PairOutboxWorker | None = None
+    if settings.PAIR_OUTBOX_ENABLED and settings.PAIR_OUTBOX_WORKER:
+        outbox_worker = PairOutboxWorker()
+        outbox_worker.start()
+    try:
+        yield
+    finally:
+        if outbox_worker is not None:
+            await outbox_worker.stop()
+        close_message_writer()
+        close_derivative_pool()
 
 
 app = FastAPI(title="PetMatch API", lifespan=lifespan)
@@ -33,7 +48,7 @@ media_path = Path(settings.MEDIA_DIR)
 media_path.mkdir(parents=True, exist_ok=True)
 app.mount(
     settings.MEDIA_BASE_URL,
-    StaticFiles(directory=str(media_path)),
+    MediaFiles(directory=media_path),
     name="media",
 )
 
@@ -55,3 +70,4 @@ app.include_router(matches.router, prefix=settings.api_v1_str)
 app.include_router(pairs.router, prefix=settings.api_v1_str)
 app.include_router(messages.router, prefix=settings.api_v1_str)
 app.include_router(photos.router, prefix=settings.api_v1_str)
+app.include_router(realtime.router, prefix=settings.api_v1_str)
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from sqlmodel import Field, SQLModel
+
+
+class LikeEdge(SQLModel, table=True):
+    """Number of pets of ``target_owner_id`` currently liked by ``liker_user_id``."""
+
+    __tablename__ = "like_edge"
+
+    liker_user_id: int = Field(
+        foreign_key="user.id",
+        primary_key=True,
+        nullable=False,
+    )
+    target_owner_id: int = Field(
+        foreign_key="user.id",
+        primary_key=True,
+        nullable=False,
+    )
+    like_count: int = Field(default=0, nullable=False)
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import Column, UniqueConstraint
+from sqlalchemy import Column, Index, UniqueConstraint
 from sqlalchemy.types import Enum as SAEnum
 from sqlmodel import Field, SQLModel
 
@@ -41,6 +41,12 @@ class Match(SQLModel, table=True):
             "target_pet_id",
             name="uq_match_owner_target",
         ),
+        Index(
+            "ix_match_owner_decision_target",
+            "owner_user_id",
+            "decision",
+            "target_pet_id",
+        ),
     )
 
 
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from sqlmodel import Field, SQLModel
+
+
+class UserMatchStats(SQLModel, table=True):
+    """Per-user match counts by decision, kept in step with the match table."""
+
+    __tablename__ = "user_match_stats"
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True, nullable=False)
+    undecided: int = Field(default=0, nullable=False)
+    liked: int = Field(default=0, nullable=False)
+    passed: int = Field(default=0, nullable=False)
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class MediaBlob(SQLModel, table=True):
+    """One stored file per distinct content, shared by every photo using it."""
+
+    __tablename__ = "media_blob"
+
+    sha256: str = Field(primary_key=True, max_length=64)
+    filename: str = Field(nullable=False, unique=True)
+    mime_type: str = Field(nullable=False)
+    size_bytes: int = Field(nullable=False)
+    ref_count: int = Field(default=0, nullable=False)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -2,15 +2,25 @@ from __future__ import annotations
 
 from datetime import datetime
 
+from sqlalchemy import Index, text
 from sqlmodel import Field, SQLModel
 
 
 class Message(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_message_pair_id_created_at_id", "pair_id", "created_at", "id"),
+        # Full-text search on Postgres; SQLite uses the message_fts table instead.
+        Index(
+            "ix_message_body_search",
+            text("to_tsvector('simple'::regconfig, body)"),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     pair_id: int = Field(
         foreign_key="pair.id",
         nullable=False,
-        index=True,
     )
     sender_user_id: int = Field(
         foreign_key="user.id",
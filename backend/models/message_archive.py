@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import Index, text
+from sqlmodel import Field, SQLModel
+
+
+class MessageArchive(SQLModel, table=True):
+    """Cold messages moved out of ``message``; rows keep their original ids."""
+
+    __tablename__ = "message_archive"
+    __table_args__ = (
+        Index(
+            "ix_message_archive_pair_id_created_at_id",
+            "pair_id",
+            "created_at",
+            "id",
+        ),
+        Index(
+            "ix_message_archive_body_search",
+            text("to_tsvector('simple'::regconfig, body)"),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    id: int = Field(primary_key=True)
+    pair_id: int = Field(foreign_key="pair.id", nullable=False)
+    sender_user_id: int = Field(foreign_key="user.id", nullable=False)
+    body: str = Field(nullable=False)
+    created_at: datetime = Field(nullable=False)
+    archived_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -2,7 +2,7 @@
 
 from datetime import datetime
 
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import Field, SQLModel
 
 
@@ -10,15 +10,46 @@ class Pair(SQLModel, table=True):
     __tablename__ = "pair"
     __table_args__ = (
         UniqueConstraint("user_low_id", "user_high_id", name="uq_pair_users"),
+        Index("ix_pair_user_low_id_created_at", "user_low_id", "created_at"),
+        Index("ix_pair_user_high_id_created_at", "user_high_id", "created_at"),
     )
 
     id: int | None = Field(default=None, primary_key=True)
-    user_low_id: int = Field(foreign_key="user.id", nullable=False, index=True)
-    user_high_id: int = Field(foreign_key="user.id", nullable=False, index=True)
+    user_low_id: int = Field(foreign_key="user.id", nullable=False)
+    user_high_id: int = Field(foreign_key="user.id", nullable=False)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    last_message_id: int | None = Field(default=None)
+    last_message_at: datetime | None = Field(default=None)
+    # Read receipts and unread badges, one pair of columns per participant.
+    user_low_last_read_message_id: int | None = Field(default=None)
+    user_high_last_read_message_id: int | None = Field(default=None)
+    user_low_unread_count: int = Field(default=0, nullable=False)
+    user_high_unread_count: int = Field(default=0, nullable=False)
 
 
 class PairOut(SQLModel):
     id: int
     other_user_id: int
     created_at: datetime
+
+
+class InboxItemOut(PairOut):
+    last_message_id: int | None = None
+    last_message_body: str | None = None
+    last_message_at: datetime | None = None
+    last_read_message_id: int | None = None
+    unread_count: int = 0
+
+
+class PairReadIn(SQLModel):
+    message_id: int | None = None
+
+
+class PairReadOut(SQLModel):
+    pair_id: int
+    last_read_message_id: int | None = None
+    unread_count: int = 0
+
+
+class UnreadCountOut(SQLModel):
+    unread_count: int
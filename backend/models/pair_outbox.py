@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class PairOutbox(SQLModel, table=True):
+    """A like waiting for mutual-like detection by the outbox worker."""
+
+    __tablename__ = "pair_outbox"
+
+    id: int | None = Field(default=None, primary_key=True)
+    liker_user_id: int = Field(foreign_key="user.id", nullable=False)
+    target_owner_id: int = Field(foreign_key="user.id", nullable=False)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    processed_at: datetime | None = Field(default=None, index=True)
+    pair_id: int | None = Field(default=None, foreign_key="pair.id")
+    lease_owner: str | None = Field(default=None)
+    lease_expires_at: datetime | None = Field(default=None)
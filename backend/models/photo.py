@@ -2,14 +2,34 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import Column, ForeignKey, Index, Integer, desc
+from sqlalchemy import JSON, Column, ForeignKey, Index, Integer, desc, text
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
 from sqlmodel import Field, SQLModel
 
+PRIMARY_PHOTO_CONSTRAINT = "ux_photo_pet_id_primary"
+
 
 class Photo(SQLModel, table=True):
     __tablename__ = "photo"
     __table_args__ = (
         Index("ix_photo_pet_id_created_at_desc", "pet_id", desc("created_at")),
+        # At most one primary photo per pet. On Postgres this is the partial
+        # unique index as a deferrable exclusion constraint, so a primary
+        # switch can flip both rows in one UPDATE.
+        ExcludeConstraint(
+            ("pet_id", "="),
+            name=PRIMARY_PHOTO_CONSTRAINT,
+            using="btree",
+            where=text("is_primary"),
+            deferrable=True,
+            initially="IMMEDIATE",
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            PRIMARY_PHOTO_CONSTRAINT,
+            "pet_id",
+            unique=True,
+            sqlite_where=text("is_primary"),
+        ).ddl_if(dialect="sqlite"),
     )
 
     id: int | None = Field(default=None, primary_key=True)
@@ -21,9 +41,16 @@ class Photo(SQLModel, table=True):
             index=True,
         )
     )
-    filename: str = Field(nullable=False, unique=True)
+    filename: str = Field(nullable=False, index=True)
     mime_type: str = Field(nullable=False)
     size_bytes: int = Field(nullable=False)
+    sha256: str | None = Field(default=None, max_length=64, index=True)
     url: str = Field(nullable=False)
+    width: int | None = Field(default=None)
+    height: int | None = Field(default=None)
+    # Size label -> filename of the resized copies, filled in after upload.
+    derivatives: dict[str, str] | None = Field(
+        default=None, sa_column=Column(JSON(none_as_null=True))
+    )
     is_primary: bool = Field(default=False, nullable=False)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
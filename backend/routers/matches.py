@@ -1,18 +1,20 @@
 from __future__ import annotations
 
-from typing import Annotated
+from typing import Annotated, cast
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlmodel import Session, SQLModel
 
 from backend.core.db import get_session
 from backend.models.match import MatchDecision, MatchOut
+from backend.models.pair import PairOut
 from backend.models.pet import Gender, PetOut
 from backend.models.user import User
 from backend.routers.pets import get_current_user
 from backend.services.match_service import (
     count_by_decision,
     decide_match,
+    decide_matches_batch,
     delete_match,
     generate_matches,
     list_matches,
@@ -23,6 +25,8 @@ router = APIRouter(prefix="/matches", tags=["matches"])
 SessionDep = Annotated[Session, Depends(get_session)]
 CurrentUserDep = Annotated[User, Depends(get_current_user)]
 
+MAX_BATCH_DECISIONS = 100
+
 
 class GenerateRequest(SQLModel):
     species: str | None = None
@@ -113,6 +117,81 @@ def set_decision(
     return MatchOut.model_validate(match, from_attributes=True)
 
 
+class DecisionBatchItem(SQLModel):
+    target_pet_id: int
+    decision: MatchDecision
+
+
+class DecisionBatchRequest(SQLModel):
+    decisions: list[DecisionBatchItem]
+
+
+class DecisionBatchResult(SQLModel):
+    target_pet_id: int
+    decision: MatchDecision
+    status: str
+    match: MatchOut | None = None
+
+
+class DecisionBatchResponse(SQLModel):
+    results: list[DecisionBatchResult]
+    pairs: list[PairOut]
+
+
+@router.post("/decisions", response_model=DecisionBatchResponse)
+def set_decisions(
+    payload: DecisionBatchRequest,
+    session: SessionDep,
+    current: CurrentUserDep,
+) -> DecisionBatchResponse:
+    """Apply queued decisions in order within a single transaction."""
+    if current.id is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="authenticated user missing identifier",
+        )
+
+    if not 1 <= len(payload.decisions) <= MAX_BATCH_DECISIONS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"decisions must contain between 1 and {MAX_BATCH_DECISIONS} items",
+        )
+
+    results, new_pairs = decide_matches_batch(
+        owner_user_id=current.id,
+        decisions=[(item.target_pet_id, item.decision) for item in payload.decisions],
+        session=session,
+    )
+    user_id = current.id
+    return DecisionBatchResponse(
+        results=[
+            DecisionBatchResult(
+                target_pet_id=cast(int, item["target_pet_id"]),
+                decision=cast(MatchDecision, item["decision"]),
+                status=cast(str, item["status"]),
+                match=(
+                    MatchOut.model_validate(item["match"], from_attributes=True)
+                    if item["match"] is not None
+                    else None
+                ),
+            )
+            for item in results
+        ],
+        pairs=[
+            PairOut(
+                id=cast(int, pair.id),
+                other_user_id=(
+                    pair.user_high_id
+                    if pair.user_low_id == user_id
+                    else pair.user_low_id
+                ),
+                created_at=pair.created_at,
+            )
+            for pair in new_pairs
+        ],
+    )
+
+
 @router.get("", response_model=list[MatchOut])
 def list_my_matches(
     current: CurrentUserDep,
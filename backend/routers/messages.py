@@ -3,19 +3,24 @@ from __future__ import annotations
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, SQLModel
 
 from backend.core.db import get_session
 from backend.models.message import MessageOut
 from backend.models.user import User
 from backend.routers.pets import get_current_user
+from backend.services.message_search_service import search_messages
 from backend.services.message_service import list_messages, send_message
+from backend.services.realtime_service import get_broker, wait_for_pair_message
 
 router = APIRouter(prefix="/messages", tags=["messages"])
 
 SessionDep = Annotated[Session, Depends(get_session)]
 CurrentUserDep = Annotated[User, Depends(get_current_user)]
 
+MAX_WAIT_SECONDS = 60
+
 
 class MessageCreate(SQLModel):
     pair_id: int
@@ -43,29 +48,84 @@ def create_message(
     return MessageOut.model_validate(message, from_attributes=True)
 
 
+@router.get("/search", response_model=list[MessageOut])
+def search_my_messages(
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    current: CurrentUserDep,
+    session: SessionDep,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    offset: Annotated[int, Query(ge=0)] = 0,
+) -> list[MessageOut]:
+    """Full-text search over the user's conversations, best matches first."""
+    if current.id is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="authenticated user missing identifier",
+        )
+
+    messages = search_messages(session, current.id, q, limit=limit, offset=offset)
+    return [
+        MessageOut.model_validate(message, from_attributes=True) for message in messages
+    ]
+
+
 @router.get("", response_model=list[MessageOut])
-def list_pair_messages(
+async def list_pair_messages(
     pair_id: Annotated[int, Query()],
     current: CurrentUserDep,
     session: SessionDep,
     response: Response,
     limit: Annotated[int, Query(ge=1, le=100)] = 50,
     offset: Annotated[int, Query(ge=0)] = 0,
+    after_id: Annotated[int | None, Query(ge=0)] = None,
+    before_id: Annotated[int | None, Query(ge=1)] = None,
+    newest_first: Annotated[bool, Query()] = False,
+    wait: Annotated[int, Query(ge=0, le=MAX_WAIT_SECONDS)] = 0,
 ) -> list[MessageOut]:
+    """List messages by offset or by before_id/after_id cursor.
+
+    With after_id and wait, long-poll until a newer message arrives.
+    """
+    if after_id is not None and before_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="use either after_id or before_id",
+        )
     if current.id is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="authenticated user missing identifier",
         )
+    user_id = current.id
 
-    total_count, messages = list_messages(
-        pair_id=pair_id,
-        requester_user_id=current.id,
-        limit=limit,
-        offset=offset,
-        session=session,
-    )
-    response.headers["X-Total-Count"] = str(total_count)
-    return [
-        MessageOut.model_validate(message, from_attributes=True) for message in messages
-    ]
+    def load() -> tuple[int | None, list[MessageOut]]:
+        total_count, messages = list_messages(
+            pair_id=pair_id,
+            requester_user_id=user_id,
+            limit=limit,
+            offset=offset,
+            session=session,
+            after_id=after_id,
+            before_id=before_id,
+            newest_first=newest_first,
+        )
+        return total_count, [
+            MessageOut.model_validate(message, from_attributes=True)
+            for message in messages
+        ]
+
+    if after_id is None or wait == 0:
+        total_count, items = await run_in_threadpool(load)
+    else:
+        # Subscribe before the first read so a message sent in between wakes us.
+        async with get_broker().subscribe(user_id) as events:
+            total_count, items = await run_in_threadpool(load)
+            if not items:
+                # Give the pooled connection back while the request is parked.
+                await run_in_threadpool(session.close)
+                if await wait_for_pair_message(events, pair_id, wait):
+                    total_count, items = await run_in_threadpool(load)
+
+    if total_count is not None:
+        response.headers["X-Total-Count"] = str(total_count)
+    return items
@@ -6,10 +6,21 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlmodel import Session
 
 from backend.core.db import get_session
-from backend.models.pair import PairOut
+from backend.models.pair import (
+    InboxItemOut,
+    PairOut,
+    PairReadIn,
+    PairReadOut,
+    UnreadCountOut,
+)
 from backend.models.user import User
 from backend.routers.pets import get_current_user
-from backend.services.pair_service import list_pairs_for_user
+from backend.services.message_service import mark_pair_read
+from backend.services.pair_service import (
+    count_unread_for_user,
+    list_inbox_for_user,
+    list_pairs_for_user,
+)
 
 router = APIRouter(prefix="/pairs", tags=["pairs"])
 
@@ -24,6 +35,7 @@ def list_my_pairs(
     response: Response,
     limit: Annotated[int, Query(ge=1, le=100)] = 20,
     offset: Annotated[int, Query(ge=0)] = 0,
+    before_id: Annotated[int | None, Query(ge=1)] = None,
 ) -> list[PairOut]:
     if current.id is None:
         raise HTTPException(
@@ -36,6 +48,74 @@ def list_my_pairs(
         user_id=current.id,
         limit=limit,
         offset=offset,
+        before_id=before_id,
     )
     response.headers["X-Total-Count"] = str(total_count)
     return [PairOut(**item) for item in items]
+
+
+@router.get("/inbox", response_model=list[InboxItemOut])
+def list_my_inbox(
+    current: CurrentUserDep,
+    session: SessionDep,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    before_id: Annotated[int | None, Query(ge=1)] = None,
+) -> list[InboxItemOut]:
+    """Pairs ordered by last activity; page with the last item's id as before_id."""
+    if current.id is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="authenticated user missing identifier",
+        )
+
+    items = list_inbox_for_user(
+        session=session,
+        user_id=current.id,
+        limit=limit,
+        before_id=before_id,
+    )
+    return [InboxItemOut(**item) for item in items]
+
+
+@router.get("/unread", response_model=UnreadCountOut)
+def get_my_unread_count(
+    current: CurrentUserDep,
+    session: SessionDep,
+) -> UnreadCountOut:
+    """Total unread messages across the user's pairs, for badges."""
+    if current.id is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="authenticated user missing identifier",
+        )
+
+    return UnreadCountOut(
+        unread_count=count_unread_for_user(session=session, user_id=current.id)
+    )
+
+
+@router.post("/{pair_id}/read", response_model=PairReadOut)
+def mark_read(
+    pair_id: int,
+    current: CurrentUserDep,
+    session: SessionDep,
+    payload: PairReadIn | None = None,
+) -> PairReadOut:
+    """Mark the pair read up to ``message_id`` (default: its latest message)."""
+    if current.id is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="authenticated user missing identifier",
+        )
+
+    last_read_message_id, unread_count = mark_pair_read(
+        pair_id,
+        current.id,
+        session,
+        message_id=payload.message_id if payload is not None else None,
+    )
+    return PairReadOut(
+        pair_id=pair_id,
+        last_read_message_id=last_read_message_id,
+        unread_count=unread_count,
+    )
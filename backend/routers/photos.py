@@ -5,25 +5,42 @@ from typing import Annotated
 from fastapi import (
     APIRouter,
     Depends,
-    File,
     HTTPException,
     Query,
+    Request,
     Response,
-    UploadFile,
     status,
 )
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session
 
+from backend.core.config import settings
 from backend.core.db import get_session
 from backend.models.pet import Pet
 from backend.models.user import User
 from backend.routers.pets import get_current_user
-from backend.schemas.photo import PhotoOut
+from backend.schemas.photo import (
+    PhotoFinalizeIn,
+    PhotoOut,
+    PhotoUploadIn,
+    PhotoUploadTicketOut,
+    PresignedUploadOut,
+)
 from backend.services.photo_service import (
     delete_photo,
+    finalize_direct_upload,
     list_photos,
+    open_media_put,
     save_photo,
+    save_photos,
     set_primary,
+    start_direct_upload,
+    store_media_put,
+)
+from backend.services.photo_upload import (
+    receive_photo_body,
+    receive_photo_uploads,
+    reject_oversized_request,
 )
 
 router = APIRouter(tags=["photos"])
@@ -56,23 +73,147 @@ def _assert_pet_owner(session: Session, pet_id: int, user_id: int) -> Pet:
     return pet
 
 
+PHOTO_UPLOAD_BODY: dict[str, object] = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
 @router.post(
     "/pets/{pet_id}/photos",
     response_model=PhotoOut,
     status_code=status.HTTP_201_CREATED,
+    openapi_extra=PHOTO_UPLOAD_BODY,
 )
-def upload_pet_photo(
+async def upload_pet_photo(
     pet_id: int,
+    request: Request,
     session: SessionDep,
     current: CurrentUserDep,
-    file: UploadFile = File(...),
 ) -> PhotoOut:
+    """Stream the ``file`` part straight to media storage; no form spooling."""
+    reject_oversized_request(request)
+    user_id = _require_user_id(current)
+    await run_in_threadpool(_assert_pet_owner, session, pet_id, user_id)
+    # Don't hold a pooled connection while the body is still arriving.
+    await run_in_threadpool(session.close)
+    (staged,) = await receive_photo_uploads(request)
+    photo = await run_in_threadpool(save_photo, session, pet_id, staged)
+    return PhotoOut.model_validate(photo, from_attributes=True)
+
+
+PHOTO_BATCH_UPLOAD_BODY: dict[str, object] = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {
+                        "files": {
+                            "type": "array",
+                            "items": {"type": "string", "format": "binary"},
+                        }
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+@router.post(
+    "/pets/{pet_id}/photos/batch",
+    response_model=list[PhotoOut],
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=PHOTO_BATCH_UPLOAD_BODY,
+)
+async def upload_pet_photos(
+    pet_id: int,
+    request: Request,
+    session: SessionDep,
+    current: CurrentUserDep,
+) -> list[PhotoOut]:
+    """Upload several ``files`` parts at once; all photos are added or none."""
+    max_files = settings.PHOTO_MAX_FILES_PER_REQUEST
+    reject_oversized_request(request, max_files=max_files)
+    user_id = _require_user_id(current)
+    await run_in_threadpool(_assert_pet_owner, session, pet_id, user_id)
+    await run_in_threadpool(session.close)
+    staged = await receive_photo_uploads(
+        request, field_name="files", max_files=max_files
+    )
+    photos = await run_in_threadpool(save_photos, session, pet_id, staged)
+    return [PhotoOut.model_validate(photo, from_attributes=True) for photo in photos]
+
+
+@router.post("/pets/{pet_id}/photos/uploads", response_model=PhotoUploadTicketOut)
+def begin_direct_photo_upload(
+    pet_id: int,
+    payload: PhotoUploadIn,
+    session: SessionDep,
+    current: CurrentUserDep,
+) -> PhotoUploadTicketOut:
+    """Let the client send the bytes straight to media storage.
+
+    Upload with ``upload`` (skip it when it is null), then call
+    ``/photos/uploads/finalize`` with ``upload_token``.
+    """
     user_id = _require_user_id(current)
     _assert_pet_owner(session, pet_id, user_id)
-    photo = save_photo(session, pet_id=pet_id, file=file)
+    token, presigned = start_direct_upload(
+        session,
+        pet_id,
+        content_type=payload.content_type,
+        size=payload.size_bytes,
+        sha256=payload.sha256,
+    )
+    return PhotoUploadTicketOut(
+        upload_token=token,
+        upload=(
+            None
+            if presigned is None
+            else PresignedUploadOut.model_validate(presigned, from_attributes=True)
+        ),
+    )
+
+
+@router.post(
+    "/pets/{pet_id}/photos/uploads/finalize",
+    response_model=PhotoOut,
+    status_code=status.HTTP_201_CREATED,
+)
+def finalize_direct_photo_upload(
+    pet_id: int,
+    payload: PhotoFinalizeIn,
+    session: SessionDep,
+    current: CurrentUserDep,
+) -> PhotoOut:
+    user_id = _require_user_id(current)
+    _assert_pet_owner(session, pet_id, user_id)
+    photo = finalize_direct_upload(session, pet_id, payload.upload_token)
     return PhotoOut.model_validate(photo, from_attributes=True)
 
 
+@router.put("/media/uploads/{token}", status_code=status.HTTP_204_NO_CONTENT)
+async def put_presigned_media(token: str, request: Request) -> None:
+    """Target of local-storage presigned uploads; the token is the credential."""
+    claims = open_media_put(token)
+    staged = await receive_photo_body(request)
+    await run_in_threadpool(store_media_put, claims, staged)
+
+
 @router.get("/pets/{pet_id}/photos", response_model=list[PhotoOut])
 def get_pet_photos(
     pet_id: int,
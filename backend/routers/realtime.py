@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session, select
+
+from backend.core.db import get_session
+from backend.core.security import decode_token
+from backend.models.user import User
+from backend.services.realtime_service import get_broker
+
+router = APIRouter(tags=["realtime"])
+
+SessionDep = Annotated[Session, Depends(get_session)]
+
+
+def _authenticate(session: Session, token: str | None) -> int | None:
+    if not token:
+        return None
+    try:
+        payload = decode_token(token)
+    except Exception:
+        return None
+    email = payload.get("sub")
+    if not email:
+        return None
+    user = session.exec(select(User).where(User.email == email)).first()
+    # Release the connection now; the socket may stay open for hours.
+    session.close()
+    return None if user is None else user.id
+
+
+def _bearer_token(websocket: WebSocket, token: str | None) -> str | None:
+    if token:
+        return token
+    header = websocket.headers.get("authorization", "")
+    scheme, _, credentials = header.partition(" ")
+    return credentials if scheme.lower() == "bearer" and credentials else None
+
+
+@router.websocket("/ws")
+async def realtime_socket(
+    websocket: WebSocket,
+    session: SessionDep,
+    token: Annotated[str | None, Query()] = None,
+) -> None:
+    """Push new messages of the user's pairs; authenticate with ?token= or Bearer."""
+    user_id = await run_in_threadpool(
+        _authenticate, session, _bearer_token(websocket, token)
+    )
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    async with get_broker().subscribe(user_id) as events:
+
+        async def forward() -> None:
+            async for event in events:
+                await websocket.send_json(event)
+
+        async def wait_for_disconnect() -> None:
+            with suppress(WebSocketDisconnect):
+                while True:
+                    await websocket.receive_text()
+
+        tasks = {
+            asyncio.create_task(forward()),
+            asyncio.create_task(wait_for_disconnect()),
+        }
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+            with suppress(asyncio.CancelledError, WebSocketDisconnect):
+                await task
+        for task in done:
+            with suppress(WebSocketDisconnect):
+                task.result()
@@ -1,7 +1,10 @@
 from datetime import datetime
 
+from pydantic import field_validator
 from sqlmodel import SQLModel
 
+from backend.services.media_storage import build_media_url
+
 
 class PhotoOut(SQLModel):
     id: int
@@ -11,5 +14,37 @@ class PhotoOut(SQLModel):
     created_at: datetime
     mime_type: str | None = None
     size_bytes: int | None = None
+    width: int | None = None
+    height: int | None = None
+    # Size label -> URL of each resized copy rendered so far.
+    derivatives: dict[str, str] = {}
 
     model_config = {"from_attributes": True}
+
+    @field_validator("derivatives", mode="before")
+    @classmethod
+    def _derivative_urls(cls, value: dict[str, str] | None) -> dict[str, str]:
+        return {size: build_media_url(name) for size, name in (value or {}).items()}
+
+
+class PhotoUploadIn(SQLModel):
+    content_type: str
+    size_bytes: int
+    sha256: str
+
+
+class PresignedUploadOut(SQLModel):
+    method: str
+    url: str
+    fields: dict[str, str] = {}
+    headers: dict[str, str] = {}
+
+
+class PhotoUploadTicketOut(SQLModel):
+    upload_token: str
+    # None when the same bytes are already stored: finalize right away.
+    upload: PresignedUploadOut | None = None
+
+
+class PhotoFinalizeIn(SQLModel):
+    upload_token: str
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass
+
+from fastapi import HTTPException, status
+
+from backend.core.config import settings
+
+JPEG_SIGNATURE = b"\xff\xd8\xff"
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Start-of-frame markers carry the dimensions; DHT/JPG/DAC share the range.
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length field.
+JPEG_STANDALONE_MARKERS = frozenset([0x01, *range(0xD0, 0xD8)])
+JPEG_SOS, JPEG_EOI = 0xDA, 0xD9
+
+
+class InvalidImage(ValueError):
+    """The bytes are not a supported image (or not a sane one)."""
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    content_type: str
+    width: int
+    height: int
+
+
+def _walk_jpeg(header: bytes | bytearray, offset: int) -> tuple[ImageInfo | None, int]:
+    """Walk JPEG segments from ``offset`` to the frame header.
+
+    Returns the image once the frame header is in ``header``, and the offset
+    of the first segment not yet fully read, to resume from with more bytes.
+    """
+    while True:
+        if offset + 4 > len(header):
+            return None, offset
+        if header[offset] != 0xFF:
+            raise InvalidImage("corrupt JPEG segment")
+        marker = header[offset + 1]
+        if marker == 0xFF:  # fill byte
+            offset += 1
+            continue
+        if marker in JPEG_STANDALONE_MARKERS:
+            offset += 2
+            continue
+        if marker in (JPEG_SOS, JPEG_EOI):
+            raise InvalidImage("JPEG has no frame header")
+        if marker in JPEG_SOF_MARKERS:
+            if offset + 9 > len(header):
+                return None, offset
+            height, width = struct.unpack(">HH", header[offset + 5 : offset + 9])
+            return ImageInfo("image/jpeg", width, height), offset
+        (length,) = struct.unpack(">H", header[offset + 2 : offset + 4])
+        if length < 2:
+            raise InvalidImage("corrupt JPEG segment")
+        offset += 2 + length
+
+
+def _probe_jpeg(header: bytes) -> ImageInfo | None:
+    return _walk_jpeg(header, len(JPEG_SIGNATURE) - 1)[0]
+
+
+def _probe_png(header: bytes) -> ImageInfo | None:
+    if len(header) < 24:
+        return None
+    if header[12:16] != b"IHDR":
+        raise InvalidImage("PNG does not start with IHDR")
+    width, height = struct.unpack(">II", header[16:24])
+    return ImageInfo("image/png", width, height)
+
+
+def _probe_webp(header: bytes) -> ImageInfo | None:
+    if len(header) < 30:
+        return None
+    chunk = header[12:16]
+    if chunk == b"VP8 ":
+        if header[23:26] != b"\x9d\x01\x2a":
+            raise InvalidImage("corrupt WebP frame")
+        width, height = struct.unpack("<HH", header[26:30])
+        return ImageInfo("image/webp", width & 0x3FFF, height & 0x3FFF)
+    if chunk == b"VP8L":
+        if header[20] != 0x2F:
+            raise InvalidImage("corrupt WebP frame")
+        (bits,) = struct.unpack("<I", header[21:25])
+        return ImageInfo("image/webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+    if chunk == b"VP8X":
+        width = int.from_bytes(header[24:27], "little") + 1
+        height = int.from_bytes(header[27:30], "little") + 1
+        return ImageInfo("image/webp", width, height)
+    raise InvalidImage("unsupported WebP chunk")
+
+
+def probe_image(header: bytes) -> ImageInfo | None:
+    """Type and size from the leading bytes of an image, without decoding it.
+
+    Returns ``None`` while ``header`` is too short to tell; raises
+    ``InvalidImage`` as soon as it can't be a JPEG, PNG or WebP.
+    """
+    if len(header) < 12:
+        if not any(
+            signature.startswith(header[: len(signature)])
+            for signature in (JPEG_SIGNATURE, PNG_SIGNATURE, b"RIFF")
+        ):
+            raise InvalidImage("unsupported image format")
+        return None
+    if header.startswith(JPEG_SIGNATURE):
+        return _probe_jpeg(header)
+    if header.startswith(PNG_SIGNATURE):
+        return _probe_png(header)
+    if header.startswith(b"RIFF") and header[8:12] == b"WEBP":
+        return _probe_webp(header)
+    raise InvalidImage("unsupported image format")
+
+
+def check_image(info: ImageInfo) -> ImageInfo:
+    """Enforce the allowed types and pixel limits on a probed image."""
+    if info.content_type not in settings.PHOTO_ALLOWED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="unsupported photo type",
+        )
+    if (
+        not info.width
+        or not info.height
+        or max(info.width, info.height) > settings.PHOTO_MAX_SIDE
+        or info.width * info.height > settings.PHOTO_MAX_PIXELS
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="photo dimensions out of range",
+        )
+    return info
+
+
+class ImageSniffer:
+    """Feed an upload's chunks in order; settles once the header is read.
+
+    Only the leading bytes are kept, at most ``PHOTO_SNIFF_MAX_BYTES``, so a
+    mislabeled file or an oversized (decompression bomb) image is rejected
+    before the rest of the body is even received. A JPEG's segments are
+    walked once, each chunk resuming where the previous one stopped.
+    """
+
+    def __init__(self) -> None:
+        self.header = bytearray()
+        self.info: ImageInfo | None = None
+        # Where the JPEG segment walk resumes; 0 until the file is known JPEG.
+        self._jpeg_offset = 0
+
+    def _probe(self) -> ImageInfo | None:
+        if not self._jpeg_offset and self.header.startswith(JPEG_SIGNATURE):
+            self._jpeg_offset = len(JPEG_SIGNATURE) - 1
+        if self._jpeg_offset:
+            info, self._jpeg_offset = _walk_jpeg(self.header, self._jpeg_offset)
+            return info
+        return probe_image(bytes(self.header))
+
+    def feed(self, data: bytes) -> None:
+        if self.info is not None:
+            return
+        room = settings.PHOTO_SNIFF_MAX_BYTES - len(self.header)
+        self.header += data[:room]
+        try:
+            info = self._probe()
+        except InvalidImage as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="file is not a supported image",
+            ) from exc
+        if info is None:
+            if len(self.header) >= settings.PHOTO_SNIFF_MAX_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="image header too large",
+                )
+            return
+        self.info = check_image(info)
+        self.header = bytearray()
+
+    def result(self) -> ImageInfo:
+        """The probed image, once every chunk has been fed."""
+        if self.info is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="file is not a supported image",
+            )
+        return self.info
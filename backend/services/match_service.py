@@ -1,17 +1,120 @@
 from __future__ import annotations
 
-from collections.abc import Sequence
+from collections.abc import Callable, Iterable, Sequence
 from datetime import datetime
-from typing import cast
+from typing import Any, cast
 
 from fastapi import HTTPException, status
-from sqlalchemy import desc, func
+from sqlalchemy import case, desc, func, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql.schema import Table
 from sqlmodel import Session, select
 
+from backend.core.config import settings
 from backend.models.match import Match, MatchDecision
+from backend.models.match_stats import UserMatchStats
+from backend.models.pair import Pair
 from backend.models.pet import Gender, Pet
-from backend.services.pair_service import try_create_pair_on_mutual_like
+from backend.services.pair_outbox_service import enqueue_pair_check
+from backend.services.pair_service import (
+    find_pair_partner_ids,
+    record_like_change,
+    try_create_pair_for_owners,
+    try_create_pair_on_mutual_like,
+)
+
+MATCH_TABLE = cast(Table, Match.__table__)  # type: ignore[attr-defined]
+STATS_TABLE = cast(Table, UserMatchStats.__table__)  # type: ignore[attr-defined]
+
+DECISION_APPLIED = "applied"
+DECISION_PET_NOT_FOUND = "pet_not_found"
+DECISION_OWN_PET = "own_pet"
+DECISION_SUPERSEDED = "superseded"
+
+# High half of the per-owner advisory lock key taken around decision writes.
+OWNER_DECISIONS_LOCK = 0x6D617463
+
+
+def _like_delta(previous: MatchDecision, current: MatchDecision) -> int:
+    was_liked = previous == MatchDecision.liked
+    is_liked = current == MatchDecision.liked
+    return int(is_liked) - int(was_liked)
+
+
+def _bump_stats(session: Session, owner_user_id: int, deltas: dict[str, int]) -> None:
+    """Add ``deltas`` to the owner's decision counters within the caller's transaction.
+
+    The counters are incremented in SQL so concurrent writers never overwrite
+    each other; a missing row is inserted, or bumped if another one won the race.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    bump = (
+        update(STATS_TABLE)
+        .where(STATS_TABLE.c.user_id == owner_user_id)
+        .values(
+            {
+                key: case(
+                    (STATS_TABLE.c[key] + delta < 0, 0),
+                    else_=STATS_TABLE.c[key] + delta,
+                )
+                for key, delta in deltas.items()
+            }
+        )
+        .returning(STATS_TABLE.c.user_id)
+    )
+    if session.execute(bump).scalar_one_or_none() is not None:
+        return
+    counts = {
+        decision.value: max(deltas.get(decision.value, 0), 0)
+        for decision in MatchDecision
+    }
+    try:
+        with session.begin_nested():
+            session.execute(insert(STATS_TABLE).values(user_id=owner_user_id, **counts))
+    except IntegrityError:
+        # Another decision created the row first.
+        session.execute(bump)
+
+
+def _lock_owner_decisions(session: Session, owner_user_id: int) -> None:
+    """Serialize the owner's decision writes until the transaction ends.
+
+    Stats deltas are derived from the decisions read before writing, so two
+    writers for the same owner must not interleave. Postgres takes a
+    transaction-scoped advisory lock; SQLite already has a single writer.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        lock_key = (OWNER_DECISIONS_LOCK << 32) | owner_user_id
+        session.execute(select(func.pg_advisory_xact_lock(lock_key)))
+
+
+def _stats_deltas(
+    previous: MatchDecision | None,
+    current: MatchDecision | None,
+    deltas: dict[str, int] | None = None,
+) -> dict[str, int]:
+    """Counter changes for moving one match from ``previous`` to ``current``."""
+    deltas = {} if deltas is None else deltas
+    if previous == current:
+        return deltas
+    if previous is not None:
+        deltas[previous.value] = deltas.get(previous.value, 0) - 1
+    if current is not None:
+        deltas[current.value] = deltas.get(current.value, 0) + 1
+    return deltas
+
+
+def _adjust_stats(
+    session: Session,
+    owner_user_id: int,
+    previous: MatchDecision | None,
+    current: MatchDecision | None,
+) -> None:
+    """Move one match between decision counters within the caller's transaction."""
+    _bump_stats(session, owner_user_id, _stats_deltas(previous, current))
 
 
 def decide_match(
@@ -20,6 +123,7 @@ def decide_match(
     decision: MatchDecision,
     session: Session,
 ) -> Match:
+    _lock_owner_decisions(session, owner_user_id)
     match = ensure_match_for_decision(
         owner_user_id=owner_user_id,
         target_pet_id=target_pet_id,
@@ -27,13 +131,28 @@ def decide_match(
     )
 
     if match.decision != decision:
+        previous = match.decision
         match.decision = decision
+        _adjust_stats(session, owner_user_id, previous, decision)
+        pet = session.get(Pet, target_pet_id)
+        if pet is not None:
+            record_like_change(
+                session,
+                liker_user_id=owner_user_id,
+                target_owner_id=pet.owner_id,
+                delta=_like_delta(previous, decision),
+            )
         session.flush()
 
+    if decision == MatchDecision.liked and settings.PAIR_OUTBOX_ENABLED:
+        pet = session.get(Pet, target_pet_id)
+        if pet is not None:
+            enqueue_pair_check(session, owner_user_id, pet.owner_id)
+
     session.commit()
     session.refresh(match)
 
-    if decision == MatchDecision.liked:
+    if decision == MatchDecision.liked and not settings.PAIR_OUTBOX_ENABLED:
         try_create_pair_on_mutual_like(
             session=session,
             liker_user_id=owner_user_id,
@@ -43,6 +162,160 @@ def decide_match(
     return match
 
 
+def _insert_for(session: Session) -> Callable[[Table], Any]:
+    """The dialect's ``INSERT`` construct, which supports ``ON CONFLICT``."""
+    dialect = session.get_bind().dialect.name
+    return postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+
+def decide_matches_batch(
+    owner_user_id: int,
+    decisions: Sequence[tuple[int, MatchDecision]],
+    session: Session,
+) -> tuple[list[dict[str, object]], list[Pair]]:
+    """Apply ordered decisions in one transaction, then detect mutual likes once.
+
+    Only the last entry for a pet is applied; earlier ones are reported as
+    superseded. Items that cannot be applied are reported per item instead of
+    failing the whole batch, and the rest are written with a single upsert.
+    With the pair outbox enabled, detection is queued and no pairs are returned.
+    """
+    last_index = {
+        target_pet_id: idx for idx, (target_pet_id, _) in enumerate(decisions)
+    }
+    owner_by_pet: dict[int, int] = {}
+    if last_index:
+        pet_rows = session.exec(
+            select(Pet.id, Pet.owner_id).where(
+                Pet.id.in_(last_index)  # type: ignore[union-attr]
+            )
+        ).all()
+        owner_by_pet = {
+            pet_id: owner_id for pet_id, owner_id in pet_rows if pet_id is not None
+        }
+
+    statuses: list[str] = []
+    wanted: dict[int, MatchDecision] = {}
+    for idx, (target_pet_id, decision) in enumerate(decisions):
+        if last_index[target_pet_id] != idx:
+            statuses.append(DECISION_SUPERSEDED)
+        elif target_pet_id not in owner_by_pet:
+            statuses.append(DECISION_PET_NOT_FOUND)
+        elif owner_by_pet[target_pet_id] == owner_user_id:
+            statuses.append(DECISION_OWN_PET)
+        else:
+            statuses.append(DECISION_APPLIED)
+            wanted[target_pet_id] = decision
+
+    previous_decisions: dict[int, MatchDecision] = {}
+    matches_by_pet: dict[int, Match] = {}
+    if wanted:
+        # Row locks would miss a row inserted concurrently before the upsert,
+        # which would then be counted as new; lock the owner instead.
+        _lock_owner_decisions(session, owner_user_id)
+        previous_rows = session.execute(
+            select(MATCH_TABLE.c.target_pet_id, MATCH_TABLE.c.decision).where(
+                MATCH_TABLE.c.owner_user_id == owner_user_id,
+                MATCH_TABLE.c.target_pet_id.in_(wanted),
+            )
+        ).all()
+        previous_decisions = {
+            pet_id: MatchDecision(decision) for pet_id, decision in previous_rows
+        }
+        now = datetime.utcnow()
+        upsert = _insert_for(session)(MATCH_TABLE).values(
+            [
+                {
+                    "owner_user_id": owner_user_id,
+                    "target_pet_id": pet_id,
+                    "decision": decision,
+                    "created_at": now,
+                }
+                for pet_id, decision in wanted.items()
+            ]
+        )
+        session.execute(
+            upsert.on_conflict_do_update(
+                index_elements=["owner_user_id", "target_pet_id"],
+                set_={"decision": upsert.excluded.decision},
+            )
+        )
+        matches_by_pet = {
+            match.target_pet_id: match
+            for match in session.exec(
+                select(Match)
+                .where(
+                    Match.owner_user_id == owner_user_id,
+                    Match.target_pet_id.in_(wanted),  # type: ignore[attr-defined]
+                )
+                .execution_options(populate_existing=True)
+            )
+        }
+
+    stats_deltas: dict[str, int] = {}
+    like_deltas: dict[int, int] = {}
+    for pet_id, match in matches_by_pet.items():
+        _stats_deltas(previous_decisions.get(pet_id), match.decision, stats_deltas)
+        previous = previous_decisions.get(pet_id, MatchDecision.undecided)
+        delta = _like_delta(previous, match.decision)
+        target_owner_id = owner_by_pet[pet_id]
+        like_deltas[target_owner_id] = like_deltas.get(target_owner_id, 0) + delta
+    _bump_stats(session, owner_user_id, stats_deltas)
+    for target_owner_id, delta in like_deltas.items():
+        record_like_change(
+            session,
+            liker_user_id=owner_user_id,
+            target_owner_id=target_owner_id,
+            delta=delta,
+        )
+
+    liked_owner_ids = {
+        owner_by_pet[pet_id]
+        for pet_id, match in matches_by_pet.items()
+        if match.decision == MatchDecision.liked
+    }
+    already_paired = find_pair_partner_ids(session, owner_user_id, liked_owner_ids)
+    unpaired_owner_ids = sorted(liked_owner_ids - already_paired)
+    if settings.PAIR_OUTBOX_ENABLED:
+        for target_owner_id in unpaired_owner_ids:
+            enqueue_pair_check(session, owner_user_id, target_owner_id)
+
+    if matches_by_pet:
+        session.commit()
+        for match in matches_by_pet.values():
+            session.refresh(match)
+
+    results: list[dict[str, object]] = []
+    for (target_pet_id, decision), item_status in zip(decisions, statuses, strict=True):
+        results.append(
+            {
+                "target_pet_id": target_pet_id,
+                "decision": decision,
+                "status": item_status,
+                "match": (
+                    matches_by_pet.get(target_pet_id)
+                    if item_status == DECISION_APPLIED
+                    else None
+                ),
+            }
+        )
+
+    new_pairs: list[Pair] = []
+    if settings.PAIR_OUTBOX_ENABLED:
+        return results, new_pairs
+
+    for target_owner_id in unpaired_owner_ids:
+        pair = try_create_pair_for_owners(
+            session=session,
+            liker_user_id=owner_user_id,
+            target_owner_id=target_owner_id,
+        )
+        if pair is not None:
+            new_pairs.append(pair)
+
+    return results, new_pairs
+
+
 def delete_match(
     owner_user_id: int,
     target_pet_id: int,
@@ -55,27 +328,70 @@ def delete_match(
     match = session.exec(statement).first()
     if match is None:
         return False
+    _adjust_stats(session, owner_user_id, match.decision, None)
+    if match.decision == MatchDecision.liked:
+        pet = session.get(Pet, target_pet_id)
+        if pet is not None:
+            record_like_change(
+                session,
+                liker_user_id=owner_user_id,
+                target_owner_id=pet.owner_id,
+                delta=-1,
+            )
     session.delete(match)
     session.commit()
     return True
 
 
 def count_by_decision(owner_user_id: int, session: Session) -> dict[str, int]:
-    match_table = cast(Table, Match.__table__)  # type: ignore[attr-defined]
-    statement = (
-        select(match_table.c.decision, func.count())
-        .where(match_table.c.owner_user_id == owner_user_id)
-        .group_by(match_table.c.decision)
-    )
-    counts = {decision.value: 0 for decision in MatchDecision}
-    for decision_value, total in session.exec(statement):
-        key = (
-            decision_value.value
-            if isinstance(decision_value, MatchDecision)
-            else str(decision_value)
+    stats = session.get(UserMatchStats, owner_user_id)
+    return {
+        decision.value: 0 if stats is None else int(getattr(stats, decision.value))
+        for decision in MatchDecision
+    }
+
+
+def reconcile_match_stats(
+    session: Session,
+    user_ids: Iterable[int] | None = None,
+) -> int:
+    """Recount decisions from the match table and fix drifted counters.
+
+    Returns the number of users whose stored counters were corrected.
+    """
+    statement = select(
+        MATCH_TABLE.c.owner_user_id, MATCH_TABLE.c.decision, func.count()
+    ).group_by(MATCH_TABLE.c.owner_user_id, MATCH_TABLE.c.decision)
+    stored_statement = select(UserMatchStats)
+    if user_ids is not None:
+        scope = set(user_ids)
+        statement = statement.where(MATCH_TABLE.c.owner_user_id.in_(scope))
+        stored_statement = stored_statement.where(STATS_TABLE.c.user_id.in_(scope))
+
+    actual: dict[int, dict[str, int]] = {}
+    for owner_user_id, decision_value, total in session.exec(statement):
+        key = MatchDecision(decision_value).value
+        counts = actual.setdefault(
+            owner_user_id, {decision.value: 0 for decision in MatchDecision}
         )
         counts[key] = int(total)
-    return counts
+
+    stored = {stats.user_id: stats for stats in session.exec(stored_statement)}
+    corrected = 0
+    for owner_user_id in actual.keys() | stored.keys():
+        counts = actual.get(
+            owner_user_id, {decision.value: 0 for decision in MatchDecision}
+        )
+        stats = stored.get(owner_user_id)
+        if stats is None:
+            stats = UserMatchStats(user_id=owner_user_id)
+            session.add(stats)
+        if any(getattr(stats, key) != value for key, value in counts.items()):
+            for key, value in counts.items():
+                setattr(stats, key, value)
+            corrected += 1
+    session.commit()
+    return corrected
 
 
 def list_matches(
@@ -146,6 +462,7 @@ def ensure_match_for_decision(
         decision=MatchDecision.undecided,
     )
     session.add(match)
+    _adjust_stats(session, owner_user_id, None, MatchDecision.undecided)
     session.flush()
     session.refresh(match)
     return match
@@ -162,6 +479,7 @@ def generate_matches(
     if limit <= 0:
         return 0, []
 
+    _lock_owner_decisions(session, current_user_id)
     existing_result = session.exec(
         select(Match.target_pet_id).where(Match.owner_user_id == current_user_id)
     )
@@ -202,6 +520,7 @@ def generate_matches(
         created += 1
 
     if created:
+        _bump_stats(session, current_user_id, {MatchDecision.undecided.value: created})
         session.commit()
 
     return created, candidates
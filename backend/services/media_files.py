@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from backend.core.config import settings
+from backend.services.media_storage import IMMUTABLE_CACHE_CONTROL
+
+# ``<sha256>.<ext>`` originals and their ``<sha256>_<size>.<ext>`` derivatives.
+CONTENT_ADDRESSED_RE = re.compile(r"(?P<digest>[0-9a-f]{64}(?:_\d+)?)\.[a-z0-9]+")
+OFFLOAD_HEADERS = {
+    "x-accel-redirect": "X-Accel-Redirect",
+    "x-sendfile": "X-Sendfile",
+}
+# Headers a proxy should pass on when it serves the file body itself.
+OFFLOAD_KEEP_HEADERS = ("cache-control", "etag", "last-modified", "content-type")
+
+
+class MediaFiles(StaticFiles):
+    """``StaticFiles`` tuned for the media directory.
+
+    Content-addressed files never change, so they are cacheable forever and
+    their digest doubles as a strong ``ETag`` that is identical on every
+    replica. Conditional requests get a 304 and ``Range`` requests a 206 (both
+    handled by ``FileResponse``); when the server offers the ASGI ``pathsend``
+    extension the body goes out without passing through Python. With
+    ``offload`` set, only headers are produced and the fronting proxy sends
+    the bytes (with its own ``sendfile`` and range support).
+    """
+
+    def __init__(
+        self,
+        *,
+        directory: str | os.PathLike[str],
+        offload: str | None = None,
+        offload_prefix: str | None = None,
+        max_age: int | None = None,
+    ) -> None:
+        super().__init__(directory=directory)
+        offload = (settings.MEDIA_OFFLOAD if offload is None else offload).lower()
+        if offload and offload not in OFFLOAD_HEADERS:
+            raise RuntimeError(f"unknown MEDIA_OFFLOAD mode {offload!r}")
+        self.offload = offload
+        self.offload_prefix = (
+            settings.MEDIA_OFFLOAD_PREFIX if offload_prefix is None else offload_prefix
+        ).rstrip("/")
+        self.max_age = (
+            settings.MEDIA_CACHE_MAX_AGE_SECONDS if max_age is None else max_age
+        )
+        self.root = Path(os.path.realpath(directory))
+
+    def file_response(
+        self,
+        full_path: str | os.PathLike[str],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        headers: dict[str, str] = {}
+        match = CONTENT_ADDRESSED_RE.fullmatch(os.path.basename(full_path))
+        if match is not None:
+            headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+            headers["etag"] = f'"{match["digest"]}"'
+        else:
+            headers["cache-control"] = f"public, max-age={self.max_age}"
+
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            headers=headers,
+            stat_result=stat_result,
+        )
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        if not self.offload or status_code != 200:
+            return response
+
+        path = Path(full_path)
+        if self.offload == "x-accel-redirect":
+            target = f"{self.offload_prefix}/{path.relative_to(self.root).as_posix()}"
+        else:
+            target = str(path)
+        kept = {
+            name: value
+            for name, value in response.headers.items()
+            if name in OFFLOAD_KEEP_HEADERS
+        }
+        kept[OFFLOAD_HEADERS[self.offload]] = target
+        return Response(headers=kept, media_type=response.media_type)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+from contextlib import suppress
+
+from sqlalchemy import select, update
+from sqlmodel import Session
+
+from backend.core.config import settings
+from backend.services.media_storage import (
+    MediaStorage,
+    build_media_url,
+    get_media_storage,
+    shard_key,
+)
+from backend.services.photo_service import BLOB_TABLE, PHOTO_TABLE
+
+logger = logging.getLogger(__name__)
+
+
+def _is_flat(key: str) -> bool:
+    return "/" not in key
+
+
+def _shard_file(session: Session, storage: MediaStorage, filename: str) -> list[str]:
+    """Copy one flat file and its derivatives to sharded keys and repoint rows.
+
+    Returns the flat keys, which may only be deleted once this is committed.
+    """
+    sharded = shard_key(filename)
+    # Updating the blob first locks it, so a concurrent duplicate upload
+    # waits and then picks up the new key instead of the flat one.
+    session.execute(
+        update(BLOB_TABLE)
+        .where(BLOB_TABLE.c.filename == filename)
+        .values(filename=sharded)
+    )
+    rows = session.execute(
+        select(PHOTO_TABLE.c.id, PHOTO_TABLE.c.derivatives).where(
+            PHOTO_TABLE.c.filename == filename
+        )
+    ).all()
+
+    renames = {filename: sharded}
+    for _, derivatives in rows:
+        for key in (derivatives or {}).values():
+            if _is_flat(key):
+                renames[key] = shard_key(key)
+    for old, new in renames.items():
+        if storage.exists(old):
+            storage.copy(old, new)
+        elif not storage.exists(new):
+            logger.warning("media file %s is missing; repointing anyway", old)
+
+    url = build_media_url(sharded)
+    for photo_id, derivatives in rows:
+        values: dict[str, object] = {"filename": sharded, "url": url}
+        if derivatives:
+            values["derivatives"] = {
+                label: renames.get(key, key) for label, key in derivatives.items()
+            }
+        session.execute(
+            update(PHOTO_TABLE).where(PHOTO_TABLE.c.id == photo_id).values(**values)
+        )
+    return list(renames)
+
+
+def shard_media_layout(
+    session: Session,
+    *,
+    after_id: int = 0,
+    batch_size: int | None = None,
+    on_batch: Callable[[int, int], None] | None = None,
+) -> int:
+    """Move photos stored under flat keys to the ``ab/cd/<name>`` layout.
+
+    Runs online: each file is first copied (hard-linked locally) to its new
+    key, the rows are repointed in one committed batch, and only then is the
+    flat copy deleted, so every committed URL keeps resolving. Already
+    sharded rows are skipped, so an interrupted run can simply be restarted;
+    ``on_batch(last_id, moved)`` reports the id to pass as ``after_id`` to
+    skip the rows already scanned. Returns the number of files moved.
+    """
+    batch_size = batch_size or settings.MEDIA_SHARD_BATCH_SIZE
+    storage = get_media_storage()
+    moved = 0
+    last_id = after_id
+    while True:
+        rows = session.execute(
+            select(PHOTO_TABLE.c.id, PHOTO_TABLE.c.filename)
+            .where(
+                PHOTO_TABLE.c.id > last_id,
+                PHOTO_TABLE.c.filename.not_like("%/%"),
+            )
+            .order_by(PHOTO_TABLE.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return moved
+        last_id = rows[-1][0]
+
+        obsolete: list[str] = []
+        try:
+            for filename in sorted({row[1] for row in rows}):
+                obsolete += _shard_file(session, storage, filename)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        for key in obsolete:
+            with suppress(Exception):  # pragma: no cover - best effort cleanup
+                storage.delete(key)
+        moved += len({row[1] for row in rows})
+        if on_batch is not None:
+            on_batch(last_id, moved)
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import logging
+import re
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import suppress
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import islice
+
+from sqlalchemy import select
+from sqlmodel import Session
+
+from backend.core.config import settings
+from backend.models.photo import Photo
+from backend.services.media_storage import MediaStorage, get_media_storage
+from backend.services.photo_service import (
+    BLOB_TABLE,
+    CONTENT_TYPE_EXTENSIONS,
+    PHOTO_TABLE,
+    discard_photo,
+    remove_released_media,
+)
+
+logger = logging.getLogger(__name__)
+
+# ``<stem>_<size>.<ext>``: a derivative of ``<stem>.<original ext>``.
+DERIVATIVE_RE = re.compile(r"(?P<stem>.+)_\d+\.[a-z0-9]+")
+
+
+@dataclass
+class MediaReconcileReport:
+    files_scanned: int = 0
+    orphan_files: int = 0
+    rows_scanned: int = 0
+    dangling_rows: int = 0
+    # Resume points: pass back as ``after_key`` / ``after_id``.
+    last_key: str | None = None
+    last_id: int = 0
+
+
+def _batches(
+    items: Iterable[tuple[str, float]], size: int
+) -> Iterator[list[tuple[str, float]]]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _referenced(session: Session, keys: list[str]) -> set[str]:
+    """The subset of ``keys`` some photo or blob row points at."""
+    referenced = set(
+        session.execute(
+            select(PHOTO_TABLE.c.filename).where(PHOTO_TABLE.c.filename.in_(keys))
+        ).scalars()
+    )
+    referenced.update(
+        session.execute(
+            select(BLOB_TABLE.c.filename).where(BLOB_TABLE.c.filename.in_(keys))
+        ).scalars()
+    )
+    # Derivatives live in a JSON column; look them up through the originals
+    # they could belong to, which the filename index finds.
+    originals = {
+        f"{match['stem']}{extension}"
+        for key in keys
+        if key not in referenced and (match := DERIVATIVE_RE.fullmatch(key))
+        for extension in CONTENT_TYPE_EXTENSIONS.values()
+    }
+    if originals:
+        for derivatives in session.execute(
+            select(PHOTO_TABLE.c.derivatives).where(
+                PHOTO_TABLE.c.filename.in_(originals),
+                PHOTO_TABLE.c.derivatives.is_not(None),
+            )
+        ).scalars():
+            referenced.update((derivatives or {}).values())
+    return referenced
+
+
+def _sweep_released_blobs(session: Session, batch_size: int) -> None:
+    # Blobs whose last photo was deleted but whose files never were, say
+    # because the process died in between; they would keep the file alive.
+    while filenames := list(
+        session.execute(
+            select(BLOB_TABLE.c.filename)
+            .where(BLOB_TABLE.c.ref_count <= 0)
+            .limit(batch_size)
+        ).scalars()
+    ):
+        session.rollback()
+        for filename in filenames:
+            remove_released_media(session, [filename])
+
+
+def _sweep_files(
+    session: Session,
+    storage: MediaStorage,
+    report: MediaReconcileReport,
+    *,
+    delete: bool,
+    after_key: str | None,
+    batch_size: int,
+    grace_seconds: int,
+    on_finding: Callable[[str, str], None] | None,
+) -> None:
+    cutoff = time.time() - grace_seconds
+    for batch in _batches(storage.iter_objects(after_key), batch_size):
+        keys = [key for key, _ in batch]
+        referenced = _referenced(session, keys)
+        session.rollback()  # don't hold a snapshot across batches
+        for key, modified in batch:
+            if key in referenced or modified > cutoff:
+                continue
+            report.orphan_files += 1
+            if on_finding is not None:
+                on_finding("orphan-file", key)
+            if delete:
+                with suppress(Exception):  # pragma: no cover - next run retries
+                    storage.delete(key)
+        report.files_scanned += len(batch)
+        report.last_key = keys[-1]
+
+
+def _sweep_rows(
+    session: Session,
+    storage: MediaStorage,
+    report: MediaReconcileReport,
+    *,
+    delete: bool,
+    after_id: int,
+    batch_size: int,
+    grace_seconds: int,
+    on_finding: Callable[[str, str], None] | None,
+) -> None:
+    # A row is committed before its file is stored; give young ones time.
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    report.last_id = after_id
+    while True:
+        rows = session.execute(
+            select(PHOTO_TABLE.c.id, PHOTO_TABLE.c.filename)
+            .where(
+                PHOTO_TABLE.c.id > report.last_id,
+                PHOTO_TABLE.c.created_at <= cutoff,
+            )
+            .order_by(PHOTO_TABLE.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        dangling: list[int] = []
+        for photo_id, filename in rows:
+            if storage.exists(filename):
+                continue
+            dangling.append(photo_id)
+            if on_finding is not None:
+                on_finding("dangling-row", f"{photo_id}:{filename}")
+        obsolete: list[list[str]] = []
+        if delete and dangling:
+            try:
+                for photo_id in dangling:
+                    # Lock the row and look again: the file may have been
+                    # stored since the batch was checked.
+                    photo = session.get(
+                        Photo, photo_id, with_for_update=True, populate_existing=True
+                    )
+                    if photo is None or storage.exists(photo.filename):
+                        continue
+                    obsolete.append(discard_photo(session, photo))
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            for keys in obsolete:
+                remove_released_media(session, keys)
+        else:
+            session.rollback()
+        report.dangling_rows += len(dangling)
+        report.rows_scanned += len(rows)
+        report.last_id = rows[-1][0]
+
+
+def reconcile_media(
+    session: Session,
+    *,
+    delete: bool = False,
+    after_key: str | None = None,
+    after_id: int = 0,
+    batch_size: int | None = None,
+    grace_seconds: int | None = None,
+    on_finding: Callable[[str, str], None] | None = None,
+) -> MediaReconcileReport:
+    """Find stored files no row uses and photo rows whose file is gone.
+
+    Storage is streamed (``os.scandir`` per shard directory locally, paged
+    listings on S3) and checked against the database one batch of keys at a
+    time, then the photo table is walked in id order, so memory stays bounded
+    by ``batch_size`` however many files there are. Files and rows younger
+    than ``grace_seconds`` are skipped: they may belong to an upload that has
+    not finished yet. With ``delete`` the orphans are removed and dangling rows
+    are dropped as ``delete_photo`` would; otherwise each finding is only
+    reported through ``on_finding(kind, key)``. The report's ``last_key`` and
+    ``last_id`` resume an interrupted run; a nonzero ``after_id`` means the
+    file pass already finished.
+    """
+    batch_size = batch_size or settings.MEDIA_RECONCILE_BATCH_SIZE
+    if grace_seconds is None:
+        grace_seconds = settings.MEDIA_RECONCILE_GRACE_SECONDS
+    storage = get_media_storage()
+    report = MediaReconcileReport(last_key=after_key)
+    if after_id == 0:
+        if delete:
+            _sweep_released_blobs(session, batch_size)
+        _sweep_files(
+            session,
+            storage,
+            report,
+            delete=delete,
+            after_key=after_key,
+            batch_size=batch_size,
+            grace_seconds=grace_seconds,
+            on_finding=on_finding,
+        )
+    _sweep_rows(
+        session,
+        storage,
+        report,
+        delete=delete,
+        after_id=after_id,
+        batch_size=batch_size,
+        grace_seconds=grace_seconds,
+        on_finding=on_finding,
+    )
+    logger.info("media reconcile finished: %s", report)
+    return report
@@ -0,0 +1,386 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, suppress
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from backend.core.config import settings
+from backend.core.security import create_scoped_token
+
+# Stored names are content hashes, so a given key never changes its bytes.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MEDIA_PUT_TOKEN_TYPE = "media-put"
+_SHARD_PREFIX_RE = re.compile(r"[0-9a-f]{4}")
+
+
+@dataclass
+class PresignedUpload:
+    """How a client sends the bytes for one key straight to storage."""
+
+    method: str
+    url: str
+    fields: dict[str, str] = field(default_factory=dict)
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+class MediaStorage(ABC):
+    """Where photo files live; keys are relative names such as ``<sha256>.jpg``."""
+
+    @abstractmethod
+    def put_file(self, key: str, path: Path, content_type: str) -> None:
+        """Store the finished local file at ``path`` under ``key``, consuming it."""
+
+    @abstractmethod
+    def size(self, key: str) -> int | None:
+        """Stored size of ``key`` in bytes, or ``None`` when it is missing."""
+
+    def exists(self, key: str) -> bool:
+        return self.size(key) is not None
+
+    @abstractmethod
+    def iter_objects(self, after: str | None = None) -> Iterator[tuple[str, float]]:
+        """Stream every stored key with its modification time (epoch seconds).
+
+        Keys come in a stable order, so passing the last key seen as
+        ``after`` resumes an interrupted walk.
+        """
+
+    @abstractmethod
+    def read_head(self, key: str, length: int) -> bytes:
+        """Up to ``length`` leading bytes of ``key``."""
+
+    @abstractmethod
+    def copy(self, source: str, key: str) -> None:
+        """Make the bytes of ``source`` also available under ``key``."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove ``key``; missing keys are not an error."""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Public URL clients fetch ``key`` from."""
+
+    @abstractmethod
+    def local_copy(self, key: str) -> AbstractContextManager[Path]:
+        """Context manager yielding a readable local path for ``key``."""
+
+    @abstractmethod
+    def presign_upload(
+        self, key: str, *, content_type: str, size: int, sha256: str
+    ) -> PresignedUpload:
+        """Grant a client a one-off direct upload of exactly these bytes."""
+
+    @abstractmethod
+    def worker_config(self) -> dict[str, Any]:
+        """Arguments to rebuild this storage in a pool process."""
+
+
+class LocalMediaStorage(MediaStorage):
+    """Files under ``MEDIA_DIR``, served from ``MEDIA_BASE_URL``.
+
+    Direct uploads are emulated with a signed ``PUT`` back to this API, which
+    keeps the client flow identical to S3 for development.
+    """
+
+    def __init__(self, root: str | None = None, base_url: str | None = None):
+        self._root = root
+        self._base_url = base_url
+
+    @property
+    def root(self) -> Path:
+        return Path(self._root or settings.MEDIA_DIR)
+
+    def path(self, key: str) -> Path:
+        return self.root / key
+
+    def put_file(self, key: str, path: Path, content_type: str) -> None:
+        destination = self.path(key)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, destination)
+
+    def size(self, key: str) -> int | None:
+        try:
+            return self.path(key).stat().st_size
+        except OSError:
+            return None
+
+    def iter_objects(self, after: str | None = None) -> Iterator[tuple[str, float]]:
+        # Shard directories in sorted order, each small enough to sort; then
+        # any flat top-level files, streamed unsorted and rescanned whole on
+        # resume. Nothing is ever held beyond one directory listing.
+        root = self.root
+        if not root.is_dir():
+            return
+        resume_dir, _, resume_name = (after or "").rpartition("/")
+        if after is None or resume_dir:
+            for first in _sorted_dirs(root):
+                for second in _sorted_dirs(root / first):
+                    directory = f"{first}/{second}"
+                    if directory < resume_dir:
+                        continue
+                    with os.scandir(root / directory) as entries:
+                        files = sorted(
+                            (entry.name, entry.stat().st_mtime)
+                            for entry in entries
+                            if entry.is_file()
+                        )
+                    for name, modified in files:
+                        if directory == resume_dir and name <= resume_name:
+                            continue
+                        yield f"{directory}/{name}", modified
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    yield entry.name, entry.stat().st_mtime
+
+    def read_head(self, key: str, length: int) -> bytes:
+        with self.path(key).open("rb") as handle:
+            return handle.read(length)
+
+    def copy(self, source: str, key: str) -> None:
+        destination = self.path(key)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # A hard link shares the data blocks: no bytes are copied.
+            os.link(self.path(source), destination)
+        except FileExistsError:
+            pass
+        except OSError:
+            scratch = destination.with_name(f".{destination.name}.copy")
+            shutil.copyfile(self.path(source), scratch)
+            os.replace(scratch, destination)
+
+    def delete(self, key: str) -> None:
+        self.path(key).unlink(missing_ok=True)
+
+    def url(self, key: str) -> str:
+        base = (self._base_url or settings.MEDIA_BASE_URL).rstrip("/")
+        if not base:
+            return f"/{key}"
+        return f"{base}/{key}"
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[Path]:
+        yield self.path(key)
+
+    def presign_upload(
+        self, key: str, *, content_type: str, size: int, sha256: str
+    ) -> PresignedUpload:
+        token = create_scoped_token(
+            {
+                "typ": MEDIA_PUT_TOKEN_TYPE,
+                "key": key,
+                "ct": content_type,
+                "size": size,
+                "sha": sha256,
+            },
+            seconds=settings.MEDIA_UPLOAD_URL_TTL_SECONDS,
+        )
+        return PresignedUpload(
+            method="PUT",
+            url=f"{settings.api_v1_str}/media/uploads/{token}",
+            headers={"Content-Type": content_type},
+        )
+
+    def worker_config(self) -> dict[str, Any]:
+        return {
+            "backend": "local",
+            "root": str(self.root.resolve()),
+            "base_url": self._base_url or settings.MEDIA_BASE_URL,
+        }
+
+
+class S3MediaStorage(MediaStorage):
+    """Any S3-compatible bucket (AWS, MinIO, R2...) via ``boto3``."""
+
+    def __init__(
+        self,
+        *,
+        bucket: str,
+        endpoint_url: str | None = None,
+        region: str | None = None,
+        access_key_id: str | None = None,
+        secret_access_key: str | None = None,
+        public_base_url: str | None = None,
+    ) -> None:
+        try:
+            import boto3
+            from botocore.config import Config
+            from botocore.exceptions import ClientError
+        except ModuleNotFoundError as err:  # pragma: no cover - optional dependency
+            raise RuntimeError("MEDIA_STORAGE=s3 requires the 'boto3' package") from err
+        self._config = {
+            "bucket": bucket,
+            "endpoint_url": endpoint_url,
+            "region": region,
+            "access_key_id": access_key_id,
+            "secret_access_key": secret_access_key,
+            "public_base_url": public_base_url,
+        }
+        self.bucket = bucket
+        self._client_error = ClientError
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            config=Config(signature_version="s3v4"),
+        )
+        if public_base_url:
+            self._public_base = public_base_url.rstrip("/")
+        elif endpoint_url:
+            self._public_base = f"{endpoint_url.rstrip('/')}/{bucket}"
+        else:
+            self._public_base = f"https://{bucket}.s3.amazonaws.com"
+
+    def put_file(self, key: str, path: Path, content_type: str) -> None:
+        self._client.upload_file(
+            str(path),
+            self.bucket,
+            key,
+            ExtraArgs={
+                "ContentType": content_type,
+                "CacheControl": IMMUTABLE_CACHE_CONTROL,
+            },
+        )
+        path.unlink(missing_ok=True)
+
+    def size(self, key: str) -> int | None:
+        try:
+            head = self._client.head_object(Bucket=self.bucket, Key=key)
+        except self._client_error as err:
+            if err.response.get("Error", {}).get("Code") in {"404", "NoSuchKey"}:
+                return None
+            raise
+        return int(head["ContentLength"])
+
+    def iter_objects(self, after: str | None = None) -> Iterator[tuple[str, float]]:
+        pages = self._client.get_paginator("list_objects_v2").paginate(
+            Bucket=self.bucket, StartAfter=after or ""
+        )
+        for page in pages:
+            for item in page.get("Contents", []):
+                yield item["Key"], item["LastModified"].timestamp()
+
+    def read_head(self, key: str, length: int) -> bytes:
+        response = self._client.get_object(
+            Bucket=self.bucket, Key=key, Range=f"bytes=0-{length - 1}"
+        )
+        return bytes(response["Body"].read())
+
+    def copy(self, source: str, key: str) -> None:
+        self._client.copy_object(
+            Bucket=self.bucket,
+            Key=key,
+            CopySource={"Bucket": self.bucket, "Key": source},
+            MetadataDirective="COPY",
+        )
+
+    def delete(self, key: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=key)
+
+    def url(self, key: str) -> str:
+        return f"{self._public_base}/{key}"
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[Path]:
+        handle, name = tempfile.mkstemp(suffix=Path(key).suffix)
+        os.close(handle)
+        path = Path(name)
+        try:
+            self._client.download_file(self.bucket, key, name)
+            yield path
+        finally:
+            with suppress(OSError):
+                path.unlink()
+
+    def presign_upload(
+        self, key: str, *, content_type: str, size: int, sha256: str
+    ) -> PresignedUpload:
+        # The checksum condition makes storage itself reject bytes that don't
+        # hash to the key, so finalize never has to read the object back.
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode("ascii")
+        fields = {
+            "Content-Type": content_type,
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+            "x-amz-checksum-algorithm": "SHA256",
+            "x-amz-checksum-sha256": checksum,
+        }
+        conditions: list[Any] = [{name: value} for name, value in fields.items()]
+        conditions.append(["content-length-range", size, size])
+        post = self._client.generate_presigned_post(
+            Bucket=self.bucket,
+            Key=key,
+            Fields=fields,
+            Conditions=conditions,
+            ExpiresIn=settings.MEDIA_UPLOAD_URL_TTL_SECONDS,
+        )
+        return PresignedUpload(method="POST", url=post["url"], fields=post["fields"])
+
+    def worker_config(self) -> dict[str, Any]:
+        return {"backend": "s3", **self._config}
+
+
+def _sorted_dirs(path: Path) -> list[str]:
+    with os.scandir(path) as entries:
+        return sorted(entry.name for entry in entries if entry.is_dir())
+
+
+def shard_key(name: str) -> str:
+    """Fan-out key ``ab/cd/<name>`` for a flat media name.
+
+    Content hashes (and legacy uuid names) are already uniformly spread, so
+    their leading hex digits pick the directories; any other name is hashed.
+    """
+    prefix = name[:4]
+    if not _SHARD_PREFIX_RE.fullmatch(prefix):
+        prefix = hashlib.sha256(name.encode()).hexdigest()[:4]
+    return f"{prefix[:2]}/{prefix[2:]}/{name}"
+
+
+def storage_from_config(config: dict[str, Any]) -> MediaStorage:
+    options = dict(config)
+    if options.pop("backend") == "s3":
+        return S3MediaStorage(**options)
+    return LocalMediaStorage(**options)
+
+
+_storage: MediaStorage | None = None
+
+
+def get_media_storage() -> MediaStorage:
+    global _storage
+    if _storage is None:
+        if settings.MEDIA_STORAGE == "s3":
+            _storage = S3MediaStorage(
+                bucket=settings.MEDIA_S3_BUCKET,
+                endpoint_url=settings.MEDIA_S3_ENDPOINT_URL,
+                region=settings.MEDIA_S3_REGION,
+                access_key_id=settings.MEDIA_S3_ACCESS_KEY_ID,
+                secret_access_key=settings.MEDIA_S3_SECRET_ACCESS_KEY,
+                public_base_url=settings.MEDIA_S3_PUBLIC_BASE_URL,
+            )
+        else:
+            _storage = LocalMediaStorage()
+    return _storage
+
+
+def set_media_storage(storage: MediaStorage | None) -> None:
+    """Install a storage implementation (``None`` resets to the configured one)."""
+    global _storage
+    _storage = storage
+
+
+def build_media_url(key: str) -> str:
+    return get_media_storage().url(key)
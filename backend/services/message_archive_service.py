@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import cast
+
+from sqlalchemy import DateTime, delete, insert, literal, select
+from sqlalchemy.sql.schema import Table
+from sqlmodel import Session
+
+from backend.core.config import settings
+from backend.models.message import Message
+from backend.models.message_archive import MessageArchive
+from backend.models.pair import Pair
+
+MESSAGE_TABLE = cast(Table, Message.__table__)  # type: ignore[attr-defined]
+ARCHIVE_TABLE = cast(Table, MessageArchive.__table__)  # type: ignore[attr-defined]
+PAIR_TABLE = cast(Table, Pair.__table__)  # type: ignore[attr-defined]
+
+
+def _archive_pair(
+    session: Session,
+    pair_id: int,
+    last_message_id: int | None,
+    cutoff: datetime,
+    batch_size: int,
+) -> int:
+    """Move one pair's cold messages, oldest first, one committed batch at a time.
+
+    Archiving in ``(created_at, id)`` order keeps every archived row older than
+    every hot row of the pair, which the read-through in ``list_messages``
+    relies on. The pair's last message stays hot for the inbox preview.
+    """
+    moved = 0
+    while True:
+        statement = (
+            select(MESSAGE_TABLE.c.id)
+            .where(
+                MESSAGE_TABLE.c.pair_id == pair_id,
+                MESSAGE_TABLE.c.created_at < cutoff,
+            )
+            .order_by(MESSAGE_TABLE.c.created_at, MESSAGE_TABLE.c.id)
+            .limit(batch_size)
+        )
+        if last_message_id is not None:
+            statement = statement.where(MESSAGE_TABLE.c.id != last_message_id)
+        ids = list(session.execute(statement).scalars().all())
+        if not ids:
+            return moved
+
+        archived_at = literal(datetime.utcnow(), DateTime())
+        session.execute(
+            insert(ARCHIVE_TABLE).from_select(
+                [
+                    "id",
+                    "pair_id",
+                    "sender_user_id",
+                    "body",
+                    "created_at",
+                    "archived_at",
+                ],
+                select(
+                    MESSAGE_TABLE.c.id,
+                    MESSAGE_TABLE.c.pair_id,
+                    MESSAGE_TABLE.c.sender_user_id,
+                    MESSAGE_TABLE.c.body,
+                    MESSAGE_TABLE.c.created_at,
+                    archived_at,
+                ).where(MESSAGE_TABLE.c.id.in_(ids)),
+            )
+        )
+        session.execute(delete(MESSAGE_TABLE).where(MESSAGE_TABLE.c.id.in_(ids)))
+        session.commit()
+        moved += len(ids)
+        if len(ids) < batch_size:
+            return moved
+
+
+def archive_cold_messages(
+    session: Session,
+    *,
+    older_than: datetime | None = None,
+    batch_size: int | None = None,
+) -> int:
+    """Move messages older than ``older_than`` into ``message_archive``.
+
+    Walks pairs by id so every lookup uses the ``(pair_id, created_at, id)``
+    index; each batch commits on its own, so an interrupted run can simply be
+    started again. Returns the number of messages moved.
+    """
+    cutoff = older_than or datetime.utcnow() - timedelta(
+        days=settings.MESSAGE_ARCHIVE_AFTER_DAYS
+    )
+    size = max(1, batch_size or settings.MESSAGE_ARCHIVE_BATCH_SIZE)
+
+    moved = 0
+    last_pair_id = 0
+    while True:
+        pairs = session.execute(
+            select(PAIR_TABLE.c.id, PAIR_TABLE.c.last_message_id)
+            .where(PAIR_TABLE.c.id > last_pair_id)
+            .order_by(PAIR_TABLE.c.id)
+            .limit(size)
+        ).all()
+        if not pairs:
+            return moved
+        for pair_id, last_message_id in pairs:
+            moved += _archive_pair(session, pair_id, last_message_id, cutoff, size)
+        last_pair_id = pairs[-1][0]
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Sequence
+from typing import Any, cast
+
+from sqlalchemy import (
+    Connection,
+    DateTime,
+    Engine,
+    Integer,
+    String,
+    bindparam,
+    column,
+    desc,
+    event,
+    func,
+    literal_column,
+    select,
+    text,
+    union_all,
+)
+from sqlalchemy.sql.expression import ColumnClause
+from sqlalchemy.sql.schema import Table
+from sqlmodel import Session
+
+from backend.models.message import Message
+from backend.models.message_archive import MessageArchive
+from backend.models.pair import Pair
+
+MESSAGE_TABLE = cast(Table, Message.__table__)  # type: ignore[attr-defined]
+ARCHIVE_TABLE = cast(Table, MessageArchive.__table__)  # type: ignore[attr-defined]
+PAIR_TABLE = cast(Table, Pair.__table__)  # type: ignore[attr-defined]
+
+FTS_TABLE = "message_fts"
+# Must match the expression of the GIN indexes declared on the models.
+PG_SEARCH_CONFIG: ColumnClause[Any] = literal_column("'simple'::regconfig")
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _is_sqlite(bind: Connection | Engine | Session) -> bool:
+    if isinstance(bind, Session):
+        return bind.get_bind().dialect.name == "sqlite"
+    return bind.dialect.name == "sqlite"
+
+
+def ensure_message_search(bind: Connection | Engine) -> None:
+    """Create the SQLite FTS5 table and backfill it when it is new.
+
+    Rows are keyed by message id and carry their own copy of the message, so
+    they stay valid after the message moves to ``message_archive``.
+    """
+    if not _is_sqlite(bind):
+        return
+    if isinstance(bind, Engine):
+        with bind.begin() as connection:
+            ensure_message_search(connection)
+        return
+    exists = bind.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    ).first()
+    if exists is not None:
+        return
+    bind.execute(text(f"""
+        CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+            body,
+            pair_id UNINDEXED,
+            sender_user_id UNINDEXED,
+            created_at UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """))
+    for table in (MESSAGE_TABLE.name, ARCHIVE_TABLE.name):
+        if bind.dialect.has_table(bind, table):
+            bind.execute(text(f"""
+                INSERT INTO {FTS_TABLE}
+                    (rowid, body, pair_id, sender_user_id, created_at)
+                SELECT id, body, pair_id, sender_user_id, created_at FROM {table}
+                """))
+
+
+@event.listens_for(MESSAGE_TABLE, "after_create")
+def _create_message_search(_target: Table, connection: Connection, **_: Any) -> None:
+    ensure_message_search(connection)
+
+
+@event.listens_for(MESSAGE_TABLE, "before_drop")
+def _drop_message_search(_target: Table, connection: Connection, **_: Any) -> None:
+    if _is_sqlite(connection):
+        connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+
+
+def index_messages(session: Session, messages: Sequence[Message]) -> None:
+    """Add flushed messages to the SQLite FTS table, in the caller's transaction.
+
+    Postgres needs nothing here: its GIN indexes are on the body expression.
+    """
+    if not messages or not _is_sqlite(session):
+        return
+    session.execute(
+        text(f"""
+            INSERT INTO {FTS_TABLE} (rowid, body, pair_id, sender_user_id, created_at)
+            SELECT id, body, pair_id, sender_user_id, created_at FROM message
+            WHERE id IN :ids
+            """).bindparams(bindparam("ids", expanding=True)),
+        {"ids": [message.id for message in messages]},
+    )
+
+
+def _fts_query(q: str) -> str | None:
+    """Quote every term so user input can't use (or break) FTS5 syntax.
+
+    Terms are ANDed and the last one matches as a prefix, for search-as-you-type.
+    """
+    terms = [f'"{term}"' for term in _TOKEN_RE.findall(q)]
+    if not terms:
+        return None
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _user_pair_ids(user_id: int) -> Any:
+    return union_all(
+        select(PAIR_TABLE.c.id).where(PAIR_TABLE.c.user_low_id == user_id),
+        select(PAIR_TABLE.c.id).where(PAIR_TABLE.c.user_high_id == user_id),
+    )
+
+
+def search_messages(
+    session: Session,
+    user_id: int,
+    q: str,
+    *,
+    limit: int,
+    offset: int = 0,
+) -> list[Message]:
+    """Best matches first across the user's pairs, archived messages included."""
+    if _is_sqlite(session):
+        match = _fts_query(q)
+        if match is None:
+            return []
+        rows = session.execute(
+            text(f"""
+                SELECT rowid, pair_id, sender_user_id, body, created_at
+                FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH :match
+                  AND pair_id IN (
+                      SELECT id FROM pair WHERE user_low_id = :user_id
+                      UNION ALL
+                      SELECT id FROM pair WHERE user_high_id = :user_id
+                  )
+                ORDER BY bm25({FTS_TABLE}), rowid DESC
+                LIMIT :limit OFFSET :offset
+                """).columns(
+                column("rowid", Integer),
+                column("pair_id", Integer),
+                column("sender_user_id", Integer),
+                column("body", String),
+                column("created_at", DateTime),
+            ),
+            {"match": match, "user_id": user_id, "limit": limit, "offset": offset},
+        ).all()
+    else:
+        if not q.strip():
+            return []
+        query = func.websearch_to_tsquery(PG_SEARCH_CONFIG, q)
+        branches = []
+        for table in (MESSAGE_TABLE, ARCHIVE_TABLE):
+            vector = func.to_tsvector(PG_SEARCH_CONFIG, table.c.body)
+            branches.append(
+                select(
+                    table.c.id,
+                    table.c.pair_id,
+                    table.c.sender_user_id,
+                    table.c.body,
+                    table.c.created_at,
+                    func.ts_rank(vector, query).label("rank"),
+                ).where(
+                    vector.op("@@")(query),
+                    table.c.pair_id.in_(_user_pair_ids(user_id)),
+                )
+            )
+        hits = union_all(*branches).subquery()
+        rows = session.execute(
+            select(
+                hits.c.id,
+                hits.c.pair_id,
+                hits.c.sender_user_id,
+                hits.c.body,
+                hits.c.created_at,
+            )
+            .order_by(desc(hits.c.rank), desc(hits.c.id))
+            .limit(limit)
+            .offset(offset)
+        ).all()
+    return [
+        Message(
+            id=row[0],
+            pair_id=row[1],
+            sender_user_id=row[2],
+            body=row[3],
+            created_at=row[4],
+        )
+        for row in rows
+    ]
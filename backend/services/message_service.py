@@ -1,26 +1,101 @@
 from __future__ import annotations
 
-from typing import cast
+from typing import Any, cast
 
 from fastapi import HTTPException, status
-from sqlalchemy import asc, func
+from sqlalchemy import asc, case, desc, func, literal, tuple_, update
 from sqlalchemy.sql.schema import Table
 from sqlmodel import Session, select
 
-from backend.models.message import Message
+from backend.core.config import settings
+from backend.models.message import Message, MessageOut
+from backend.models.message_archive import MessageArchive
 from backend.models.pair import Pair
+from backend.services.message_archive_service import ARCHIVE_TABLE, MESSAGE_TABLE
+from backend.services.message_search_service import index_messages
+from backend.services.message_writer import MessageBatchWriter
+from backend.services.pair_members import PairMembers, get_pair_members
+from backend.services.realtime_service import get_broker
 
+PAIR_TABLE = cast(Table, Pair.__table__)  # type: ignore[attr-defined]
 
-def _get_pair(pair_id: int, session: Session) -> Pair | None:
-    return session.exec(select(Pair).where(Pair.id == pair_id)).first()
+# ``(created_at, id)`` of a message, as compared by the keyset cursors.
+CursorKey = tuple[Any, Any]
 
 
-def _validate_participant(pair: Pair, user_id: int) -> None:
-    if user_id not in {pair.user_low_id, pair.user_high_id}:
+_message_writer: MessageBatchWriter | None = None
+
+
+def _record_sent_messages(session: Session, messages: list[Message]) -> None:
+    """Pair bookkeeping for freshly flushed messages, in the caller's transaction.
+
+    Besides the inbox pointer this keeps each side's unread counter current:
+    a message bumps the recipient's counter, and sending counts as having
+    read everything before it.
+    """
+    by_pair: dict[int, list[Message]] = {}
+    for message in messages:
+        by_pair.setdefault(message.pair_id, []).append(message)
+    for pair_id, pair_messages in by_pair.items():
+        last = pair_messages[-1]
+        values: dict[str, Any] = {
+            "last_message_id": last.id,
+            "last_message_at": last.created_at,
+        }
+        members = get_pair_members(session, pair_id)
+        if members is not None:
+            for side, user_id in zip(("low", "high"), members, strict=True):
+                unread = PAIR_TABLE.c[f"user_{side}_unread_count"]
+                received = 0
+                read_up_to: int | None = None
+                for message in pair_messages:
+                    if message.sender_user_id == user_id:
+                        read_up_to, received = message.id, 0
+                    else:
+                        received += 1
+                if read_up_to is not None:
+                    values[f"user_{side}_last_read_message_id"] = read_up_to
+                    values[unread.name] = received
+                elif received:
+                    values[unread.name] = unread + received
+        session.execute(
+            update(PAIR_TABLE).where(PAIR_TABLE.c.id == pair_id).values(**values)
+        )
+    index_messages(session, messages)
+
+
+def get_message_writer() -> MessageBatchWriter:
+    global _message_writer
+    if _message_writer is None:
+        _message_writer = MessageBatchWriter(
+            _record_sent_messages,
+            max_batch=settings.MESSAGE_BATCH_MAX_SIZE,
+            max_delay_ms=settings.MESSAGE_BATCH_MAX_DELAY_MS,
+            sqlite_synchronous=settings.MESSAGE_BATCH_SQLITE_SYNCHRONOUS,
+        )
+    return _message_writer
+
+
+def close_message_writer() -> None:
+    global _message_writer
+    if _message_writer is not None:
+        _message_writer.close()
+        _message_writer = None
+
+
+def _get_participants(pair_id: int, user_id: int, session: Session) -> PairMembers:
+    members = get_pair_members(session, pair_id)
+    if members is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pair not found.",
+        )
+    if user_id not in members:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User is not part of this pair.",
         )
+    return members
 
 
 def send_message(
@@ -35,63 +110,244 @@ def send_message(
             detail="Message body cannot be empty.",
         )
 
-    pair = _get_pair(pair_id, session)
-    if pair is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Pair not found.",
-        )
-
-    _validate_participant(pair, sender_user_id)
+    participants = _get_participants(pair_id, sender_user_id, session)
 
     message = Message(
         pair_id=pair_id,
         sender_user_id=sender_user_id,
         body=body.strip(),
     )
-    session.add(message)
-    session.commit()
-    session.refresh(message)
+    if settings.MESSAGE_BATCH_ENABLED:
+        # Release this request's connection; the writer uses its own.
+        session.rollback()
+        message = get_message_writer().submit(message)
+    else:
+        session.add(message)
+        session.flush()
+        _record_sent_messages(session, [message])
+        session.commit()
+        session.refresh(message)
+
+    get_broker().publish(
+        participants,
+        {
+            "type": "message",
+            "message": MessageOut.model_validate(
+                message, from_attributes=True
+            ).model_dump(mode="json"),
+        },
+    )
     return message
 
 
-def list_messages(
+def mark_pair_read(
     pair_id: int,
-    requester_user_id: int,
-    *,
-    limit: int,
-    offset: int,
+    user_id: int,
     session: Session,
-) -> tuple[int, list[Message]]:
-    pair = _get_pair(pair_id, session)
-    if pair is None:
+    *,
+    message_id: int | None = None,
+) -> tuple[int | None, int]:
+    """Move the user's read pointer forward and recount what is still unread.
+
+    Defaults to the pair's latest message. The pointer never moves backwards;
+    the count only looks at hot messages newer than it.
+    """
+    members = _get_participants(pair_id, user_id, session)
+    if (
+        message_id is not None
+        and _locate_cursor(session, pair_id, message_id)[0] is None
+    ):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Pair not found.",
+            detail="Message not found.",
         )
-    _validate_participant(pair, requester_user_id)
-
-    message_table = cast(
-        Table,
-        Message.__table__,  # type: ignore[attr-defined]
+    side = "low" if user_id == members[0] else "high"
+    last_read = PAIR_TABLE.c[f"user_{side}_last_read_message_id"]
+    target = PAIR_TABLE.c.last_message_id if message_id is None else literal(message_id)
+    new_last_read = case(
+        (last_read.is_(None), target),
+        (target > last_read, target),
+        else_=last_read,
     )
-
-    count_statement = (
+    unread = (
         select(func.count())
-        .select_from(message_table)
-        .where(message_table.c.pair_id == pair_id)
+        .select_from(MESSAGE_TABLE)
+        .where(
+            MESSAGE_TABLE.c.pair_id == PAIR_TABLE.c.id,
+            MESSAGE_TABLE.c.sender_user_id != user_id,
+            MESSAGE_TABLE.c.id > func.coalesce(new_last_read, 0),
+        )
+        .scalar_subquery()
     )
-    total_result = session.exec(count_statement).one()
-    total_count = int(
-        total_result[0] if isinstance(total_result, tuple) else total_result
+    session.execute(
+        update(PAIR_TABLE)
+        .where(PAIR_TABLE.c.id == pair_id)
+        .values({last_read.name: new_last_read, f"user_{side}_unread_count": unread})
     )
+    session.commit()
+    row = session.exec(
+        select(last_read, PAIR_TABLE.c[f"user_{side}_unread_count"]).where(
+            PAIR_TABLE.c.id == pair_id
+        )
+    ).one()
+    return row[0], int(row[1])
+
 
+def _tier_page(
+    session: Session,
+    entity: type[Message] | type[MessageArchive],
+    pair_id: int,
+    *,
+    limit: int,
+    offset: int = 0,
+    newest_first: bool = False,
+    after: CursorKey | None = None,
+    before: CursorKey | None = None,
+) -> list[Message]:
+    table = cast(Table, entity.__table__)  # type: ignore[union-attr]
+    created_at = table.c.created_at
+    message_id = table.c.id
+    statement = select(entity).where(table.c.pair_id == pair_id)
+    if after is not None:
+        statement = statement.where(tuple_(created_at, message_id) > tuple_(*after))
+    if before is not None:
+        statement = statement.where(tuple_(created_at, message_id) < tuple_(*before))
+    direction = desc if newest_first else asc
     statement = (
-        select(Message)
-        .where(Message.pair_id == pair_id)
-        .order_by(asc(message_table.c.created_at))
+        statement.order_by(direction(created_at), direction(message_id))
         .offset(offset)
         .limit(limit)
     )
-    messages = list(session.exec(statement).all())
-    return total_count, messages
+    rows = session.exec(statement).all()
+    if entity is Message:
+        return cast(list[Message], list(rows))
+    return [
+        Message(
+            id=row.id,
+            pair_id=row.pair_id,
+            sender_user_id=row.sender_user_id,
+            body=row.body,
+            created_at=row.created_at,
+        )
+        for row in cast(list[MessageArchive], list(rows))
+    ]
+
+
+def _count(session: Session, table: Table, pair_id: int) -> int:
+    result = session.exec(
+        select(func.count()).select_from(table).where(table.c.pair_id == pair_id)
+    ).one()
+    return int(result[0] if isinstance(result, tuple) else result)
+
+
+def _locate_cursor(
+    session: Session, pair_id: int, cursor_id: int
+) -> tuple[CursorKey | None, bool]:
+    """Position of ``cursor_id`` and whether it already lives in the archive."""
+    for table, archived in ((MESSAGE_TABLE, False), (ARCHIVE_TABLE, True)):
+        row = session.exec(
+            select(table.c.created_at, table.c.id).where(
+                table.c.pair_id == pair_id,
+                table.c.id == cursor_id,
+            )
+        ).first()
+        if row is not None:
+            return (row[0], row[1]), archived
+    return None, False
+
+
+def list_messages(
+    pair_id: int,
+    requester_user_id: int,
+    *,
+    limit: int,
+    offset: int = 0,
+    session: Session,
+    after_id: int | None = None,
+    before_id: int | None = None,
+    newest_first: bool = False,
+) -> tuple[int | None, list[Message]]:
+    """Page through a pair's messages ordered by ``(created_at, id)``.
+
+    With ``after_id`` the page holds the next newer messages (oldest first); with
+    ``before_id`` it holds the next older ones (newest first). A cursor must be
+    a message of this pair, except ``after_id=0`` for the very first page; an
+    unknown one is a 404. Cursor pages skip the total count and ``offset``;
+    without a cursor the legacy offset paging applies and ``newest_first``
+    picks the direction.
+
+    Archived messages are always older than the pair's hot ones, so the archive
+    is only read once a page runs past the end of the hot range.
+    """
+    _get_participants(pair_id, requester_user_id, session)
+
+    cursor_id = after_id if after_id is not None else before_id
+    if cursor_id is not None:
+        position, archived = _locate_cursor(session, pair_id, cursor_id)
+        if position is None and cursor_id != 0:
+            # Only ``after_id=0`` (from the start) names no message.
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Message not found.",
+            )
+        messages: list[Message] = []
+        if after_id is not None:
+            if position is not None and not archived:
+                return None, _tier_page(
+                    session, Message, pair_id, limit=limit, after=position
+                )
+            messages = _tier_page(
+                session, MessageArchive, pair_id, limit=limit, after=position
+            )
+            if len(messages) < limit:
+                messages += _tier_page(
+                    session, Message, pair_id, limit=limit - len(messages)
+                )
+            return None, messages
+        if not archived:
+            messages = _tier_page(
+                session,
+                Message,
+                pair_id,
+                limit=limit,
+                newest_first=True,
+                before=position,
+            )
+        if len(messages) < limit:
+            messages += _tier_page(
+                session,
+                MessageArchive,
+                pair_id,
+                limit=limit - len(messages),
+                newest_first=True,
+                before=position if archived else None,
+            )
+        return None, messages
+
+    hot_count = _count(session, MESSAGE_TABLE, pair_id)
+    archived_count = _count(session, ARCHIVE_TABLE, pair_id)
+    tiers: list[tuple[type[Message] | type[MessageArchive], int]] = [
+        (Message, hot_count),
+        (MessageArchive, archived_count),
+    ]
+    if not newest_first:
+        tiers.reverse()
+
+    messages = []
+    skip = offset
+    for entity, size in tiers:
+        if len(messages) >= limit:
+            break
+        if skip >= size:
+            skip -= size
+            continue
+        messages += _tier_page(
+            session,
+            entity,
+            pair_id,
+            limit=limit - len(messages),
+            offset=skip,
+            newest_first=newest_first,
+        )
+        skip = 0
+    return hot_count + archived_count, messages
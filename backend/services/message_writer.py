@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+
+from sqlmodel import Session
+
+import backend.core.db as db_module
+from backend.models.message import Message
+
+FlushCallback = Callable[[Session, list[Message]], None]
+SQLITE_SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+logger = logging.getLogger(__name__)
+
+
+class MessageBatchWriter:
+    """Coalesce concurrent message inserts into one transaction per batch.
+
+    Callers block until the batch holding their message has committed, so a
+    returned message is exactly as durable as one written by a lone commit.
+    """
+
+    def __init__(
+        self,
+        on_flush: FlushCallback,
+        *,
+        max_batch: int = 64,
+        max_delay_ms: float = 5.0,
+        sqlite_synchronous: str | None = None,
+    ) -> None:
+        if sqlite_synchronous is not None:
+            sqlite_synchronous = sqlite_synchronous.strip().upper()
+            if sqlite_synchronous not in SQLITE_SYNCHRONOUS_LEVELS:
+                raise ValueError(
+                    f"invalid sqlite synchronous level: {sqlite_synchronous}"
+                )
+        self._on_flush = on_flush
+        self._max_batch = max(1, max_batch)
+        self._max_delay = max(0.0, max_delay_ms) / 1000
+        self._sqlite_synchronous = sqlite_synchronous
+        self._queue: queue.Queue[tuple[Message, Future[Message]] | None] = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def submit(self, message: Message, timeout: float | None = 30.0) -> Message:
+        """Queue ``message`` and wait for it to be committed; returns it with ids."""
+        self._ensure_started()
+        future: Future[Message] = Future()
+        self._queue.put((message, future))
+        return future.result(timeout=timeout)
+
+    def close(self) -> None:
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="message-batch-writer",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def _collect(
+        self, first: tuple[Message, Future[Message]]
+    ) -> tuple[list[tuple[Message, Future[Message]]], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self._max_delay
+        while len(batch) < self._max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = (
+                    self._queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, stopping = self._collect(first)
+            self._write(batch)
+
+    def _commit(self, messages: list[Message]) -> None:
+        # The pragma is per connection; hold one for the whole write and put
+        # the previous level back before it returns to the pool.
+        with db_module.engine.connect() as connection:
+            previous: int | None = None
+            if self._sqlite_synchronous and connection.dialect.name == "sqlite":
+                previous = connection.exec_driver_sql("PRAGMA synchronous").scalar()
+                connection.exec_driver_sql(
+                    f"PRAGMA synchronous = {self._sqlite_synchronous}"
+                )
+                connection.commit()
+            try:
+                with Session(bind=connection, expire_on_commit=False) as session:
+                    session.add_all(messages)
+                    session.flush()
+                    self._on_flush(session, messages)
+                    session.commit()
+            finally:
+                if previous is not None:
+                    connection.rollback()
+                    connection.exec_driver_sql(f"PRAGMA synchronous = {int(previous)}")
+                    connection.commit()
+
+    def _write(self, batch: list[tuple[Message, Future[Message]]]) -> None:
+        try:
+            self._commit([message for message, _ in batch])
+        except Exception as err:
+            if len(batch) > 1:
+                # Find the offending message: only its sender sees the error.
+                logger.warning(
+                    "message batch of %d failed; retrying one by one", len(batch)
+                )
+                for item in batch:
+                    item[0].id = None
+                    self._write([item])
+                return
+            logger.exception("message write failed")
+            batch[0][1].set_exception(err)
+            return
+        for message, future in batch:
+            future.set_result(message)
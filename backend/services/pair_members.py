@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from backend.core.config import settings
+from backend.models.pair import Pair
+
+PairMembers = tuple[int, int]
+
+
+class PairMemberCache:
+    """Thread-safe bounded LRU of ``pair_id -> (user_low_id, user_high_id)``."""
+
+    def __init__(self, max_size: int) -> None:
+        self._max_size = max(0, max_size)
+        self._entries: OrderedDict[int, PairMembers] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, pair_id: int) -> PairMembers | None:
+        with self._lock:
+            members = self._entries.get(pair_id)
+            if members is not None:
+                self._entries.move_to_end(pair_id)
+            return members
+
+    def put(self, pair_id: int, members: PairMembers) -> None:
+        if self._max_size == 0:
+            return
+        with self._lock:
+            self._entries[pair_id] = members
+            self._entries.move_to_end(pair_id)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, pair_id: int) -> None:
+        with self._lock:
+            self._entries.pop(pair_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+pair_member_cache = PairMemberCache(settings.PAIR_MEMBER_CACHE_SIZE)
+
+
+def get_pair_members(session: Session, pair_id: int) -> PairMembers | None:
+    """Participants of a pair, served from the LRU when possible.
+
+    Pairs never change members once created, so only deletion invalidates.
+    """
+    members = pair_member_cache.get(pair_id)
+    if members is not None:
+        return members
+    row = session.exec(
+        select(Pair.user_low_id, Pair.user_high_id).where(Pair.id == pair_id)
+    ).first()
+    if row is None:
+        return None
+    members = (int(row[0]), int(row[1]))
+    pair_member_cache.put(pair_id, members)
+    return members
+
+
+@event.listens_for(Pair, "after_delete")
+def _invalidate_deleted_pair(_mapper: Any, _connection: Any, target: Pair) -> None:
+    if target.id is not None:
+        pair_member_cache.invalidate(target.id)
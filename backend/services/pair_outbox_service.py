@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import Any, cast
+from uuid import uuid4
+
+from sqlalchemy import CursorResult, delete, or_, update
+from sqlalchemy.sql.schema import Table
+from sqlmodel import Session, select
+
+import backend.core.db as db_module
+from backend.core.config import settings
+from backend.models.pair_outbox import PairOutbox
+from backend.services.pair_service import try_create_pair_for_owners
+
+OUTBOX_TABLE = cast(Table, PairOutbox.__table__)  # type: ignore[attr-defined]
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_pair_check(
+    session: Session,
+    liker_user_id: int,
+    target_owner_id: int,
+) -> None:
+    """Stage a mutual-like check; committed together with the caller's decision."""
+    if liker_user_id == target_owner_id:
+        return
+    session.add(
+        PairOutbox(liker_user_id=liker_user_id, target_owner_id=target_owner_id)
+    )
+
+
+def claim_pair_outbox(
+    session: Session,
+    *,
+    batch_size: int,
+    worker_id: str | None = None,
+    lease_seconds: int | None = None,
+) -> list[PairOutbox]:
+    pending = OUTBOX_TABLE.c.processed_at.is_(None)
+    if worker_id is None:
+        # Row locks held until the caller commits the processed batch.
+        statement = (
+            select(PairOutbox)
+            .where(pending)
+            .order_by(OUTBOX_TABLE.c.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        return list(session.exec(statement).all())
+
+    now = datetime.utcnow()
+    lease = lease_seconds or settings.PAIR_OUTBOX_LEASE_SECONDS
+    claimable = pending & or_(
+        OUTBOX_TABLE.c.lease_expires_at.is_(None),
+        OUTBOX_TABLE.c.lease_expires_at < now,
+    )
+    candidate_ids = (
+        select(OUTBOX_TABLE.c.id)
+        .where(claimable)
+        .order_by(OUTBOX_TABLE.c.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    session.execute(
+        update(OUTBOX_TABLE)
+        .where(OUTBOX_TABLE.c.id.in_(candidate_ids.scalar_subquery()), claimable)
+        .values(lease_owner=worker_id, lease_expires_at=now + timedelta(seconds=lease))
+    )
+    session.commit()
+
+    statement = (
+        select(PairOutbox)
+        .where(pending, OUTBOX_TABLE.c.lease_owner == worker_id)
+        .order_by(OUTBOX_TABLE.c.id)
+    )
+    return list(session.exec(statement).all())
+
+
+def process_pair_outbox_batch(
+    session: Session,
+    *,
+    batch_size: int | None = None,
+    use_leases: bool | None = None,
+) -> int:
+    """Run mutual-like detection for one batch of outbox rows.
+
+    Rows for the same two owners are checked once. Pairs are only flushed and
+    the whole batch commits once, so claimed rows stay locked until they are
+    marked processed. Pair creation is idempotent, so a row replayed after a
+    crash or an expired lease is harmless.
+    """
+    leased = settings.PAIR_OUTBOX_USE_LEASES if use_leases is None else use_leases
+    events = claim_pair_outbox(
+        session,
+        batch_size=batch_size or settings.PAIR_OUTBOX_BATCH_SIZE,
+        worker_id=uuid4().hex if leased else None,
+    )
+    if not events:
+        return 0
+
+    event_ids: dict[frozenset[int], list[int]] = {}
+    owners: dict[frozenset[int], tuple[int, int]] = {}
+    for event in events:
+        key = frozenset((event.liker_user_id, event.target_owner_id))
+        event_ids.setdefault(key, []).append(cast(int, event.id))
+        owners.setdefault(key, (event.liker_user_id, event.target_owner_id))
+
+    for key, ids in event_ids.items():
+        liker_user_id, target_owner_id = owners[key]
+        pair = try_create_pair_for_owners(
+            session=session,
+            liker_user_id=liker_user_id,
+            target_owner_id=target_owner_id,
+            commit=False,
+        )
+        session.execute(
+            update(OUTBOX_TABLE)
+            .where(OUTBOX_TABLE.c.id.in_(ids))
+            .values(
+                processed_at=datetime.utcnow(),
+                pair_id=None if pair is None else pair.id,
+            )
+        )
+    session.commit()
+    return len(events)
+
+
+def prune_pair_outbox(
+    session: Session,
+    *,
+    retention_seconds: int | None = None,
+) -> int:
+    """Delete rows processed longer than the retention period ago."""
+    if retention_seconds is None:
+        retention_seconds = settings.PAIR_OUTBOX_RETENTION_SECONDS
+    cutoff = datetime.utcnow() - timedelta(seconds=retention_seconds)
+    result = cast(
+        CursorResult[Any],
+        session.execute(
+            delete(OUTBOX_TABLE).where(OUTBOX_TABLE.c.processed_at < cutoff)
+        ),
+    )
+    pruned = result.rowcount
+    session.commit()
+    return pruned
+
+
+class PairOutboxWorker:
+    """Background task draining the pair outbox inside the API process."""
+
+    def __init__(self, poll_seconds: float | None = None) -> None:
+        self._poll_seconds = poll_seconds or settings.PAIR_OUTBOX_POLL_SECONDS
+        self._task: asyncio.Task[None] | None = None
+        self._next_prune = 0.0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    @staticmethod
+    def _drain_once() -> int:
+        with Session(db_module.engine) as session:
+            return process_pair_outbox_batch(session)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                processed = await asyncio.to_thread(self._drain_once)
+            except Exception:  # pragma: no cover - keep the worker alive
+                logger.exception("pair outbox batch failed")
+                processed = 0
+            if not processed:
+                await self._prune_when_due()
+                await asyncio.sleep(self._poll_seconds)
+
+    async def _prune_when_due(self) -> None:
+        now = time.monotonic()
+        if now < self._next_prune:
+            return
+        self._next_prune = now + settings.PAIR_OUTBOX_PRUNE_INTERVAL_SECONDS
+        try:
+            await asyncio.to_thread(self._prune_once)
+        except Exception:  # pragma: no cover - retried at the next interval
+            logger.exception("pair outbox prune failed")
+
+    @staticmethod
+    def _prune_once() -> int:
+        with Session(db_module.engine) as session:
+            return prune_pair_outbox(session)
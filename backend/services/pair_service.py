@@ -1,12 +1,27 @@
 # mypy: ignore-errors
 from __future__ import annotations
 
-from typing import Any, cast
+from collections.abc import Iterable
+from typing import Any
 
-from sqlalchemy import select
+from sqlalchemy import (
+    case,
+    delete,
+    desc,
+    func,
+    insert,
+    or_,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
 from sqlmodel import Session
 
+from backend.models.like_edge import LikeEdge
 from backend.models.match import Match, MatchDecision
+from backend.models.message import Message
 from backend.models.pair import Pair
 from backend.models.pet import Pet
 
@@ -15,26 +30,96 @@ def _sorted_users(a_user_id: int, b_user_id: int) -> tuple[int, int]:
     return (a_user_id, b_user_id) if a_user_id < b_user_id else (b_user_id, a_user_id)
 
 
-def _pet_ids_for_owner(session: Session, owner_user_id: int) -> set[int]:
-    stmt: Any = select(Pet.id).where(Pet.owner_id == owner_user_id)
-    pet_ids = session.exec(stmt).scalars().all()
-    return {int(pet_id) for pet_id in pet_ids if pet_id is not None}
+def _is_mutual_like(session: Session, a_user_id: int, b_user_id: int) -> bool:
+    stmt: Any = select(func.count()).where(
+        or_(
+            (LikeEdge.liker_user_id == a_user_id)
+            & (LikeEdge.target_owner_id == b_user_id),
+            (LikeEdge.liker_user_id == b_user_id)
+            & (LikeEdge.target_owner_id == a_user_id),
+        ),
+        LikeEdge.like_count > 0,
+    )
+    return int(session.exec(stmt).scalar() or 0) == 2
+
+
+def record_like_change(
+    session: Session,
+    liker_user_id: int,
+    target_owner_id: int,
+    delta: int,
+) -> None:
+    """Adjust the liker -> owner edge inside the caller's transaction.
 
+    The count is bumped in SQL so concurrent decisions never overwrite each
+    other; a missing edge is inserted, or bumped if another one won the race.
+    """
+    if delta == 0 or liker_user_id == target_owner_id:
+        return
 
-def _liked_pet_ids(session: Session, owner_user_id: int) -> set[int]:
-    stmt: Any = select(Match.target_pet_id).where(
-        Match.owner_user_id == owner_user_id,
-        Match.decision == MatchDecision.liked,
+    adjusted = LikeEdge.like_count + delta
+    bump = (
+        update(LikeEdge)
+        .where(
+            LikeEdge.liker_user_id == liker_user_id,
+            LikeEdge.target_owner_id == target_owner_id,
+        )
+        .values(like_count=case((adjusted < 0, 0), else_=adjusted))
+        .execution_options(synchronize_session=False)
     )
-    target_ids = session.exec(stmt).scalars().all()
-    return {int(target_id) for target_id in target_ids if target_id is not None}
+    if session.execute(bump).rowcount or delta < 0:
+        return
+    try:
+        with session.begin_nested():
+            session.execute(
+                insert(LikeEdge).values(
+                    liker_user_id=liker_user_id,
+                    target_owner_id=target_owner_id,
+                    like_count=delta,
+                )
+            )
+    except IntegrityError:
+        # Another decision created the edge first.
+        session.execute(bump)
 
 
-def upsert_pair_for_users(
+def rebuild_like_edges(session: Session) -> int:
+    """Recompute every like edge from the match table and return the row count."""
+    like_counts: Any = (
+        select(
+            Match.owner_user_id,
+            Pet.owner_id,
+            func.count(),
+        )
+        .join(Pet, Pet.id == Match.target_pet_id)
+        .where(
+            Match.decision == MatchDecision.liked,
+            Match.owner_user_id != Pet.owner_id,
+        )
+        .group_by(Match.owner_user_id, Pet.owner_id)
+    )
+    session.execute(delete(LikeEdge))
+    session.execute(
+        insert(LikeEdge).from_select(
+            ["liker_user_id", "target_owner_id", "like_count"],
+            like_counts,
+        )
+    )
+    session.commit()
+    total: Any = select(func.count()).select_from(LikeEdge)
+    return int(session.exec(total).scalar() or 0)
+
+
+def ensure_pair_for_users(
     session: Session,
     a_user_id: int,
     b_user_id: int,
 ) -> Pair | None:
+    """Find or create the pair inside the caller's transaction, without committing.
+
+    A pair inserted concurrently by another transaction is returned as if it
+    had been found.
+    """
     if a_user_id == b_user_id:
         return None
 
@@ -42,14 +127,29 @@ def upsert_pair_for_users(
     existing_stmt: Any = (
         select(Pair).where(Pair.user_low_id == low).where(Pair.user_high_id == high)
     )
-    existing = cast(Pair | None, session.exec(existing_stmt).first())
+    existing = session.execute(existing_stmt).scalars().first()
     if existing is not None:
         return existing
 
     pair = Pair(user_low_id=low, user_high_id=high)
-    session.add(pair)
-    session.commit()
-    session.refresh(pair)
+    try:
+        with session.begin_nested():
+            session.add(pair)
+    except IntegrityError:
+        # uq_pair_users: another worker created it first.
+        return session.execute(existing_stmt).scalars().first()
+    return pair
+
+
+def upsert_pair_for_users(
+    session: Session,
+    a_user_id: int,
+    b_user_id: int,
+) -> Pair | None:
+    pair = ensure_pair_for_users(session, a_user_id, b_user_id)
+    if pair is not None:
+        session.commit()
+        session.refresh(pair)
     return pair
 
 
@@ -62,54 +162,206 @@ def try_create_pair_on_mutual_like(
     if pet is None or pet.owner_id == liker_user_id:
         return None
 
-    target_owner_id = pet.owner_id
+    return try_create_pair_for_owners(
+        session=session,
+        liker_user_id=liker_user_id,
+        target_owner_id=pet.owner_id,
+    )
+
+
+def try_create_pair_for_owners(
+    session: Session,
+    liker_user_id: int,
+    target_owner_id: int,
+    *,
+    commit: bool = True,
+) -> Pair | None:
+    """Pair two owners who like each other's pets.
 
-    liker_liked_targets = _liked_pet_ids(session, liker_user_id)
-    target_owner_pets = _pet_ids_for_owner(session, target_owner_id)
-    if not liker_liked_targets.intersection(target_owner_pets):
+    With ``commit=False`` the pair is only flushed, for callers that commit a
+    larger unit of work themselves.
+    """
+    if liker_user_id == target_owner_id:
         return None
 
-    target_liked_targets = _liked_pet_ids(session, target_owner_id)
-    liker_pets = _pet_ids_for_owner(session, liker_user_id)
-    if not target_liked_targets.intersection(liker_pets):
+    if not _is_mutual_like(session, liker_user_id, target_owner_id):
         return None
 
-    return upsert_pair_for_users(
+    upsert = upsert_pair_for_users if commit else ensure_pair_for_users
+    return upsert(
         session=session,
         a_user_id=liker_user_id,
         b_user_id=target_owner_id,
     )
 
 
+def find_pair_partner_ids(
+    session: Session,
+    user_id: int,
+    candidate_user_ids: Iterable[int],
+) -> set[int]:
+    candidates = {int(candidate) for candidate in candidate_user_ids}
+    candidates.discard(user_id)
+    if not candidates:
+        return set()
+
+    stmt: Any = select(Pair.user_low_id, Pair.user_high_id).where(
+        or_(
+            (Pair.user_low_id == user_id) & Pair.user_high_id.in_(candidates),
+            (Pair.user_high_id == user_id) & Pair.user_low_id.in_(candidates),
+        )
+    )
+    partners: set[int] = set()
+    for low_id, high_id in session.exec(stmt).all():
+        partners.add(int(high_id if low_id == user_id else low_id))
+    return partners
+
+
+def _pair_branch(user_id: int, *, side: str, before_id: int | None) -> Any:
+    own_column = Pair.user_low_id if side == "low" else Pair.user_high_id
+    other_column = Pair.user_high_id if side == "low" else Pair.user_low_id
+    stmt: Any = select(
+        Pair.id.label("id"),
+        other_column.label("other_user_id"),
+        Pair.created_at.label("created_at"),
+    ).where(own_column == user_id)
+    if before_id is not None:
+        cursor_created_at = (
+            select(Pair.created_at).where(Pair.id == before_id).scalar_subquery()
+        )
+        stmt = stmt.where(
+            or_(
+                Pair.created_at < cursor_created_at,
+                (Pair.created_at == cursor_created_at) & (Pair.id < before_id),
+            )
+        )
+    return stmt
+
+
 def list_pairs_for_user(
     session: Session,
     user_id: int,
     *,
     limit: int,
-    offset: int,
+    offset: int = 0,
+    before_id: int | None = None,
 ) -> tuple[list[dict[str, object]], int]:
-    pairs_stmt: Any = select(Pair)
-    pairs = cast(list[Pair], session.exec(pairs_stmt).scalars().all())
-    filtered = [
-        pair
-        for pair in pairs
-        if pair.user_low_id == user_id or pair.user_high_id == user_id
+    """List pairs newest first.
+
+    Pass the last seen pair id as ``before_id`` to page by keyset instead of offset.
+    """
+    window = offset + limit
+    branches = []
+    for side in ("low", "high"):
+        branch = _pair_branch(user_id, side=side, before_id=before_id)
+        branch = branch.order_by(desc(Pair.created_at), desc(Pair.id)).limit(window)
+        branches.append(select(branch.subquery()))
+    combined = union_all(*branches).subquery()
+    page_stmt: Any = (
+        select(combined.c.id, combined.c.other_user_id, combined.c.created_at)
+        .order_by(desc(combined.c.created_at), desc(combined.c.id))
+        .offset(offset)
+        .limit(limit)
+    )
+    items: list[dict[str, object]] = [
+        {"id": pair_id, "other_user_id": other_user_id, "created_at": created_at}
+        for pair_id, other_user_id, created_at in session.exec(page_stmt).all()
     ]
-    filtered.sort(key=lambda pair: pair.created_at, reverse=True)
-    total_count = len(filtered)
 
-    page = filtered[offset : offset + limit]
+    count_stmt: Any = select(
+        select(func.count()).where(Pair.user_low_id == user_id).scalar_subquery()
+        + select(func.count()).where(Pair.user_high_id == user_id).scalar_subquery()
+    )
+    total_count = int(session.exec(count_stmt).scalar() or 0)
+    return items, total_count
 
-    items: list[dict[str, object]] = []
-    for pair in page:
-        other_user_id = (
-            pair.user_high_id if pair.user_low_id == user_id else pair.user_low_id
+
+def list_inbox_for_user(
+    session: Session,
+    user_id: int,
+    *,
+    limit: int,
+    before_id: int | None = None,
+) -> list[dict[str, object]]:
+    """List pairs by last activity with a last-message preview, in one statement.
+
+    Unread counts come from the per-participant counters kept on the pair.
+    """
+    activity = func.coalesce(Pair.last_message_at, Pair.created_at)
+    is_low = Pair.user_low_id == user_id
+    other_user_id = case((is_low, Pair.user_high_id), else_=Pair.user_low_id)
+    last_read_message_id = case(
+        (is_low, Pair.user_low_last_read_message_id),
+        else_=Pair.user_high_last_read_message_id,
+    )
+    unread_count = case(
+        (is_low, Pair.user_low_unread_count),
+        else_=Pair.user_high_unread_count,
+    )
+    stmt: Any = (
+        select(
+            Pair.id,
+            other_user_id,
+            Pair.created_at,
+            Pair.last_message_id,
+            Message.body,
+            Pair.last_message_at,
+            last_read_message_id,
+            unread_count,
+        )
+        .outerjoin(Message, Message.id == Pair.last_message_id)
+        .where(or_(Pair.user_low_id == user_id, Pair.user_high_id == user_id))
+    )
+    if before_id is not None:
+        cursor: Any = aliased(Pair)
+        cursor_activity = (
+            select(func.coalesce(cursor.last_message_at, cursor.created_at))
+            .where(cursor.id == before_id)
+            .scalar_subquery()
+        )
+        stmt = stmt.where(
+            or_(
+                activity < cursor_activity,
+                (activity == cursor_activity) & (Pair.id < before_id),
+            )
         )
+    stmt = stmt.order_by(desc(activity), desc(Pair.id)).limit(limit)
+
+    items: list[dict[str, object]] = []
+    for row in session.exec(stmt).all():
+        (
+            pair_id,
+            other_id,
+            created_at,
+            last_id,
+            last_body,
+            last_at,
+            last_read_id,
+            unread,
+        ) = row
         items.append(
             {
-                "id": pair.id,
-                "other_user_id": other_user_id,
-                "created_at": pair.created_at,
+                "id": pair_id,
+                "other_user_id": other_id,
+                "created_at": created_at,
+                "last_message_id": last_id,
+                "last_message_body": last_body,
+                "last_message_at": last_at,
+                "last_read_message_id": last_read_id,
+                "unread_count": int(unread or 0),
             }
         )
-    return items, total_count
+    return items
+
+
+def count_unread_for_user(session: Session, user_id: int) -> int:
+    """Badge total: the user's unread counters summed over both pair indexes."""
+    stmt: Any = select(
+        select(func.coalesce(func.sum(Pair.user_low_unread_count), 0))
+        .where(Pair.user_low_id == user_id)
+        .scalar_subquery()
+        + select(func.coalesce(func.sum(Pair.user_high_unread_count), 0))
+        .where(Pair.user_high_id == user_id)
+        .scalar_subquery()
+    )
+    return int(session.exec(stmt).scalar() or 0)
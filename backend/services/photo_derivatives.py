@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import suppress
+from threading import Lock
+from typing import Any, cast
+from uuid import uuid4
+
+from sqlalchemy import update
+from sqlalchemy.sql.schema import Table
+from sqlmodel import Session, select
+
+import backend.core.db as db_module
+from backend.core.config import settings
+from backend.models.photo import Photo
+from backend.services.media_storage import get_media_storage, storage_from_config
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_EXTENSIONS: dict[str, str] = {"webp": ".webp", "jpeg": ".jpg"}
+DERIVATIVE_CONTENT_TYPES: dict[str, str] = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = Lock()
+
+
+def derivative_filename(filename: str, size: int, fmt: str) -> str:
+    """``12_ab34.png`` -> ``12_ab34_200.webp``, next to the original."""
+    stem, _, _ = filename.rpartition(".")
+    return f"{stem or filename}_{size}{DERIVATIVE_EXTENSIONS[fmt]}"
+
+
+def render_derivatives(
+    storage_config: dict[str, Any],
+    filename: str,
+    sizes: tuple[int, ...],
+    fmt: str,
+    quality: int,
+) -> dict[str, str]:
+    """Resize one original into each bounding box; runs in a pool process."""
+    from PIL import Image, ImageOps
+
+    storage = storage_from_config(storage_config)
+    rendered: dict[str, str] = {}
+    with storage.local_copy(filename) as source, Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        for size in sizes:
+            resized = image.copy()
+            resized.thumbnail((size, size))
+            name = derivative_filename(filename, size, fmt)
+            # Render beside the source so a local move stays on one filesystem.
+            scratch = source.parent / f".{uuid4().hex}.part"
+            try:
+                resized.save(scratch, format=fmt.upper(), quality=quality)
+                storage.put_file(name, scratch, DERIVATIVE_CONTENT_TYPES[fmt])
+            finally:
+                scratch.unlink(missing_ok=True)
+            rendered[str(size)] = name
+    return rendered
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PHOTO_DERIVATIVE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def close_derivative_pool() -> None:
+    """Finish running jobs and drop queued ones; used on shutdown."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _record_derivatives(filename: str, future: Future[dict[str, str]]) -> None:
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.warning("derivatives for %s failed: %s", filename, error)
+        return
+    rendered = future.result()
+    photo_table = cast(Table, Photo.__table__)  # type: ignore[attr-defined]
+    try:
+        with Session(db_module.engine) as session:
+            # Every photo sharing the stored file gets the same derivatives.
+            session.execute(
+                update(photo_table)
+                .where(
+                    photo_table.c.filename == filename,
+                    photo_table.c.derivatives.is_(None),
+                )
+                .values(derivatives=rendered)
+            )
+            session.commit()
+            in_use = session.exec(
+                select(photo_table.c.id)
+                .where(photo_table.c.filename == filename)
+                .limit(1)
+            ).first()
+    except Exception:
+        logger.exception("recording derivatives for %s failed", filename)
+        return
+    if in_use is None:
+        # The last photo using the file went away while rendering.
+        storage = get_media_storage()
+        for name in rendered.values():
+            with suppress(Exception):
+                storage.delete(name)
+
+
+def schedule_derivatives(filename: str) -> Future[dict[str, str]] | None:
+    """Queue derivative rendering for a stored file without waiting for it."""
+    sizes = tuple(sorted(set(settings.PHOTO_DERIVATIVE_SIZES)))
+    if not sizes:
+        return None
+    future = _get_pool().submit(
+        render_derivatives,
+        get_media_storage().worker_config(),
+        filename,
+        sizes,
+        settings.PHOTO_DERIVATIVE_FORMAT,
+        settings.PHOTO_DERIVATIVE_QUALITY,
+    )
+    future.add_done_callback(lambda done: _record_derivatives(filename, done))
+    return future
@@ -1,40 +1,47 @@
 from __future__ import annotations
 
-from collections.abc import Iterable
+import logging
+import re
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
-from pathlib import Path
-from typing import cast
-from uuid import uuid4
+from dataclasses import dataclass
+from typing import Any, cast
 
-from fastapi import HTTPException, UploadFile, status
-from sqlalchemy import desc, func
+from fastapi import HTTPException, status
+from sqlalchemy import ColumnElement, delete, desc, func, text, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql.schema import Table
 from sqlmodel import Session, select
 
 from backend.core.config import settings
+from backend.core.security import create_scoped_token, decode_token
+from backend.models.media_blob import MediaBlob
 from backend.models.pet import Pet
-from backend.models.photo import Photo
+from backend.models.photo import PRIMARY_PHOTO_CONSTRAINT, Photo
+from backend.services.image_probe import ImageSniffer
+from backend.services.media_storage import (
+    MEDIA_PUT_TOKEN_TYPE,
+    LocalMediaStorage,
+    PresignedUpload,
+    build_media_url,
+    get_media_storage,
+    shard_key,
+)
+from backend.services.photo_derivatives import schedule_derivatives
+from backend.services.photo_upload import StagedUpload
 
-CHUNK_SIZE = 1024 * 1024  # 1MB chunks for streaming large files
 CONTENT_TYPE_EXTENSIONS: dict[str, str] = {
     "image/jpeg": ".jpg",
     "image/png": ".png",
     "image/webp": ".webp",
 }
 PHOTO_TABLE = cast(Table, Photo.__table__)  # type: ignore[attr-defined]
+BLOB_TABLE = cast(Table, MediaBlob.__table__)  # type: ignore[attr-defined]
+SHA256_RE = re.compile(r"[0-9a-f]{64}")
+UPLOAD_TOKEN_TYPE = "photo-upload"
 
-
-def ensure_media_dir() -> Path:
-    media_path = Path(settings.MEDIA_DIR)
-    media_path.mkdir(parents=True, exist_ok=True)
-    return media_path
-
-
-def _build_photo_url(filename: str) -> str:
-    base = settings.MEDIA_BASE_URL.rstrip("/")
-    if not base:
-        return f"/{filename}"
-    return f"{base}/{filename}"
+logger = logging.getLogger(__name__)
 
 
 def _validate_pet_exists(session: Session, pet_id: int) -> Pet:
@@ -47,7 +54,142 @@ def _validate_pet_exists(session: Session, pet_id: int) -> Pet:
     return pet
 
 
-def save_photo(session: Session, pet_id: int, file: UploadFile) -> Photo:
+def _acquire_blob(
+    session: Session, sha256: str, filename: str, content_type: str, size: int
+) -> tuple[bool, str]:
+    """Take a reference on the blob for ``sha256``.
+
+    Returns whether the blob is new and the key its file is stored under,
+    which for an existing blob may predate the current layout.
+    """
+    bump = (
+        update(BLOB_TABLE)
+        .where(BLOB_TABLE.c.sha256 == sha256)
+        .values(ref_count=BLOB_TABLE.c.ref_count + 1)
+        .returning(BLOB_TABLE.c.filename)
+    )
+    stored = session.execute(bump).scalar_one_or_none()
+    if stored is not None:
+        return False, stored
+    try:
+        with session.begin_nested():
+            session.add(
+                MediaBlob(
+                    sha256=sha256,
+                    filename=filename,
+                    mime_type=content_type,
+                    size_bytes=size,
+                    ref_count=1,
+                )
+            )
+    except IntegrityError:
+        # Another upload of the same bytes created it first.
+        return False, session.execute(bump).scalar_one()
+    return True, filename
+
+
+def _blob_key(session: Session, sha256: str, content_type: str) -> str:
+    """Storage key for content ``sha256``: where it is, or where it will go."""
+    stored = session.exec(
+        select(BLOB_TABLE.c.filename).where(BLOB_TABLE.c.sha256 == sha256)
+    ).first()
+    if stored is not None:
+        return cast(str, stored[0] if isinstance(stored, tuple) else stored)
+    return shard_key(f"{sha256}{_photo_extension(content_type)}")
+
+
+def _release_blob(session: Session, sha256: str) -> bool:
+    """Drop one reference; returns whether it was the last one.
+
+    The emptied row is left for ``remove_released_media`` to delete together
+    with the files.
+    """
+    remaining = session.execute(
+        update(BLOB_TABLE)
+        .where(BLOB_TABLE.c.sha256 == sha256)
+        .values(ref_count=BLOB_TABLE.c.ref_count - 1)
+        .returning(BLOB_TABLE.c.ref_count)
+    ).scalar_one_or_none()
+    return remaining is None or remaining <= 0
+
+
+def remove_released_media(session: Session, keys: Sequence[str]) -> None:
+    """Delete the files ``discard_photo`` released, after its commit.
+
+    ``keys`` is the original followed by its derivatives. The original's blob
+    row is deleted in the same transaction, before the files are. That locks
+    the row, so an upload of the same bytes waits, then finds no blob and
+    stores its file again. If an upload took a new reference first, nothing is
+    deleted.
+    """
+    if not keys:
+        return
+    original = keys[0]
+    try:
+        released = session.execute(
+            delete(BLOB_TABLE)
+            .where(BLOB_TABLE.c.filename == original, BLOB_TABLE.c.ref_count <= 0)
+            .returning(BLOB_TABLE.c.sha256)
+        ).first()
+        in_use = (
+            released is None
+            and session.execute(
+                select(BLOB_TABLE.c.sha256).where(BLOB_TABLE.c.filename == original)
+            ).first()
+            is not None
+        )
+        if not in_use:
+            storage = get_media_storage()
+            for key in keys:
+                with suppress(Exception):  # pragma: no cover - best effort cleanup
+                    storage.delete(key)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+
+def _sibling_derivatives(session: Session, filename: str) -> dict[str, str] | None:
+    return session.exec(
+        select(PHOTO_TABLE.c.derivatives)
+        .where(
+            PHOTO_TABLE.c.filename == filename,
+            PHOTO_TABLE.c.derivatives.is_not(None),
+        )
+        .limit(1)
+    ).first()
+
+
+def _photo_extension(content_type: str) -> str:
+    extension = CONTENT_TYPE_EXTENSIONS.get(content_type)
+    if content_type not in settings.PHOTO_ALLOWED or not extension:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="unsupported photo type",
+        )
+    return extension
+
+
+@dataclass(frozen=True)
+class _PhotoContent:
+    sha256: str
+    content_type: str
+    size: int
+    width: int
+    height: int
+
+
+def _record_photos(
+    session: Session, pet_id: int, contents: Sequence[_PhotoContent]
+) -> list[Photo]:
+    """Create the photo rows for content stored (or about to be) by hash.
+
+    Identical bytes share one file, keyed by ``<sha256>.<ext>``, counted in
+    ``media_blob``; a duplicate only takes another reference and reuses the
+    derivatives already rendered for it. All rows go in one transaction and,
+    if the pet has no primary photo yet, the first one becomes it. Callers
+    put the bytes into storage once this has committed.
+    """
     pet = _validate_pet_exists(session, pet_id)
     pet_identifier = pet.id
     if pet_identifier is None:
@@ -56,71 +198,244 @@ def save_photo(session: Session, pet_id: int, file: UploadFile) -> Photo:
             detail="pet missing identifier",
         )
 
-    content_type = (file.content_type or "").lower()
-    if content_type not in settings.PHOTO_ALLOWED:
+    photos: list[Photo] = []
+    try:
+        for content in contents:
+            key = shard_key(f"{content.sha256}{_photo_extension(content.content_type)}")
+            created, filename = _acquire_blob(
+                session, content.sha256, key, content.content_type, content.size
+            )
+            photos.append(
+                Photo(
+                    pet_id=pet_identifier,
+                    filename=filename,
+                    mime_type=content.content_type,
+                    size_bytes=content.size,
+                    sha256=content.sha256,
+                    width=content.width,
+                    height=content.height,
+                    url=build_media_url(filename),
+                    derivatives=(
+                        None if created else _sibling_derivatives(session, filename)
+                    ),
+                )
+            )
+
+        session.add_all(photos)
+        session.flush()
+        if photos:
+            _claim_primary(session, pet_identifier, cast(int, photos[0].id))
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    for photo in photos:
+        session.refresh(photo)
+    return photos
+
+
+def _claim_primary(session: Session, pet_id: int, photo_id: int) -> None:
+    """Make ``photo_id`` primary if the pet has none yet.
+
+    Two uploads racing for an empty pet both pass the ``NOT EXISTS``; the
+    unique index then rejects the later one, which keeps its photo as a
+    regular one instead of failing the upload.
+    """
+    other = PHOTO_TABLE.alias("other")
+    has_primary = (
+        select(other.c.id)
+        .where(other.c.pet_id == pet_id, other.c.is_primary.is_(True))
+        .exists()
+    )
+    try:
+        with session.begin_nested():
+            session.execute(
+                update(PHOTO_TABLE)
+                .where(PHOTO_TABLE.c.id == photo_id, ~has_primary)
+                .values(is_primary=True)
+            )
+    except IntegrityError:
+        pass
+
+
+def _schedule_missing_derivatives(photos: Iterable[Photo]) -> None:
+    for filename in {photo.filename for photo in photos if photo.derivatives is None}:
+        try:
+            schedule_derivatives(filename)
+        except Exception:  # pragma: no cover - the original is still usable
+            logger.exception("could not schedule derivatives for %s", filename)
+
+
+def _place_staged(staged: StagedUpload, filename: str) -> None:
+    # Runs after the commit. The file is stored even when the key already
+    # exists: the content is identical and the write atomic, whereas checking
+    # first could skip it just before remove_released_media deleted it.
+    get_media_storage().put_file(filename, staged.path, staged.content_type)
+
+
+def save_photos(
+    session: Session, pet_id: int, staged: Sequence[StagedUpload]
+) -> list[Photo]:
+    """Record streamed uploads and move their staging files into storage.
+
+    The rows are committed together; the files are then placed concurrently,
+    which matters when ``put_file`` is a network upload.
+    """
+    try:
+        photos = _record_photos(
+            session,
+            pet_id,
+            [
+                _PhotoContent(
+                    sha256=upload.sha256,
+                    content_type=upload.content_type,
+                    size=upload.size,
+                    width=cast(int, upload.width),
+                    height=cast(int, upload.height),
+                )
+                for upload in staged
+            ],
+        )
+        filenames = [photo.filename for photo in photos]
+        if len(staged) == 1:
+            _place_staged(staged[0], filenames[0])
+        else:
+            workers = min(len(staged), settings.PHOTO_UPLOAD_CONCURRENCY)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(_place_staged, staged, filenames))
+    finally:
+        for upload in staged:
+            upload.discard()
+    _schedule_missing_derivatives(photos)
+    return photos
+
+
+def save_photo(session: Session, pet_id: int, staged: StagedUpload) -> Photo:
+    """Record a streamed upload and move its staging file into storage."""
+    return save_photos(session, pet_id, [staged])[0]
+
+
+def _decode_grant(token: str, token_type: str) -> dict[str, Any]:
+    try:
+        claims = decode_token(token)
+    except Exception as exc:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="unsupported photo type",
+            detail="invalid or expired upload token",
+        ) from exc
+    if claims.get("typ") != token_type:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="invalid or expired upload token",
         )
+    return claims
 
-    extension = CONTENT_TYPE_EXTENSIONS.get(content_type)
-    if not extension:
+
+def start_direct_upload(
+    session: Session,
+    pet_id: int,
+    *,
+    content_type: str,
+    size: int,
+    sha256: str,
+) -> tuple[str, PresignedUpload | None]:
+    """Issue an upload ticket plus, unless the bytes are already stored, a
+    presigned request that sends them straight to storage."""
+    _validate_pet_exists(session, pet_id)
+    content_type = content_type.strip().lower()
+    _photo_extension(content_type)
+    if not SHA256_RE.fullmatch(sha256):
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="unsupported photo type",
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="sha256 must be 64 lowercase hex characters",
+        )
+    if not 0 < size <= settings.PHOTO_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail="photo too large",
         )
-    media_path = ensure_media_dir()
-    unique_name = f"{pet_id}_{uuid4().hex}{extension}"
-    destination = media_path / unique_name
 
-    size = 0
-    try:
-        with destination.open("wb") as buffer:
-            while True:
-                chunk = file.file.read(CHUNK_SIZE)
-                if not chunk:
-                    break
-                size += len(chunk)
-                if size > settings.PHOTO_MAX_BYTES:
-                    raise HTTPException(
-                        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
-                        detail="photo too large",
-                    )
-                buffer.write(chunk)
-    except HTTPException:
-        destination.unlink(missing_ok=True)
-        raise
-    finally:
-        file.file.close()
-
-    photo = Photo(
-        pet_id=pet_identifier,
-        filename=unique_name,
-        mime_type=content_type,
-        size_bytes=size,
-        url=_build_photo_url(unique_name),
+    storage = get_media_storage()
+    filename = _blob_key(session, sha256, content_type)
+    presigned = None
+    if storage.size(filename) != size:
+        presigned = storage.presign_upload(
+            filename, content_type=content_type, size=size, sha256=sha256
+        )
+    ticket = create_scoped_token(
+        {
+            "typ": UPLOAD_TOKEN_TYPE,
+            "pet": pet_id,
+            "sha": sha256,
+            "ct": content_type,
+            "size": size,
+        },
+        seconds=settings.MEDIA_UPLOAD_URL_TTL_SECONDS,
     )
+    return ticket, presigned
 
-    existing_primary = session.exec(
-        select(PHOTO_TABLE.c.id)
-        .where(
-            PHOTO_TABLE.c.pet_id == pet_identifier,
-            PHOTO_TABLE.c.is_primary.is_(True),
+
+def finalize_direct_upload(session: Session, pet_id: int, ticket: str) -> Photo:
+    """Create the photo row once the client's direct upload has landed."""
+    claims = _decode_grant(ticket, UPLOAD_TOKEN_TYPE)
+    if claims.get("pet") != pet_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="upload token is for another pet",
         )
-        .limit(1)
-    ).first()
-    if existing_primary is None:
-        photo.is_primary = True
+    sha256, content_type, size = claims["sha"], claims["ct"], claims["size"]
+    storage = get_media_storage()
+    key = _blob_key(session, sha256, content_type)
+    if storage.size(key) != size:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="upload not received",
+        )
+    # Storage already checked the hash; the header tells type and dimensions.
+    # Objects rejected here are left for the orphan sweep.
+    sniffer = ImageSniffer()
+    sniffer.feed(storage.read_head(key, settings.PHOTO_SNIFF_MAX_BYTES))
+    image = sniffer.result()
+    if image.content_type != content_type:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="photo content does not match its type",
+        )
+    photos = _record_photos(
+        session,
+        pet_id,
+        [_PhotoContent(sha256, content_type, size, image.width, image.height)],
+    )
+    _schedule_missing_derivatives(photos)
+    return photos[0]
 
-    session.add(photo)
+
+def open_media_put(token: str) -> dict[str, Any]:
+    """Claims of a local-storage presigned PUT (see ``LocalMediaStorage``)."""
+    if not isinstance(get_media_storage(), LocalMediaStorage):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="direct uploads go to the storage service",
+        )
+    return _decode_grant(token, MEDIA_PUT_TOKEN_TYPE)
+
+
+def store_media_put(claims: dict[str, Any], staged: StagedUpload) -> None:
+    """Keep a presigned PUT body only if it is exactly the promised bytes."""
     try:
-        session.commit()
-    except Exception:
-        session.rollback()
-        destination.unlink(missing_ok=True)
-        raise
-    session.refresh(photo)
-    return photo
+        if (
+            staged.sha256 != claims["sha"]
+            or staged.size != claims["size"]
+            or staged.content_type != claims["ct"]
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="uploaded bytes do not match the upload grant",
+            )
+        get_media_storage().put_file(claims["key"], staged.path, claims["ct"])
+    finally:
+        staged.discard()
 
 
 def list_photos(
@@ -155,23 +470,34 @@ def _ensure_owner(pet: Pet, current_user_id: int) -> None:
         )
 
 
-def _reset_primary(
-    session: Session,
-    pet_id: int,
-    exclude_photo_ids: Iterable[int] | None = None,
+def _switch_primary(
+    session: Session, pet_id: int, photo_id: int | ColumnElement[Any]
 ) -> None:
-    excluded_ids: tuple[int, ...] | None = (
-        tuple(exclude_photo_ids) if exclude_photo_ids else None
-    )
-    statement = select(Photo).where(
-        PHOTO_TABLE.c.pet_id == pet_id,
-        PHOTO_TABLE.c.is_primary.is_(True),
+    """Make ``photo_id`` the pet's only primary photo in a single UPDATE.
+
+    Touching every photo of the pet makes concurrent switches queue on the
+    row locks and re-apply to the latest versions, so the last one wins
+    cleanly. Postgres checks ``ux_photo_pet_id_primary`` at commit for this
+    statement; SQLite checks its unique index row by row, so the old primary
+    is cleared first there, which its single writer keeps atomic.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(text(f"SET CONSTRAINTS {PRIMARY_PHOTO_CONSTRAINT} DEFERRED"))
+    else:
+        session.execute(
+            update(PHOTO_TABLE)
+            .where(
+                PHOTO_TABLE.c.pet_id == pet_id,
+                PHOTO_TABLE.c.is_primary.is_(True),
+                PHOTO_TABLE.c.id != photo_id,
+            )
+            .values(is_primary=False)
+        )
+    session.execute(
+        update(PHOTO_TABLE)
+        .where(PHOTO_TABLE.c.pet_id == pet_id)
+        .values(is_primary=PHOTO_TABLE.c.id == photo_id)
     )
-    if excluded_ids:
-        statement = statement.where(PHOTO_TABLE.c.id.notin_(excluded_ids))
-    for other in session.exec(statement):
-        if other.is_primary:
-            other.is_primary = False
 
 
 def delete_photo(session: Session, current_user_id: int, photo_id: int) -> None:
@@ -184,39 +510,38 @@ def delete_photo(session: Session, current_user_id: int, photo_id: int) -> None:
 
     pet = _validate_pet_exists(session, photo.pet_id)
     _ensure_owner(pet, current_user_id)
-    pet_identifier = pet.id
-    if pet_identifier is None:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="pet missing identifier",
-        )
+    filenames = discard_photo(session, photo)
+    session.commit()
+    remove_released_media(session, filenames)
+
+
+def discard_photo(session: Session, photo: Photo) -> list[str]:
+    """Delete ``photo``'s row in the caller's transaction.
 
+    Releases its blob and hands the primary flag to the newest remaining
+    photo. Returns the storage keys nothing uses any more, original first,
+    for ``remove_released_media`` once the transaction has committed.
+    """
+    pet_identifier = photo.pet_id
     was_primary = photo.is_primary
-    filename = photo.filename
+    filenames = [photo.filename, *(photo.derivatives or {}).values()]
+    if photo.sha256 is not None and not _release_blob(session, photo.sha256):
+        # Other photos still use the same file.
+        filenames = []
 
     session.delete(photo)
     session.flush()
 
     if was_primary:
-        replacement = session.exec(
-            select(Photo)
+        newest = (
+            select(PHOTO_TABLE.c.id)
             .where(PHOTO_TABLE.c.pet_id == pet_identifier)
-            .order_by(desc(PHOTO_TABLE.c.created_at))
+            .order_by(desc(PHOTO_TABLE.c.created_at), desc(PHOTO_TABLE.c.id))
             .limit(1)
-        ).first()
-        if replacement and replacement.id is not None:
-            _reset_primary(
-                session,
-                pet_identifier,
-                exclude_photo_ids=[replacement.id],
-            )
-            replacement.is_primary = True
-
-    session.commit()
-
-    media_path = Path(settings.MEDIA_DIR)
-    with suppress(OSError):  # pragma: no cover - best effort cleanup
-        (media_path / filename).unlink(missing_ok=True)
+            .scalar_subquery()
+        )
+        _switch_primary(session, pet_identifier, newest)
+    return filenames
 
 
 def set_primary(
@@ -246,10 +571,14 @@ def set_primary(
             detail="photo missing identifier",
         )
 
-    _reset_primary(session, pet_identifier, exclude_photo_ids=[photo_identifier])
-    photo.is_primary = True
-
-    session.add(photo)
-    session.commit()
+    try:
+        _switch_primary(session, pet_identifier, photo_identifier)
+        session.commit()
+    except IntegrityError as exc:
+        session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="primary photo changed concurrently; retry",
+        ) from exc
     session.refresh(photo)
     return photo
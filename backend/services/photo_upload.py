@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+import anyio
+from fastapi import HTTPException, Request, status
+from multipart.exceptions import FormParserError
+from multipart.multipart import MultipartParser, parse_options_header
+
+from backend.core.config import settings
+from backend.services.image_probe import ImageSniffer
+
+# Slack for multipart boundaries and part headers when judging Content-Length.
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+# Limit on one part's headers, however the body is framed.
+MULTIPART_MAX_HEADER_BYTES = 8 * 1024
+STAGING_PREFIX = ".upload-"
+STAGING_SUFFIX = ".part"
+
+
+@dataclass
+class StagedUpload:
+    """A received file part, written to a temp file inside ``MEDIA_DIR``.
+
+    ``content_type`` is the type sniffed from the bytes, not the declared one.
+    """
+
+    path: Path
+    content_type: str
+    size: int
+    sha256: str
+    filename: str | None = None
+    width: int | None = None
+    height: int | None = None
+
+    def discard(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def _too_large(detail: str = "photo too large") -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=detail)
+
+
+def _max_request_bytes(max_files: int) -> int:
+    return max_files * (settings.PHOTO_MAX_BYTES + MULTIPART_OVERHEAD_BYTES)
+
+
+def reject_oversized_request(request: Request, *, max_files: int = 1) -> None:
+    """413 before reading the body when ``Content-Length`` can't possibly fit."""
+    header = request.headers.get("content-length")
+    if header is None or not header.isdigit():
+        return
+    if int(header) > _max_request_bytes(max_files):
+        raise _too_large()
+
+
+class _PartWriter:
+    def __init__(self, media_path: Path, filename: str | None = None):
+        self.path = media_path / f"{STAGING_PREFIX}{uuid4().hex}{STAGING_SUFFIX}"
+        self.filename = filename
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.sniffer = ImageSniffer()
+        self.file: Any = None
+
+    async def open(self) -> None:
+        self.file = await anyio.open_file(self.path, "wb")
+
+    async def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > settings.PHOTO_MAX_BYTES:
+            raise _too_large()
+        self.sniffer.feed(data)
+        self.digest.update(data)
+        await self.file.write(data)
+
+    async def close(self) -> StagedUpload:
+        await self.file.aclose()
+        self.file = None
+        image = self.sniffer.result()
+        return StagedUpload(
+            path=self.path,
+            content_type=image.content_type,
+            size=self.size,
+            sha256=self.digest.hexdigest(),
+            filename=self.filename,
+            width=image.width,
+            height=image.height,
+        )
+
+    async def abort(self) -> None:
+        if self.file is not None:
+            await self.file.aclose()
+            self.file = None
+        self.path.unlink(missing_ok=True)
+
+
+class _PhotoFormParser:
+    """Push-parse a multipart body, streaming file parts straight to disk.
+
+    Starlette's form parser spools every file to a temp file before the route
+    runs; this one writes each chunk to its staging file as it arrives, so the
+    size limit applies while reading and the bytes are written only once.
+    """
+
+    def __init__(self, field_name: str, max_files: int) -> None:
+        self.field_name = field_name
+        self.max_files = max_files
+        self.media_path = Path(settings.MEDIA_DIR)
+        self.staged: list[StagedUpload] = []
+        self.writer: _PartWriter | None = None
+        self._events: list[tuple[str, Any]] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._header_bytes = 0
+        self._headers: dict[bytes, bytes] = {}
+        self._in_file = False
+
+    def _count_header(self, size: int) -> None:
+        self._header_bytes += size
+        if self._header_bytes > MULTIPART_MAX_HEADER_BYTES:
+            raise _too_large("part headers too large")
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+        self._header_bytes = 0
+        self._in_file = False
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._count_header(end - start)
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._count_header(end - start)
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition"))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if name != self.field_name or b"filename" not in options:
+            return
+        self._in_file = True
+        content_type = self._headers.get(b"content-type", b"").decode("latin-1")
+        filename = options[b"filename"].decode("utf-8", "replace")
+        self._events.append(("open", (content_type.strip().lower(), filename)))
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._events.append(("data", data[start:end]))
+
+    def on_part_end(self) -> None:
+        if self._in_file:
+            self._events.append(("close", None))
+        self._in_file = False
+
+    async def _handle(self, kind: str, payload: Any) -> None:
+        if kind == "open":
+            content_type, filename = payload
+            if len(self.staged) >= self.max_files:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="too many photos",
+                )
+            if content_type not in settings.PHOTO_ALLOWED:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="unsupported photo type",
+                )
+            self.media_path.mkdir(parents=True, exist_ok=True)
+            self.writer = _PartWriter(self.media_path, filename)
+            await self.writer.open()
+        elif kind == "data" and self.writer is not None:
+            await self.writer.write(payload)
+        elif kind == "close" and self.writer is not None:
+            self.staged.append(await self.writer.close())
+            self.writer = None
+
+    async def parse(self, request: Request) -> list[StagedUpload]:
+        _, params = parse_options_header(request.headers.get("content-type"))
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="multipart/form-data body required",
+            )
+        parser = MultipartParser(
+            boundary,
+            {
+                "on_part_begin": self.on_part_begin,
+                "on_header_field": self.on_header_field,
+                "on_header_value": self.on_header_value,
+                "on_header_end": self.on_header_end,
+                "on_headers_finished": self.on_headers_finished,
+                "on_part_data": self.on_part_data,
+                "on_part_end": self.on_part_end,
+            },
+        )
+        # File parts are capped as they are written; this bounds everything
+        # else too (form fields, part headers), with or without Content-Length.
+        allowed = _max_request_bytes(self.max_files)
+        received = 0
+        try:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > allowed:
+                    raise _too_large("request body too large")
+                parser.write(chunk)
+                events, self._events = self._events, []
+                for kind, payload in events:
+                    await self._handle(kind, payload)
+            parser.finalize()
+        except FormParserError as exc:
+            await self.abort()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="malformed multipart body",
+            ) from exc
+        except BaseException:
+            await self.abort()
+            raise
+        if self.writer is not None:
+            await self.abort()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="malformed multipart body",
+            )
+        return self.staged
+
+    async def abort(self) -> None:
+        if self.writer is not None:
+            await self.writer.abort()
+            self.writer = None
+        for staged in self.staged:
+            staged.discard()
+        self.staged = []
+
+
+async def receive_photo_uploads(
+    request: Request,
+    *,
+    field_name: str = "file",
+    max_files: int = 1,
+) -> list[StagedUpload]:
+    """Stream the request's photo parts to staging files, hashing as they land.
+
+    Disk writes go through anyio's worker threads one chunk at a time, so the
+    event loop never waits on the filesystem. Callers own the returned files
+    and must move them into place or ``discard()`` them.
+    """
+    reject_oversized_request(request, max_files=max_files)
+    staged = await _PhotoFormParser(field_name, max_files).parse(request)
+    if not staged:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{field_name} is required",
+        )
+    return staged
+
+
+async def receive_photo_body(request: Request) -> StagedUpload:
+    """Stream a raw (non-multipart) request body to a staging file."""
+    header = request.headers.get("content-length")
+    if (
+        header is not None
+        and header.isdigit()
+        and int(header) > settings.PHOTO_MAX_BYTES
+    ):
+        raise _too_large()
+    media_path = Path(settings.MEDIA_DIR)
+    media_path.mkdir(parents=True, exist_ok=True)
+    writer = _PartWriter(media_path)
+    await writer.open()
+    try:
+        async for chunk in request.stream():
+            await writer.write(chunk)
+        return await writer.close()
+    except BaseException:
+        await writer.abort()
+        raise
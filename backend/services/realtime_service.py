@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Iterable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager, suppress
+from typing import Any
+
+from backend.core.config import settings
+
+Event = dict[str, Any]
+
+
+class MessageBroker(ABC):
+    """Fan-out of realtime events to the connections of individual users."""
+
+    @abstractmethod
+    def publish(self, user_ids: Iterable[int], event: Event) -> None:
+        """Deliver ``event`` to every live subscription of ``user_ids``.
+
+        Must be safe to call from worker threads (sync routes).
+        """
+
+    @abstractmethod
+    def subscribe(
+        self, user_id: int
+    ) -> AbstractAsyncContextManager[AsyncIterator[Event]]:
+        """Yield the stream of events addressed to ``user_id``."""
+
+
+def _offer(queue: asyncio.Queue[Event], event: Event) -> None:
+    # Slow consumers lose their oldest events instead of blocking publishers.
+    if queue.full():
+        with suppress(asyncio.QueueEmpty):
+            queue.get_nowait()
+    queue.put_nowait(event)
+
+
+async def _drain(queue: asyncio.Queue[Event]) -> AsyncIterator[Event]:
+    while True:
+        yield await queue.get()
+
+
+class InProcessBroker(MessageBroker):
+    """Single-process broker; every API worker only sees its own connections."""
+
+    def __init__(self, max_pending: int = 100) -> None:
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        self._subscribers: dict[
+            int, set[tuple[asyncio.AbstractEventLoop, asyncio.Queue[Event]]]
+        ] = {}
+
+    def publish(self, user_ids: Iterable[int], event: Event) -> None:
+        with self._lock:
+            targets = [
+                entry
+                for user_id in set(user_ids)
+                for entry in self._subscribers.get(user_id, ())
+            ]
+        for loop, queue in targets:
+            with suppress(RuntimeError):  # loop already closed
+                loop.call_soon_threadsafe(_offer, queue, event)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[AsyncIterator[Event]]:
+        queue: asyncio.Queue[Event] = asyncio.Queue(maxsize=self._max_pending)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(entry)
+        try:
+            yield _drain(queue)
+        finally:
+            with self._lock:
+                entries = self._subscribers.get(user_id)
+                if entries is not None:
+                    entries.discard(entry)
+                    if not entries:
+                        del self._subscribers[user_id]
+
+
+class RedisBroker(MessageBroker):
+    """Redis pub/sub broker (one channel per user) for multi-worker deployments."""
+
+    def __init__(self, url: str, channel_prefix: str = "petmatch:user:") -> None:
+        try:
+            import redis
+            import redis.asyncio as redis_asyncio
+        except ModuleNotFoundError as err:  # pragma: no cover - optional dependency
+            raise RuntimeError(
+                "REALTIME_BROKER=redis requires the 'redis' package"
+            ) from err
+        self._url = url
+        self._prefix = channel_prefix
+        self._client = redis.Redis.from_url(url)
+        self._async_module = redis_asyncio
+
+    def publish(self, user_ids: Iterable[int], event: Event) -> None:
+        payload = json.dumps(event, default=str)
+        for user_id in set(user_ids):
+            self._client.publish(f"{self._prefix}{user_id}", payload)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[AsyncIterator[Event]]:
+        client = self._async_module.Redis.from_url(self._url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(f"{self._prefix}{user_id}")
+
+        async def events() -> AsyncIterator[Event]:
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    yield json.loads(message["data"])
+
+        try:
+            yield events()
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+            await client.aclose()
+
+
+async def wait_for_pair_message(
+    events: AsyncIterator[Event],
+    pair_id: int,
+    timeout: float,
+) -> bool:
+    """Wait until a message event for ``pair_id`` arrives; False on timeout."""
+
+    async def next_match() -> bool:
+        async for event in events:
+            message = event.get("message") or {}
+            if event.get("type") == "message" and message.get("pair_id") == pair_id:
+                return True
+        return False
+
+    try:
+        return await asyncio.wait_for(next_match(), timeout)
+    except TimeoutError:
+        return False
+
+
+_broker: MessageBroker | None = None
+
+
+def get_broker() -> MessageBroker:
+    global _broker
+    if _broker is None:
+        if settings.REALTIME_BROKER == "redis":
+            _broker = RedisBroker(settings.REALTIME_REDIS_URL)
+        else:
+            _broker = InProcessBroker()
+    return _broker
+
+
+def set_broker(broker: MessageBroker | None) -> None:
+    """Install a broker implementation (``None`` resets to the configured one)."""
+    global _broker
+    _broker = broker
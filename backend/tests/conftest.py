@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+
+import pytest
+
+from backend.services.pair_members import pair_member_cache
+
+
+@pytest.fixture(autouse=True)
+def _clear_pair_member_cache() -> Iterator[None]:
+    # Each test module builds its own database, so pair ids get reused.
+    pair_member_cache.clear()
+    yield
+    pair_member_cache.clear()
@@ -0,0 +1,72 @@
+import io
+import struct
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from backend.core.config import settings
+from backend.services.image_probe import (
+    ImageSniffer,
+    InvalidImage,
+    probe_image,
+)
+
+
+def _encode(fmt: str, size: tuple[int, int], **options: object) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (10, 20, 30)).save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    ("data", "content_type"),
+    [
+        (_encode("JPEG", (321, 123)), "image/jpeg"),
+        (_encode("JPEG", (321, 123), progressive=True), "image/jpeg"),
+        (_encode("PNG", (321, 123)), "image/png"),
+        (_encode("WEBP", (321, 123)), "image/webp"),
+        (_encode("WEBP", (321, 123), lossless=True), "image/webp"),
+        (_encode("WEBP", (321, 123), exif=b"Exif\x00\x00"), "image/webp"),
+    ],
+)
+def test_probe_reads_type_and_size_from_header(data: bytes, content_type: str) -> None:
+    info = probe_image(data)
+    assert info is not None
+    assert (info.content_type, info.width, info.height) == (content_type, 321, 123)
+
+    sniffer = ImageSniffer()
+    for start in range(0, len(data), 7):
+        sniffer.feed(data[start : start + 7])
+    assert sniffer.result() == info
+
+
+def test_probe_needs_more_or_rejects() -> None:
+    assert probe_image(b"\xff\xd8") is None
+    assert probe_image(_encode("PNG", (4, 4))[:20]) is None
+    with pytest.raises(InvalidImage):
+        probe_image(b"GIF89a......")
+    with pytest.raises(InvalidImage):
+        probe_image(b"hello")
+
+
+def test_sniffer_rejects_oversized_dimensions() -> None:
+    # A PNG header claiming far more pixels than allowed; no pixel data needed.
+    side = settings.PHOTO_MAX_SIDE + 1
+    header = b"\x89PNG\r\n\x1a\n" + struct.pack(">I4sII", 13, b"IHDR", side, 1)
+    sniffer = ImageSniffer()
+    with pytest.raises(HTTPException) as caught:
+        sniffer.feed(header)
+    assert caught.value.status_code == 422
+
+
+def test_sniffer_caps_the_kept_header(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "PHOTO_SNIFF_MAX_BYTES", 64)
+    # An APP1 segment longer than the cap pushes the frame header out of reach.
+    app1 = b"\xff\xe1" + struct.pack(">H", 1_000) + bytes(998)
+    sniffer = ImageSniffer()
+    sniffer.feed(b"\xff\xd8" + app1[:30])
+    with pytest.raises(HTTPException) as caught:
+        sniffer.feed(app1[30:] + _encode("JPEG", (4, 4))[2:])
+    assert caught.value.status_code == 400
+    assert len(sniffer.header) == 64
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import os
+from collections.abc import Iterator
+from typing import cast
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import backend.core.db as db_module
+from backend.main import app
+from backend.models.like_edge import LikeEdge
+from backend.models.user import User
+from backend.services.pair_service import rebuild_like_edges
+
+TEST_DB_FILENAME = "test_like_edges.db"
+TEST_DB_URL = f"sqlite:///./{TEST_DB_FILENAME}"
+
+
+def _signup_login(client: TestClient, email: str, password: str) -> str:
+    response = client.post(
+        "/api/v1/auth/signup",
+        json={"email": email, "password": password},
+    )
+    assert response.status_code == 200, response.text
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": email, "password": password},
+    )
+    assert response.status_code == 200, response.text
+    return cast(str, response.json()["access_token"])
+
+
+def _auth_headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _create_pet(client: TestClient, token: str, *, name: str, gender: str) -> int:
+    response = client.post(
+        "/api/v1/pets",
+        headers=_auth_headers(token),
+        json={"name": name, "species": "cat", "gender": gender},
+    )
+    assert response.status_code == 200, response.text
+    return int(response.json()["id"])
+
+
+def _get_user_id(email: str) -> int:
+    with Session(db_module.engine) as session:
+        user_id = session.exec(select(User.id).where(User.email == email)).first()
+        assert user_id is not None
+        return int(user_id)
+
+
+@pytest.fixture(scope="module")
+def client() -> Iterator[TestClient]:
+    previous_db_url = os.environ.get("DATABASE_URL")
+    os.environ["DATABASE_URL"] = TEST_DB_URL
+    original_engine = db_module.engine
+    test_engine = create_engine(
+        TEST_DB_URL,
+        connect_args={"check_same_thread": False},
+    )
+    db_module.engine = test_engine
+
+    def override_get_session() -> Iterator[Session]:
+        with Session(test_engine) as session:
+            yield session
+
+    app.dependency_overrides[db_module.get_session] = override_get_session
+    SQLModel.metadata.drop_all(test_engine)
+    SQLModel.metadata.create_all(test_engine)
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+    app.dependency_overrides.pop(db_module.get_session, None)
+    SQLModel.metadata.drop_all(test_engine)
+    test_engine.dispose()
+    if previous_db_url is not None:
+        os.environ["DATABASE_URL"] = previous_db_url
+    else:
+        os.environ.pop("DATABASE_URL", None)
+    db_module.engine = original_engine
+    if os.path.exists(TEST_DB_FILENAME):
+        os.remove(TEST_DB_FILENAME)
+
+
+def _edge_count(liker_user_id: int, target_owner_id: int) -> int:
+    with Session(db_module.engine) as session:
+        edge = session.get(LikeEdge, (liker_user_id, target_owner_id))
+        return 0 if edge is None else edge.like_count
+
+
+def _decide(client: TestClient, token: str, pet_id: int, decision: str) -> None:
+    response = client.post(
+        f"/api/v1/matches/{pet_id}/decision",
+        headers=_auth_headers(token),
+        json={"decision": decision},
+    )
+    assert response.status_code == 200, response.text
+
+
+def test_like_edges_follow_decisions_and_deletes(client: TestClient) -> None:
+    password = "Aa!123456"
+    email_a = f"a_{uuid4().hex[:8]}@example.com"
+    email_b = f"b_{uuid4().hex[:8]}@example.com"
+    token_a = _signup_login(client, email_a, password)
+    token_b = _signup_login(client, email_b, password)
+    user_a = _get_user_id(email_a)
+    user_b = _get_user_id(email_b)
+
+    pet_a = _create_pet(client, token_a, name="A-Cat", gender="female")
+    pet_b1 = _create_pet(client, token_b, name="B-Cat-1", gender="male")
+    pet_b2 = _create_pet(client, token_b, name="B-Cat-2", gender="male")
+
+    _decide(client, token_a, pet_b1, "liked")
+    _decide(client, token_a, pet_b2, "liked")
+    _decide(client, token_a, pet_b2, "liked")
+    assert _edge_count(user_a, user_b) == 2
+
+    _decide(client, token_a, pet_b1, "passed")
+    assert _edge_count(user_a, user_b) == 1
+
+    response = client.delete(
+        f"/api/v1/matches/{pet_b2}",
+        headers=_auth_headers(token_a),
+    )
+    assert response.status_code == 204, response.text
+    assert _edge_count(user_a, user_b) == 0
+
+    _decide(client, token_b, pet_a, "liked")
+    assert _edge_count(user_b, user_a) == 1
+    pairs = client.get("/api/v1/pairs", headers=_auth_headers(token_a))
+    assert pairs.headers.get("X-Total-Count") == "0"
+
+    _decide(client, token_a, pet_b1, "liked")
+    pairs = client.get("/api/v1/pairs", headers=_auth_headers(token_a))
+    assert pairs.headers.get("X-Total-Count") == "1"
+
+    with Session(db_module.engine) as session:
+        session.execute(delete(LikeEdge))
+        session.commit()
+        rebuilt = rebuild_like_edges(session)
+    assert rebuilt >= 2
+    assert _edge_count(user_a, user_b) == 1
+    assert _edge_count(user_b, user_a) == 1
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import os
+from collections.abc import Iterator
+from typing import cast
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import backend.core.db as db_module
+from backend.main import app
+from backend.models.user import User
+
+TEST_DB_FILENAME = "test_match_batch.db"
+TEST_DB_URL = f"sqlite:///./{TEST_DB_FILENAME}"
+
+
+def _signup_login(client: TestClient, email: str, password: str) -> str:
+    response = client.post(
+        "/api/v1/auth/signup",
+        json={"email": email, "password": password},
+    )
+    assert response.status_code == 200, response.text
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": email, "password": password},
+    )
+    assert response.status_code == 200, response.text
+    return cast(str, response.json()["access_token"])
+
+
+def _auth_headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _create_pet(client: TestClient, token: str, *, name: str, gender: str) -> int:
+    response = client.post(
+        "/api/v1/pets",
+        headers=_auth_headers(token),
+        json={"name": name, "species": "cat", "gender": gender},
+    )
+    assert response.status_code == 200, response.text
+    return int(response.json()["id"])
+
+
+def _get_user_id(email: str) -> int:
+    with Session(db_module.engine) as session:
+        user_id = session.exec(select(User.id).where(User.email == email)).first()
+        assert user_id is not None
+        return int(user_id)
+
+
+@pytest.fixture(scope="module")
+def client() -> Iterator[TestClient]:
+    previous_db_url = os.environ.get("DATABASE_URL")
+    os.environ["DATABASE_URL"] = TEST_DB_URL
+    original_engine = db_module.engine
+    test_engine = create_engine(
+        TEST_DB_URL,
+        connect_args={"check_same_thread": False},
+    )
+    db_module.engine = test_engine
+
+    def override_get_session() -> Iterator[Session]:
+        with Session(test_engine) as session:
+            yield session
+
+    app.dependency_overrides[db_module.get_session] = override_get_session
+    SQLModel.metadata.drop_all(test_engine)
+    SQLModel.metadata.create_all(test_engine)
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+    app.dependency_overrides.pop(db_module.get_session, None)
+    SQLModel.metadata.drop_all(test_engine)
+    test_engine.dispose()
+    if previous_db_url is not None:
+        os.environ["DATABASE_URL"] = previous_db_url
+    else:
+        os.environ.pop("DATABASE_URL", None)
+    db_module.engine = original_engine
+    if os.path.exists(TEST_DB_FILENAME):
+        os.remove(TEST_DB_FILENAME)
+
+
+def test_batch_decisions_apply_in_order_and_create_pairs(client: TestClient) -> None:
+    password = "Aa!123456"
+    email_a = f"a_{uuid4().hex[:8]}@example.com"
+    email_b = f"b_{uuid4().hex[:8]}@example.com"
+    email_c = f"c_{uuid4().hex[:8]}@example.com"
+
+    token_a = _signup_login(client, email_a, password)
+    token_b = _signup_login(client, email_b, password)
+    token_c = _signup_login(client, email_c, password)
+
+    pet_a = _create_pet(client, token_a, name="A-Cat", gender="female")
+    pet_b1 = _create_pet(client, token_b, name="B-Cat-1", gender="male")
+    pet_b2 = _create_pet(client, token_b, name="B-Cat-2", gender="male")
+    pet_c = _create_pet(client, token_c, name="C-Cat", gender="male")
+
+    response = client.post(
+        f"/api/v1/matches/{pet_a}/decision",
+        headers=_auth_headers(token_b),
+        json={"decision": "liked"},
+    )
+    assert response.status_code == 200, response.text
+
+    response = client.post(
+        "/api/v1/matches/decisions",
+        headers=_auth_headers(token_a),
+        json={
+            "decisions": [
+                {"target_pet_id": pet_b1, "decision": "passed"},
+                {"target_pet_id": pet_b2, "decision": "passed"},
+                {"target_pet_id": pet_a, "decision": "liked"},
+                {"target_pet_id": 999_999, "decision": "liked"},
+                {"target_pet_id": pet_c, "decision": "passed"},
+                {"target_pet_id": pet_b1, "decision": "liked"},
+            ]
+        },
+    )
+    assert response.status_code == 200, response.text
+    payload = response.json()
+
+    statuses = [item["status"] for item in payload["results"]]
+    assert statuses == [
+        "superseded",
+        "applied",
+        "own_pet",
+        "pet_not_found",
+        "applied",
+        "applied",
+    ]
+    assert payload["results"][0]["match"] is None
+    assert payload["results"][1]["match"]["decision"] == "passed"
+    assert payload["results"][2]["match"] is None
+    assert payload["results"][5]["match"]["decision"] == "liked"
+
+    user_b_id = _get_user_id(email_b)
+    assert [pair["other_user_id"] for pair in payload["pairs"]] == [user_b_id]
+
+    stats = client.get("/api/v1/matches/stats", headers=_auth_headers(token_a))
+    assert stats.status_code == 200, stats.text
+    assert stats.json() == {"undecided": 0, "liked": 1, "passed": 2}
+
+    response = client.post(
+        "/api/v1/matches/decisions",
+        headers=_auth_headers(token_a),
+        json={"decisions": [{"target_pet_id": pet_b1, "decision": "liked"}]},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["pairs"] == []
+
+    pairs_response = client.get("/api/v1/pairs", headers=_auth_headers(token_a))
+    assert pairs_response.headers.get("X-Total-Count") == "1"
+
+
+def test_batch_decisions_rejects_empty_payload(client: TestClient) -> None:
+    token = _signup_login(client, f"e_{uuid4().hex[:8]}@example.com", "Aa!123456")
+    response = client.post(
+        "/api/v1/matches/decisions",
+        headers=_auth_headers(token),
+        json={"decisions": []},
+    )
+    assert response.status_code == 422, response.text
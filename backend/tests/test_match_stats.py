@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import os
+from collections.abc import Iterator
+from typing import cast
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import backend.core.db as db_module
+from backend.main import app
+from backend.models.match import MatchDecision
+from backend.models.match_stats import UserMatchStats
+from backend.models.user import User
+from backend.services.match_service import _adjust_stats, reconcile_match_stats
+
+TEST_DB_FILENAME = "test_match_stats.db"
+TEST_DB_URL = f"sqlite:///./{TEST_DB_FILENAME}"
+
+
+def _signup_login(client: TestClient, email: str, password: str) -> str:
+    response = client.post(
+        "/api/v1/auth/signup",
+        json={"email": email, "password": password},
+    )
+    assert response.status_code == 200, response.text
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": email, "password": password},
+    )
+    assert response.status_code == 200, response.text
+    return cast(str, response.json()["access_token"])
+
+
+def _auth_headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _create_pet(client: TestClient, token: str, *, name: str, gender: str) -> int:
+    response = client.post(
+        "/api/v1/pets",
+        headers=_auth_headers(token),
+        json={"name": name, "species": "cat", "gender": gender},
+    )
+    assert response.status_code == 200, response.text
+    return int(response.json()["id"])
+
+
+def _get_user_id(email: str) -> int:
+    with Session(db_module.engine) as session:
+        user_id = session.exec(select(User.id).where(User.email == email)).first()
+        assert user_id is not None
+        return int(user_id)
+
+
+@pytest.fixture(scope="module")
+def client() -> Iterator[TestClient]:
+    previous_db_url = os.environ.get("DATABASE_URL")
+    os.environ["DATABASE_URL"] = TEST_DB_URL
+    original_engine = db_module.engine
+    test_engine = create_engine(
+        TEST_DB_URL,
+        connect_args={"check_same_thread": False},
+    )
+    db_module.engine = test_engine
+
+    def override_get_session() -> Iterator[Session]:
+        with Session(test_engine) as session:
+            yield session
+
+    app.dependency_overrides[db_module.get_session] = override_get_session
+    SQLModel.metadata.drop_all(test_engine)
+    SQLModel.metadata.create_all(test_engine)
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+    app.dependency_overrides.pop(db_module.get_session, None)
+    SQLModel.metadata.drop_all(test_engine)
+    test_engine.dispose()
+    if previous_db_url is not None:
+        os.environ["DATABASE_URL"] = previous_db_url
+    else:
+        os.environ.pop("DATABASE_URL", None)
+    db_module.engine = original_engine
+    if os.path.exists(TEST_DB_FILENAME):
+        os.remove(TEST_DB_FILENAME)
+
+
+def _stats(client: TestClient, token: str) -> dict[str, int]:
+    response = client.get("/api/v1/matches/stats", headers=_auth_headers(token))
+    assert response.status_code == 200, response.text
+    return cast(dict[str, int], response.json())
+
+
+def test_stats_counters_track_every_write_path(client: TestClient) -> None:
+    password = "Aa!123456"
+    email_a = f"a_{uuid4().hex[:8]}@example.com"
+    token_a = _signup_login(client, email_a, password)
+    token_b = _signup_login(client, f"b_{uuid4().hex[:8]}@example.com", password)
+    assert _stats(client, token_a) == {"undecided": 0, "liked": 0, "passed": 0}
+
+    pet_ids = [
+        _create_pet(client, token_b, name=f"B-{idx}", gender="male") for idx in range(4)
+    ]
+
+    response = client.post(
+        "/api/v1/matches/generate",
+        headers=_auth_headers(token_a),
+        json={"limit": 3},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["created"] == 3
+    assert _stats(client, token_a) == {"undecided": 3, "liked": 0, "passed": 0}
+
+    for pet_id, decision in zip(
+        pet_ids, ["liked", "passed", "liked", "liked"], strict=True
+    ):
+        response = client.post(
+            f"/api/v1/matches/{pet_id}/decision",
+            headers=_auth_headers(token_a),
+            json={"decision": decision},
+        )
+        assert response.status_code == 200, response.text
+    assert _stats(client, token_a) == {"undecided": 0, "liked": 3, "passed": 1}
+
+    response = client.post(
+        "/api/v1/matches/decisions",
+        headers=_auth_headers(token_a),
+        json={"decisions": [{"target_pet_id": pet_ids[0], "decision": "passed"}]},
+    )
+    assert response.status_code == 200, response.text
+    assert _stats(client, token_a) == {"undecided": 0, "liked": 2, "passed": 2}
+
+    response = client.delete(
+        f"/api/v1/matches/{pet_ids[1]}",
+        headers=_auth_headers(token_a),
+    )
+    assert response.status_code == 204, response.text
+    assert _stats(client, token_a) == {"undecided": 0, "liked": 2, "passed": 1}
+
+    user_a_id = _get_user_id(email_a)
+    with Session(db_module.engine) as session:
+        stats = session.get(UserMatchStats, user_a_id)
+        assert stats is not None
+        stats.liked = 40
+        session.commit()
+        assert reconcile_match_stats(session, [user_a_id]) == 1
+        assert reconcile_match_stats(session) == 0
+    assert _stats(client, token_a) == {"undecided": 0, "liked": 2, "passed": 1}
+
+
+def test_stats_counters_survive_interleaved_sessions(client: TestClient) -> None:
+    email = f"c_{uuid4().hex[:8]}@example.com"
+    _signup_login(client, email, "Aa!123456")
+    user_id = _get_user_id(email)
+    with Session(db_module.engine) as session:
+        _adjust_stats(session, user_id, None, MatchDecision.undecided)
+        session.commit()
+
+    with Session(db_module.engine) as first, Session(db_module.engine) as second:
+        # Both sessions hold the row as it was before either decision.
+        seen = [first.get(UserMatchStats, user_id), second.get(UserMatchStats, user_id)]
+        assert all(stats is not None for stats in seen)
+
+        _adjust_stats(first, user_id, None, MatchDecision.liked)
+        first.commit()
+        _adjust_stats(second, user_id, MatchDecision.undecided, MatchDecision.liked)
+        second.commit()
+
+    with Session(db_module.engine) as session:
+        stats = session.get(UserMatchStats, user_id)
+        assert stats is not None
+        assert (stats.undecided, stats.liked, stats.passed) == (0, 2, 0)
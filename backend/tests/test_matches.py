@@ -1,16 +1,19 @@
 import os
-from collections.abc import Iterator
-from typing import cast
+from collections.abc import Iterator, Sequence
+from typing import Any, cast
 from uuid import uuid4
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlmodel import Session, SQLModel, create_engine, select
 
 import backend.core.db as db_module
 from backend.main import app
+from backend.models.match import MatchDecision
 from backend.models.pet import Gender, Pet
 from backend.models.user import User
+from backend.services.match_service import list_matches
 
 TEST_DB_FILENAME = "test_matches.db"
 TEST_DB_URL = f"sqlite:///./{TEST_DB_FILENAME}"
@@ -133,3 +136,51 @@ def test_generate_and_list_matches(client: TestClient) -> None:
     assert response.status_code == 200, response.text
     second_payload = response.json()
     assert second_payload["created"] == 0
+
+
+def _signup_and_fetch_id(client: TestClient) -> int:
+    email = f"{uuid4().hex}@example.com"
+    _signup(client, email, "StrongPass123$")
+    return _fetch_user_id(email)
+
+
+def test_list_matches_by_decision_uses_owner_decision_index(
+    client: TestClient,
+) -> None:
+    user_id = _signup_and_fetch_id(client)
+    statements: list[tuple[str, Sequence[Any]]] = []
+
+    def capture(
+        _conn: object,
+        _cursor: object,
+        statement: str,
+        parameters: Sequence[Any],
+        _context: object,
+        _executemany: bool,
+    ) -> None:
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(db_module.engine, "before_cursor_execute", capture)
+    try:
+        with Session(db_module.engine) as session:
+            list_matches(
+                user_id,
+                session=session,
+                limit=10,
+                offset=0,
+                decision=MatchDecision.liked,
+            )
+    finally:
+        event.remove(db_module.engine, "before_cursor_execute", capture)
+
+    assert statements
+    with db_module.engine.connect() as connection:
+        for statement, parameters in statements:
+            plan = " ".join(
+                str(row[-1])
+                for row in connection.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                )
+            )
+            assert "ix_match_owner_decision_target" in plan, plan
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections.abc import Iterator
+from typing import cast
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import backend.core.db as db_module
+from backend.core.config import settings
+from backend.main import app
+from backend.models.message import Message
+from backend.models.pair import Pair
+from backend.models.user import User
+from backend.services.message_writer import MessageBatchWriter
+
+TEST_DB_FILENAME = "test_message_writer.db"
+TEST_DB_URL = f"sqlite:///./{TEST_DB_FILENAME}"
+
+
+def _signup_login(client: TestClient, email: str, password: str) -> str:
+    response = client.post(
+        "/api/v1/auth/signup",
+        json={"email": email, "password": password},
+    )
+    assert response.status_code == 200, response.text
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": email, "password": password},
+    )
+    assert response.status_code == 200, response.text
+    return cast(str, response.json()["access_token"])
+
+
+def _auth_headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _create_pet(client: TestClient, token: str, *, name: str) -> int:
+    response = client.post(
+        "/api/v1/pets",
+        headers=_auth_headers(token),
+        json={"name": name, "species": "cat", "gender": "male"},
+    )
+    assert response.status_code == 200, response.text
+    return int(response.json()["id"])
+
+
+def _get_user_id(email: str) -> int:
+    with Session(db_module.engine) as session:
+        user_id = session.exec(select(User.id).where(User.email == email)).first()
+        assert user_id is not None
+        return int(user_id)
+
+
+@pytest.fixture(scope="module")
+def client() -> Iterator[TestClient]:
+    previous_db_url = os.environ.get("DATABASE_URL")
+    os.environ["DATABASE_URL"] = TEST_DB_URL
+    original_engine = db_module.engine
+    test_engine = create_engine(
+        TEST_DB_URL,
+        connect_args={"check_same_thread": False},
+    )
+    db_module.engine = test_engine
+
+    def override_get_session() -> Iterator[Session]:
+        with Session(test_engine) as session:
+            yield session
+
+    app.dependency_overrides[db_module.get_session] = override_get_session
+    SQLModel.metadata.drop_all(test_engine)
+    SQLModel.metadata.create_all(test_engine)
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+    app.dependency_overrides.pop(db_module.get_session, None)
+    SQLModel.metadata.drop_all(test_engine)
+    test_engine.dispose()
+    if previous_db_url is not None:
+        os.environ["DATABASE_URL"] = previous_db_url
+    else:
+        os.environ.pop("DATABASE_URL", None)
+    db_module.engine = original_engine
+    if os.path.exists(TEST_DB_FILENAME):
+        os.remove(TEST_DB_FILENAME)
+
+
+def test_writer_commits_concurrent_messages_in_batches(client: TestClient) -> None:
+    password = "Aa!123456"
+    email_a = f"a_{uuid4().hex[:8]}@example.com"
+    email_b = f"b_{uuid4().hex[:8]}@example.com"
+    _signup_login(client, email_a, password)
+    _signup_login(client, email_b, password)
+    low, high = sorted((_get_user_id(email_a), _get_user_id(email_b)))
+    with Session(db_module.engine) as session:
+        pair = Pair(user_low_id=low, user_high_id=high)
+        session.add(pair)
+        session.commit()
+        pair_id = cast(int, pair.id)
+
+    batch_sizes: list[int] = []
+    writer = MessageBatchWriter(
+        lambda _session, messages: batch_sizes.append(len(messages)),
+        max_batch=16,
+        max_delay_ms=200,
+        sqlite_synchronous="NORMAL",
+    )
+    results: list[Message] = []
+    barrier = threading.Barrier(8)
+
+    def send(idx: int) -> None:
+        barrier.wait()
+        message = Message(pair_id=pair_id, sender_user_id=low, body=f"b{idx}")
+        results.append(writer.submit(message))
+
+    threads = [threading.Thread(target=send, args=(idx,)) for idx in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+
+    assert sum(batch_sizes) == 8
+    assert len(batch_sizes) < 8
+    assert len({message.id for message in results}) == 8
+    assert all(message.created_at is not None for message in results)
+    with Session(db_module.engine) as session:
+        stored = session.exec(select(Message).where(Message.pair_id == pair_id)).all()
+        assert len(stored) == 8
+
+
+def test_send_message_through_group_commit(client: TestClient) -> None:
+    password = "Aa!123456"
+    token_a = _signup_login(client, f"ga_{uuid4().hex[:8]}@example.com", password)
+    token_b = _signup_login(client, f"gb_{uuid4().hex[:8]}@example.com", password)
+    pet_a = _create_pet(client, token_a, name="G-A")
+    pet_b = _create_pet(client, token_b, name="G-B")
+    for token, pet_id in ((token_a, pet_b), (token_b, pet_a)):
+        response = client.post(
+            f"/api/v1/matches/{pet_id}/decision",
+            headers=_auth_headers(token),
+            json={"decision": "liked"},
+        )
+        assert response.status_code == 200, response.text
+    pair_id = client.get("/api/v1/pairs", headers=_auth_headers(token_a)).json()[0][
+        "id"
+    ]
+
+    previous = settings.MESSAGE_BATCH_ENABLED
+    settings.MESSAGE_BATCH_ENABLED = True
+    try:
+        sent = []
+        for body in ("one", "two"):
+            response = client.post(
+                "/api/v1/messages",
+                headers=_auth_headers(token_a),
+                json={"pair_id": pair_id, "body": body},
+            )
+            assert response.status_code == 200, response.text
+            sent.append(response.json())
+    finally:
+        settings.MESSAGE_BATCH_ENABLED = previous
+
+    assert sent[0]["id"] < sent[1]["id"]
+    inbox = client.get("/api/v1/pairs/inbox", headers=_auth_headers(token_b)).json()
+    assert inbox[0]["last_message_id"] == sent[1]["id"]
+    assert inbox[0]["unread_count"] == 2
+
+
+def test_writer_fails_only_the_offending_message(client: TestClient) -> None:
+    password = "Aa!123456"
+    email_a = f"fa_{uuid4().hex[:8]}@example.com"
+    email_b = f"fb_{uuid4().hex[:8]}@example.com"
+    _signup_login(client, email_a, password)
+    _signup_login(client, email_b, password)
+    low, high = sorted((_get_user_id(email_a), _get_user_id(email_b)))
+    with Session(db_module.engine) as session:
+        pair = Pair(user_low_id=low, user_high_id=high)
+        session.add(pair)
+        session.commit()
+        pair_id = cast(int, pair.id)
+    with db_module.engine.connect() as connection:
+        synchronous = connection.exec_driver_sql("PRAGMA synchronous").scalar()
+
+    batch_sizes: list[int] = []
+    writer = MessageBatchWriter(
+        lambda _session, messages: batch_sizes.append(len(messages)),
+        max_batch=16,
+        max_delay_ms=200,
+        sqlite_synchronous="off",
+    )
+    outcomes: dict[int, str] = {}
+    barrier = threading.Barrier(4)
+
+    def send(idx: int) -> None:
+        barrier.wait()
+        body = None if idx == 2 else f"f{idx}"
+        message = Message(pair_id=pair_id, sender_user_id=low, body=body)
+        try:
+            writer.submit(message)
+        except Exception:
+            outcomes[idx] = "failed"
+        else:
+            outcomes[idx] = "stored"
+
+    threads = [threading.Thread(target=send, args=(idx,)) for idx in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+
+    assert outcomes == {0: "stored", 1: "stored", 2: "failed", 3: "stored"}
+    with Session(db_module.engine) as session:
+        stored = session.exec(select(Message).where(Message.pair_id == pair_id)).all()
+        assert sorted(message.body for message in stored) == ["f0", "f1", "f3"]
+    with db_module.engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == synchronous
+
+
+def test_writer_rejects_unknown_synchronous_level() -> None:
+    with pytest.raises(ValueError):
+        MessageBatchWriter(lambda _session, _messages: None, sqlite_synchronous="fast")
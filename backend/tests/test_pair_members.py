@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from sqlmodel import Session, SQLModel, create_engine
+
+import backend.models  # noqa: F401
+from backend.models.pair import Pair
+from backend.services.pair_members import (
+    PairMemberCache,
+    get_pair_members,
+    pair_member_cache,
+)
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    cache = PairMemberCache(max_size=2)
+    cache.put(1, (1, 2))
+    cache.put(2, (3, 4))
+    assert cache.get(1) == (1, 2)
+    cache.put(3, (5, 6))
+
+    assert cache.get(2) is None
+    assert cache.get(1) == (1, 2)
+    assert cache.get(3) == (5, 6)
+    assert len(cache) == 2
+
+
+def test_members_cached_and_invalidated_on_delete() -> None:
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        pair = Pair(user_low_id=10, user_high_id=20)
+        session.add(pair)
+        session.commit()
+        session.refresh(pair)
+        assert pair.id is not None
+        pair_id = pair.id
+
+        assert get_pair_members(session, pair_id) == (10, 20)
+        assert pair_member_cache.get(pair_id) == (10, 20)
+        assert get_pair_members(session, pair_id + 1) is None
+
+        session.delete(pair)
+        session.commit()
+
+        assert pair_member_cache.get(pair_id) is None
+        assert get_pair_members(session, pair_id) is None
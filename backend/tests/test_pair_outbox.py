@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import os
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from typing import cast
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import backend.core.db as db_module
+from backend.core.config import settings
+from backend.main import app
+from backend.models.pair_outbox import PairOutbox
+from backend.models.user import User
+from backend.services.pair_outbox_service import (
+    claim_pair_outbox,
+    process_pair_outbox_batch,
+    prune_pair_outbox,
+)
+
+TEST_DB_FILENAME = "test_pair_outbox.db"
+TEST_DB_URL = f"sqlite:///./{TEST_DB_FILENAME}"
+
+
+def _signup_login(client: TestClient, email: str, password: str) -> str:
+    response = client.post(
+        "/api/v1/auth/signup",
+        json={"email": email, "password": password},
+    )
+    assert response.status_code == 200, response.text
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": email, "password": password},
+    )
+    assert response.status_code == 200, response.text
+    return cast(str, response.json()["access_token"])
+
+
+def _auth_headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _create_pet(client: TestClient, token: str, *, name: str, gender: str) -> int:
+    response = client.post(
+        "/api/v1/pets",
+        headers=_auth_headers(token),
+        json={"name": name, "species": "cat", "gender": gender},
+    )
+    assert response.status_code == 200, response.text
+    return int(response.json()["id"])
+
+
+def _get_user_id(email: str) -> int:
+    with Session(db_module.engine) as session:
+        user_id = session.exec(select(User.id).where(User.email == email)).first()
+        assert user_id is not None
+        return int(user_id)
+
+
+@pytest.fixture(scope="module")
+def client() -> Iterator[TestClient]:
+    previous_db_url = os.environ.get("DATABASE_URL")
+    os.environ["DATABASE_URL"] = TEST_DB_URL
+    original_engine = db_module.engine
+    test_engine = create_engine(
+        TEST_DB_URL,
+        connect_args={"check_same_thread": False},
+    )
+    db_module.engine = test_engine
+
+    def override_get_session() -> Iterator[Session]:
+        with Session(test_engine) as session:
+            yield session
+
+    app.dependency_overrides[db_module.get_session] = override_get_session
+    previous_outbox = settings.PAIR_OUTBOX_ENABLED, settings.PAIR_OUTBOX_WORKER
+    settings.PAIR_OUTBOX_ENABLED = True
+    settings.PAIR_OUTBOX_WORKER = False
+    SQLModel.metadata.drop_all(test_engine)
+    SQLModel.metadata.create_all(test_engine)
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+    app.dependency_overrides.pop(db_module.get_session, None)
+    settings.PAIR_OUTBOX_ENABLED, settings.PAIR_OUTBOX_WORKER = previous_outbox
+    SQLModel.metadata.drop_all(test_engine)
+    test_engine.dispose()
+    if previous_db_url is not None:
+        os.environ["DATABASE_URL"] = previous_db_url
+    else:
+        os.environ.pop("DATABASE_URL", None)
+    db_module.engine = original_engine
+    if os.path.exists(TEST_DB_FILENAME):
+        os.remove(TEST_DB_FILENAME)
+
+
+def _like(client: TestClient, token: str, pet_id: int) -> None:
+    response = client.post(
+        f"/api/v1/matches/{pet_id}/decision",
+        headers=_auth_headers(token),
+        json={"decision": "liked"},
+    )
+    assert response.status_code == 200, response.text
+
+
+def _pair_count(client: TestClient, token: str) -> str | None:
+    response = client.get("/api/v1/pairs", headers=_auth_headers(token))
+    assert response.status_code == 200, response.text
+    return response.headers.get("X-Total-Count")
+
+
+def test_likes_are_paired_by_outbox_worker(client: TestClient) -> None:
+    password = "Aa!123456"
+    email_a = f"a_{uuid4().hex[:8]}@example.com"
+    email_b = f"b_{uuid4().hex[:8]}@example.com"
+    token_a = _signup_login(client, email_a, password)
+    token_b = _signup_login(client, email_b, password)
+    pet_a = _create_pet(client, token_a, name="A-Cat", gender="female")
+    pet_b = _create_pet(client, token_b, name="B-Cat", gender="male")
+
+    _like(client, token_a, pet_b)
+    _like(client, token_b, pet_a)
+    _like(client, token_b, pet_a)
+    assert _pair_count(client, token_a) == "0"
+
+    with Session(db_module.engine) as session:
+        assert process_pair_outbox_batch(session, use_leases=False) == 3
+        assert process_pair_outbox_batch(session, use_leases=False) == 0
+        rows = session.exec(select(PairOutbox)).all()
+        assert all(row.processed_at is not None for row in rows)
+        assert {row.pair_id for row in rows[1:]} != {None}
+
+    assert _pair_count(client, token_a) == "1"
+    user_b_id = _get_user_id(email_b)
+    pairs = client.get("/api/v1/pairs", headers=_auth_headers(token_a)).json()
+    assert pairs[0]["other_user_id"] == user_b_id
+
+
+def test_leased_rows_are_not_claimed_twice(client: TestClient) -> None:
+    password = "Aa!123456"
+    token_a = _signup_login(client, f"a_{uuid4().hex[:8]}@example.com", password)
+    token_b = _signup_login(client, f"b_{uuid4().hex[:8]}@example.com", password)
+    pet_a = _create_pet(client, token_a, name="A-Dog", gender="female")
+    pet_b = _create_pet(client, token_b, name="B-Dog", gender="male")
+    _like(client, token_a, pet_b)
+    _like(client, token_b, pet_a)
+
+    with Session(db_module.engine) as session:
+        first = claim_pair_outbox(session, batch_size=10, worker_id="worker-1")
+        second = claim_pair_outbox(session, batch_size=10, worker_id="worker-2")
+        assert len(first) == 2
+        assert second == []
+
+        assert process_pair_outbox_batch(session, use_leases=True) == 0
+
+        for row in first:
+            row.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+        session.commit()
+        assert process_pair_outbox_batch(session, use_leases=True) == 2
+
+    assert _pair_count(client, token_a) == "1"
+
+
+def test_batch_commits_once_and_old_rows_are_pruned(client: TestClient) -> None:
+    password = "Aa!123456"
+    token_a = _signup_login(client, f"a_{uuid4().hex[:8]}@example.com", password)
+    token_b = _signup_login(client, f"b_{uuid4().hex[:8]}@example.com", password)
+    pet_a = _create_pet(client, token_a, name="A-Bird", gender="female")
+    pet_b = _create_pet(client, token_b, name="B-Bird", gender="male")
+    _like(client, token_a, pet_b)
+    _like(client, token_b, pet_a)
+
+    # Count database commits: savepoints would also fire the Session events.
+    commits: list[object] = []
+    record_commit = commits.append
+    event.listen(db_module.engine, "commit", record_commit)
+    try:
+        with Session(db_module.engine) as session:
+            assert process_pair_outbox_batch(session, use_leases=False) == 2
+    finally:
+        event.remove(db_module.engine, "commit", record_commit)
+    assert len(commits) == 1
+    assert _pair_count(client, token_a) == "1"
+
+    with Session(db_module.engine) as session:
+        rows = session.exec(select(PairOutbox)).all()
+        assert rows and all(row.processed_at is not None for row in rows)
+        stale = rows[0]
+        stale_id = stale.id
+        stale.processed_at = datetime.utcnow() - timedelta(days=30)
+        session.commit()
+        assert prune_pair_outbox(session, retention_seconds=24 * 3600) == 1
+        remaining = session.exec(select(PairOutbox)).all()
+        assert len(remaining) == len(rows) - 1
+        assert stale_id not in {row.id for row in remaining}
@@ -2,6 +2,7 @@
 
 import os
 from collections.abc import Iterator
+from datetime import datetime, timedelta
 from typing import cast
 from uuid import uuid4
 
@@ -11,6 +12,7 @@ from sqlmodel import Session, SQLModel, create_engine, select
 
 import backend.core.db as db_module
 from backend.main import app
+from backend.models.pair import Pair
 from backend.models.user import User
 
 TEST_DB_FILENAME = "test_pairs_flow.db"
@@ -138,3 +140,50 @@ def test_mutual_likes_create_pair_once(client: TestClient) -> None:
     assert repeat_pairs.status_code == 200
     assert repeat_pairs.headers.get("X-Total-Count") == "1"
     assert len(repeat_pairs.json()) == 1
+
+
+def test_pairs_listing_filters_orders_and_pages_by_keyset(client: TestClient) -> None:
+    password = "Cc!123456"
+    emails = [f"keyset-{idx}-{uuid4().hex[:8]}@example.com" for idx in range(5)]
+    tokens = [_signup_login(client, email, password) for email in emails]
+    user_ids = [_get_user_id(email) for email in emails]
+    me = user_ids[2]
+
+    base = datetime(2030, 1, 1)
+    with Session(db_module.engine) as session:
+        for offset_minutes, other in enumerate([user_ids[0], user_ids[3], user_ids[4]]):
+            low, high = sorted((me, other))
+            session.add(
+                Pair(
+                    user_low_id=low,
+                    user_high_id=high,
+                    created_at=base + timedelta(minutes=offset_minutes),
+                )
+            )
+        session.add(Pair(user_low_id=user_ids[0], user_high_id=user_ids[1]))
+        session.commit()
+
+    headers = _auth_headers(tokens[2])
+    first_page = client.get("/api/v1/pairs", headers=headers, params={"limit": 2})
+    assert first_page.status_code == 200, first_page.text
+    assert first_page.headers.get("X-Total-Count") == "3"
+    first_items = first_page.json()
+    assert [item["other_user_id"] for item in first_items] == [
+        user_ids[4],
+        user_ids[3],
+    ]
+
+    second_page = client.get(
+        "/api/v1/pairs",
+        headers=headers,
+        params={"limit": 2, "before_id": first_items[-1]["id"]},
+    )
+    assert second_page.status_code == 200, second_page.text
+    assert [item["other_user_id"] for item in second_page.json()] == [user_ids[0]]
+
+    offset_page = client.get(
+        "/api/v1/pairs",
+        headers=headers,
+        params={"limit": 2, "offset": 2},
+    )
+    assert [item["other_user_id"] for item in offset_page.json()] == [user_ids[0]]
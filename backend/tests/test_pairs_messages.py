@@ -2,6 +2,7 @@
 
 import os
 from collections.abc import Iterator
+from datetime import datetime, timedelta
 from typing import cast
 from uuid import uuid4
 
@@ -11,7 +12,10 @@ from sqlmodel import Session, SQLModel, create_engine, select
 
 import backend.core.db as db_module
 from backend.main import app
+from backend.models.message import Message
+from backend.models.message_archive import MessageArchive
 from backend.models.user import User
+from backend.services.message_archive_service import archive_cold_messages
 
 TEST_DB_FILENAME = "test_pairs_messages.db"
 TEST_DB_URL = f"sqlite:///./{TEST_DB_FILENAME}"
@@ -199,3 +203,297 @@ def test_pairs_and_messages_flow(client: TestClient) -> None:
         params={"pair_id": pair_id},
     )
     assert response.status_code == 403
+
+
+def _make_pair(client: TestClient, token_a: str, token_b: str) -> int:
+    pet_a = _create_pet(client, token_a, name="Inbox-A")
+    pet_b = _create_pet(client, token_b, name="Inbox-B")
+    for token, pet_id in ((token_a, pet_b), (token_b, pet_a)):
+        response = client.post(
+            f"/api/v1/matches/{pet_id}/decision",
+            headers=_auth_headers(token),
+            json={"decision": "liked"},
+        )
+        assert response.status_code == 200, response.text
+    response = client.get("/api/v1/pairs", headers=_auth_headers(token_a))
+    return int(response.json()[0]["id"])
+
+
+def _send(client: TestClient, token: str, pair_id: int, body: str) -> None:
+    response = client.post(
+        "/api/v1/messages",
+        headers=_auth_headers(token),
+        json={"pair_id": pair_id, "body": body},
+    )
+    assert response.status_code == 200, response.text
+
+
+def test_inbox_previews_and_unread_counts(client: TestClient) -> None:
+    password = "Aa!123456"
+    email_me = f"me_{uuid4().hex[:8]}@example.com"
+    email_x = f"x_{uuid4().hex[:8]}@example.com"
+    email_y = f"y_{uuid4().hex[:8]}@example.com"
+    token_me = _signup_login(client, email_me, password)
+    token_x = _signup_login(client, email_x, password)
+    token_y = _signup_login(client, email_y, password)
+
+    pair_x = _make_pair(client, token_me, token_x)
+    pair_y = _make_pair(client, token_me, token_y)
+
+    _send(client, token_x, pair_x, "x one")
+    _send(client, token_x, pair_x, "x two")
+    _send(client, token_y, pair_y, "y one")
+    _send(client, token_me, pair_y, "reply to y")
+
+    response = client.get("/api/v1/pairs/inbox", headers=_auth_headers(token_me))
+    assert response.status_code == 200, response.text
+    inbox = response.json()
+    assert [item["id"] for item in inbox] == [pair_y, pair_x]
+    assert inbox[0]["other_user_id"] == _get_user_id(email_y)
+    assert inbox[0]["last_message_body"] == "reply to y"
+    assert inbox[0]["unread_count"] == 0
+    assert inbox[1]["last_message_body"] == "x two"
+    assert inbox[1]["unread_count"] == 2
+
+    _send(client, token_x, pair_x, "x three")
+    response = client.get(
+        "/api/v1/pairs/inbox",
+        headers=_auth_headers(token_me),
+        params={"limit": 1},
+    )
+    first_page = response.json()
+    assert [item["id"] for item in first_page] == [pair_x]
+    assert first_page[0]["unread_count"] == 3
+
+    response = client.get(
+        "/api/v1/pairs/inbox",
+        headers=_auth_headers(token_me),
+        params={"limit": 1, "before_id": pair_x},
+    )
+    assert [item["id"] for item in response.json()] == [pair_y]
+
+    response = client.get("/api/v1/pairs/unread", headers=_auth_headers(token_me))
+    assert response.json() == {"unread_count": 3}
+
+    response = client.get(
+        "/api/v1/messages",
+        headers=_auth_headers(token_me),
+        params={"pair_id": pair_x, "limit": 1},
+    )
+    first_message_id = response.json()[0]["id"]
+    response = client.post(
+        f"/api/v1/pairs/{pair_x}/read",
+        headers=_auth_headers(token_me),
+        json={"message_id": first_message_id},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json() == {
+        "pair_id": pair_x,
+        "last_read_message_id": first_message_id,
+        "unread_count": 2,
+    }
+
+    response = client.post(
+        f"/api/v1/pairs/{pair_x}/read", headers=_auth_headers(token_me)
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["unread_count"] == 0
+    last_read = response.json()["last_read_message_id"]
+
+    # The pointer never moves backwards.
+    response = client.post(
+        f"/api/v1/pairs/{pair_x}/read",
+        headers=_auth_headers(token_me),
+        json={"message_id": first_message_id},
+    )
+    assert response.json()["last_read_message_id"] == last_read
+
+    response = client.post(
+        f"/api/v1/pairs/{pair_x}/read", headers=_auth_headers(token_y)
+    )
+    assert response.status_code == 403
+    response = client.post(
+        f"/api/v1/pairs/{pair_x}/read",
+        headers=_auth_headers(token_me),
+        json={"message_id": 10**9},
+    )
+    assert response.status_code == 404
+
+    _send(client, token_x, pair_x, "x four")
+    response = client.get("/api/v1/pairs/inbox", headers=_auth_headers(token_me))
+    assert response.json()[0]["unread_count"] == 1
+    assert response.json()[0]["last_read_message_id"] == last_read
+    response = client.get("/api/v1/pairs/unread", headers=_auth_headers(token_me))
+    assert response.json() == {"unread_count": 1}
+
+
+def test_message_history_keyset_pagination(client: TestClient) -> None:
+    password = "Aa!123456"
+    token_a = _signup_login(client, f"ka_{uuid4().hex[:8]}@example.com", password)
+    token_b = _signup_login(client, f"kb_{uuid4().hex[:8]}@example.com", password)
+    pair_id = _make_pair(client, token_a, token_b)
+    for idx in range(5):
+        _send(client, token_a if idx % 2 else token_b, pair_id, f"m{idx}")
+
+    def fetch(**params: object) -> list[str]:
+        response = client.get(
+            "/api/v1/messages",
+            headers=_auth_headers(token_a),
+            params={"pair_id": pair_id, **params},
+        )
+        assert response.status_code == 200, response.text
+        return [message["body"] for message in response.json()]
+
+    latest = client.get(
+        "/api/v1/messages",
+        headers=_auth_headers(token_a),
+        params={"pair_id": pair_id, "limit": 2, "newest_first": True},
+    )
+    assert latest.headers.get("X-Total-Count") == "5"
+    latest_items = latest.json()
+    assert [m["body"] for m in latest_items] == ["m4", "m3"]
+
+    older = client.get(
+        "/api/v1/messages",
+        headers=_auth_headers(token_a),
+        params={"pair_id": pair_id, "limit": 2, "before_id": latest_items[-1]["id"]},
+    )
+    assert older.headers.get("X-Total-Count") is None
+    older_items = older.json()
+    assert [m["body"] for m in older_items] == ["m2", "m1"]
+    assert fetch(limit=2, before_id=older_items[-1]["id"]) == ["m0"]
+
+    assert fetch(limit=2, after_id=older_items[-1]["id"]) == ["m2", "m3"]
+    assert fetch(limit=10, after_id=0) == ["m0", "m1", "m2", "m3", "m4"]
+
+    response = client.get(
+        "/api/v1/messages",
+        headers=_auth_headers(token_a),
+        params={"pair_id": pair_id, "after_id": 1, "before_id": 2},
+    )
+    assert response.status_code == 422
+
+
+def test_message_cursor_must_belong_to_the_pair(client: TestClient) -> None:
+    password = "Aa!123456"
+    token_a = _signup_login(client, f"ca_{uuid4().hex[:8]}@example.com", password)
+    token_b = _signup_login(client, f"cb_{uuid4().hex[:8]}@example.com", password)
+    token_c = _signup_login(client, f"cc_{uuid4().hex[:8]}@example.com", password)
+    token_d = _signup_login(client, f"cd_{uuid4().hex[:8]}@example.com", password)
+    pair_id = _make_pair(client, token_a, token_b)
+    other_pair_id = _make_pair(client, token_c, token_d)
+    _send(client, token_a, pair_id, "mine")
+    _send(client, token_c, other_pair_id, "theirs")
+    foreign_id = client.get(
+        "/api/v1/messages",
+        headers=_auth_headers(token_c),
+        params={"pair_id": other_pair_id},
+    ).json()[0]["id"]
+
+    for params in (
+        {"before_id": foreign_id},
+        {"after_id": foreign_id},
+        {"before_id": 999_999},
+        {"after_id": 999_999},
+    ):
+        response = client.get(
+            "/api/v1/messages",
+            headers=_auth_headers(token_a),
+            params={"pair_id": pair_id, **params},
+        )
+        assert response.status_code == 404, (params, response.text)
+
+
+def test_archived_messages_read_through(client: TestClient) -> None:
+    password = "Aa!123456"
+    token_a = _signup_login(client, f"aa_{uuid4().hex[:8]}@example.com", password)
+    token_b = _signup_login(client, f"ab_{uuid4().hex[:8]}@example.com", password)
+    pair_id = _make_pair(client, token_a, token_b)
+    for idx in range(6):
+        _send(client, token_a, pair_id, f"m{idx}")
+
+    def fetch(**params: object) -> list[str]:
+        response = client.get(
+            "/api/v1/messages",
+            headers=_auth_headers(token_b),
+            params={"pair_id": pair_id, **params},
+        )
+        assert response.status_code == 200, response.text
+        return [message["body"] for message in response.json()]
+
+    ids = {
+        message["body"]: message["id"]
+        for message in client.get(
+            "/api/v1/messages",
+            headers=_auth_headers(token_b),
+            params={"pair_id": pair_id},
+        ).json()
+    }
+    with Session(db_module.engine) as session:
+        cutoff = datetime.utcnow() + timedelta(seconds=1)
+        # Everything is older than the cutoff, but the last message stays hot.
+        assert archive_cold_messages(session, older_than=cutoff, batch_size=2) >= 5
+        archived = session.exec(
+            select(MessageArchive.body).where(MessageArchive.pair_id == pair_id)
+        )
+        assert sorted(archived.all()) == ["m0", "m1", "m2", "m3", "m4"]
+        hot = session.exec(select(Message.body).where(Message.pair_id == pair_id))
+        assert list(hot.all()) == ["m5"]
+
+    response = client.get(
+        "/api/v1/messages",
+        headers=_auth_headers(token_b),
+        params={"pair_id": pair_id, "limit": 3, "newest_first": True},
+    )
+    assert response.headers.get("X-Total-Count") == "6"
+    assert [m["body"] for m in response.json()] == ["m5", "m4", "m3"]
+    assert fetch(limit=3, offset=3, newest_first=True) == ["m2", "m1", "m0"]
+    assert fetch(limit=4, offset=1) == ["m1", "m2", "m3", "m4"]
+    assert fetch(limit=2, before_id=ids["m5"]) == ["m4", "m3"]
+    assert fetch(limit=2, before_id=ids["m2"]) == ["m1", "m0"]
+    assert fetch(limit=3, after_id=ids["m3"]) == ["m4", "m5"]
+    assert fetch(limit=10, after_id=0) == ["m0", "m1", "m2", "m3", "m4", "m5"]
+    assert fetch(limit=2, after_id=ids["m5"]) == []
+
+
+def test_message_search(client: TestClient) -> None:
+    password = "Aa!123456"
+    token_a = _signup_login(client, f"sa_{uuid4().hex[:8]}@example.com", password)
+    token_b = _signup_login(client, f"sb_{uuid4().hex[:8]}@example.com", password)
+    token_c = _signup_login(client, f"sc_{uuid4().hex[:8]}@example.com", password)
+    pair_ab = _make_pair(client, token_a, token_b)
+    pair_bc = _make_pair(client, token_c, token_b)
+
+    _send(client, token_a, pair_ab, "Walk in the park tomorrow?")
+    _send(client, token_b, pair_ab, "Park walk sounds great, the park opens at nine")
+    _send(client, token_b, pair_ab, "See you then")
+    _send(client, token_c, pair_bc, "Private park plans")
+
+    def search(token: str, **params: object) -> list[str]:
+        response = client.get(
+            "/api/v1/messages/search",
+            headers=_auth_headers(token),
+            params=params,
+        )
+        assert response.status_code == 200, response.text
+        return [message["body"] for message in response.json()]
+
+    assert search(token_a, q="park") == [
+        "Park walk sounds great, the park opens at nine",
+        "Walk in the park tomorrow?",
+    ]
+    assert search(token_a, q="park", limit=1, offset=1) == [
+        "Walk in the park tomorrow?"
+    ]
+    assert search(token_a, q="walk tomor") == ["Walk in the park tomorrow?"]
+    assert search(token_a, q="private") == []
+    assert search(token_c, q="private") == ["Private park plans"]
+    assert search(token_a, q='"*(') == []
+    assert len(search(token_b, q="park")) == 3
+
+    response = client.get(
+        "/api/v1/messages/search",
+        headers=_auth_headers(token_a),
+        params={"q": ""},
+    )
+    assert response.status_code == 422
@@ -1,5 +1,8 @@
+import hashlib
+import io
 import os
 import shutil
+import time
 from collections.abc import Iterator
 from pathlib import Path
 from typing import Any, cast
@@ -7,11 +10,14 @@ from uuid import uuid4
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session, SQLModel, create_engine
+from PIL import Image
+from sqlmodel import Session, SQLModel, col, create_engine, select
 
 import backend.core.db as db_module
 from backend.core.config import settings
 from backend.main import app
+from backend.models.media_blob import MediaBlob
+from backend.models.photo import Photo
 
 
 def _signup(client: TestClient, email: str, password: str) -> None:
@@ -65,6 +71,26 @@ def _upload_photo(
     return cast(dict[str, Any], response.json())
 
 
+def _png_bytes(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 120, 40)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _jpeg_bytes(width: int = 8, height: int = 8, shade: int = 0) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (shade, shade, shade)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def _stored_files(media_path: Path) -> list[str]:
+    return sorted(
+        path.relative_to(media_path).as_posix()
+        for path in media_path.rglob("*")
+        if path.is_file()
+    )
+
+
 @pytest.fixture
 def client(tmp_path: Path) -> Iterator[TestClient]:
     test_db_path = tmp_path / "test_photos.db"
@@ -125,7 +151,7 @@ def test_upload_and_primary_autoset(client: TestClient) -> None:
         token,
         pet_id,
         filename="first.jpg",
-        content=b"\xff\xd8\xff\xdb\x00",
+        content=_jpeg_bytes(),
     )
     assert photo["is_primary"] is True
     assert photo["url"].startswith(settings.MEDIA_BASE_URL)
@@ -153,14 +179,14 @@ def test_primary_switch_and_delete(client: TestClient) -> None:
         token,
         pet_id,
         filename="first.jpg",
-        content=b"\xff\xd8\xff\xdb\x00",
+        content=_jpeg_bytes(),
     )
     second = _upload_photo(
         client,
         token,
         pet_id,
         filename="second.jpg",
-        content=b"\xff\xd8\xff\x00\x01",
+        content=_jpeg_bytes(shade=255),
     )
 
     make_primary = client.post(
@@ -208,7 +234,7 @@ def test_list_with_total_count_header(client: TestClient) -> None:
             token,
             pet_id,
             filename=f"photo_{idx}.jpg",
-            content=b"\xff\xd8\xff" + bytes([idx]),
+            content=_jpeg_bytes(shade=100 * idx),
         )
 
     response = client.get(
@@ -229,7 +255,7 @@ def test_validation_rejects_big_or_bad_mime(client: TestClient) -> None:
     token = _login(client, email, password)
     pet_id = _create_pet(client, token)
 
-    big_content = b"x" * (settings.PHOTO_MAX_BYTES + 1)
+    big_content = _jpeg_bytes() + b"\x00" * settings.PHOTO_MAX_BYTES
     too_big = client.post(
         f"/api/v1/pets/{pet_id}/photos",
         headers=_auth_headers(token),
@@ -243,3 +269,644 @@ def test_validation_rejects_big_or_bad_mime(client: TestClient) -> None:
         files={"file": ("not_image.txt", b"hello", "text/plain")},
     )
     assert bad_mime.status_code == 400, bad_mime.text
+
+
+def test_streamed_upload_hashes_and_cleans_up(client: TestClient) -> None:
+    email = f"{uuid4().hex}@example.com"
+    password = "SecurePass!234"
+    _signup(client, email, password)
+    token = _login(client, email, password)
+    pet_id = _create_pet(client, token)
+
+    content = _jpeg_bytes(256, 256)
+    photo = _upload_photo(
+        client, token, pet_id, filename="streamed.jpg", content=content
+    )
+    with Session(db_module.engine) as session:
+        stored = session.get(Photo, photo["id"])
+        assert stored is not None
+        assert stored.sha256 == hashlib.sha256(content).hexdigest()
+        assert stored.size_bytes == len(content)
+    media_path = Path(settings.MEDIA_DIR)
+    assert (media_path / stored.filename).read_bytes() == content
+
+    too_big = client.post(
+        f"/api/v1/pets/{pet_id}/photos",
+        headers=_auth_headers(token),
+        files={
+            "file": (
+                "huge.jpg",
+                _jpeg_bytes() + b"\x00" * settings.PHOTO_MAX_BYTES,
+                "image/jpeg",
+            )
+        },
+    )
+    assert too_big.status_code == 413, too_big.text
+    assert _stored_files(media_path) == [stored.filename]
+
+    declared_too_big = client.post(
+        f"/api/v1/pets/{pet_id}/photos",
+        headers={
+            **_auth_headers(token),
+            "Content-Type": "multipart/form-data; boundary=x",
+            "Content-Length": str(settings.PHOTO_MAX_BYTES * 2),
+        },
+        content=b"--x--\r\n",
+    )
+    assert declared_too_big.status_code == 413, declared_too_big.text
+
+    def chunked_field() -> Iterator[bytes]:
+        yield b'--x\r\nContent-Disposition: form-data; name="note"\r\n\r\n'
+        for _ in range(3):
+            yield b"a" * settings.PHOTO_MAX_BYTES
+        yield b"\r\n--x--\r\n"
+
+    streamed_too_big = client.post(
+        f"/api/v1/pets/{pet_id}/photos",
+        headers={
+            **_auth_headers(token),
+            "Content-Type": "multipart/form-data; boundary=x",
+        },
+        content=chunked_field(),
+    )
+    assert streamed_too_big.status_code == 413, streamed_too_big.text
+
+    huge_header = client.post(
+        f"/api/v1/pets/{pet_id}/photos",
+        headers={
+            **_auth_headers(token),
+            "Content-Type": "multipart/form-data; boundary=x",
+        },
+        content=(
+            b'--x\r\nContent-Disposition: form-data; name="file"; '
+            b'filename="a.jpg"\r\nX-Padding: '
+            + b"p" * (64 * 1024)
+            + b"\r\n\r\n\xff\xd8\xff\r\n--x--\r\n"
+        ),
+    )
+    assert huge_header.status_code == 413, huge_header.text
+    assert _stored_files(media_path) == [stored.filename]
+
+    missing = client.post(
+        f"/api/v1/pets/{pet_id}/photos",
+        headers=_auth_headers(token),
+        files={"other": ("a.jpg", b"\xff\xd8\xff", "image/jpeg")},
+    )
+    assert missing.status_code == 422, missing.text
+
+
+def test_derivatives_rendered_after_upload(client: TestClient) -> None:
+    email = f"{uuid4().hex}@example.com"
+    password = "SecurePass!234"
+    _signup(client, email, password)
+    token = _login(client, email, password)
+    pet_id = _create_pet(client, token)
+
+    photo = _upload_photo(
+        client,
+        token,
+        pet_id,
+        filename="big.png",
+        content=_png_bytes(1200, 600),
+        content_type="image/png",
+    )
+    assert photo["derivatives"] == {}
+
+    deadline = time.monotonic() + 60
+    derivatives: dict[str, str] = {}
+    while not derivatives and time.monotonic() < deadline:
+        time.sleep(0.2)
+        listed = client.get(
+            f"/api/v1/pets/{pet_id}/photos", headers=_auth_headers(token)
+        )
+        derivatives = listed.json()[0]["derivatives"]
+    assert sorted(derivatives) == ["200", "800"]
+    assert derivatives["200"].startswith(settings.MEDIA_BASE_URL)
+    assert derivatives["200"].endswith("_200.webp")
+
+    media_path = Path(settings.MEDIA_DIR)
+    small_key = derivatives["200"].removeprefix(f"{settings.MEDIA_BASE_URL}/")
+    with Image.open(media_path / small_key) as small:
+        assert small.format == "WEBP"
+        assert small.size == (200, 100)
+
+    response = client.delete(
+        f"/api/v1/photos/{photo['id']}", headers=_auth_headers(token)
+    )
+    assert response.status_code == 204, response.text
+    assert _stored_files(media_path) == []
+
+
+def test_identical_uploads_share_one_file(client: TestClient) -> None:
+    email = f"{uuid4().hex}@example.com"
+    password = "SecurePass!234"
+    _signup(client, email, password)
+    token = _login(client, email, password)
+    first_pet = _create_pet(client, token, name="One")
+    second_pet = _create_pet(client, token, name="Two")
+
+    content = _jpeg_bytes(shade=30)
+    digest = hashlib.sha256(content).hexdigest()
+    key = f"{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+    first = _upload_photo(client, token, first_pet, filename="a.jpg", content=content)
+    second = _upload_photo(client, token, second_pet, filename="b.jpg", content=content)
+    assert first["url"] == second["url"]
+    assert first["url"] == f"{settings.MEDIA_BASE_URL}/{key}"
+
+    media_path = Path(settings.MEDIA_DIR)
+    assert _stored_files(media_path) == [key]
+    with Session(db_module.engine) as session:
+        blob = session.get(MediaBlob, digest)
+        assert blob is not None and blob.ref_count == 2
+
+    response = client.delete(
+        f"/api/v1/photos/{first['id']}", headers=_auth_headers(token)
+    )
+    assert response.status_code == 204, response.text
+    assert (media_path / key).exists()
+
+    response = client.delete(
+        f"/api/v1/photos/{second['id']}", headers=_auth_headers(token)
+    )
+    assert response.status_code == 204, response.text
+    assert not (media_path / key).exists()
+    with Session(db_module.engine) as session:
+        assert session.get(MediaBlob, digest) is None
+
+
+def test_released_file_survives_a_concurrent_reupload(client: TestClient) -> None:
+    from backend.services.photo_service import discard_photo, remove_released_media
+
+    email = f"{uuid4().hex}@example.com"
+    password = "SecurePass!234"
+    _signup(client, email, password)
+    token = _login(client, email, password)
+    pet_id = _create_pet(client, token)
+    content = _jpeg_bytes(shade=40)
+    digest = hashlib.sha256(content).hexdigest()
+    key = f"{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+    first = _upload_photo(client, token, pet_id, filename="a.jpg", content=content)
+
+    with Session(db_module.engine) as session:
+        row = session.get(Photo, first["id"])
+        assert row is not None
+        released = discard_photo(session, row)
+        session.commit()
+        assert released[0] == key
+
+        # The same bytes are uploaded again before the files are removed.
+        second = _upload_photo(client, token, pet_id, filename="b.jpg", content=content)
+        remove_released_media(session, released)
+
+    assert (Path(settings.MEDIA_DIR) / key).exists()
+    with Session(db_module.engine) as session:
+        blob = session.get(MediaBlob, digest)
+        assert blob is not None and blob.ref_count == 1
+
+    response = client.delete(
+        f"/api/v1/photos/{second['id']}", headers=_auth_headers(token)
+    )
+    assert response.status_code == 204, response.text
+    assert not (Path(settings.MEDIA_DIR) / key).exists()
+
+
+def test_direct_upload_presign_put_and_finalize(client: TestClient) -> None:
+    email = f"{uuid4().hex}@example.com"
+    password = "SecurePass!234"
+    _signup(client, email, password)
+    token = _login(client, email, password)
+    pet_id = _create_pet(client, token)
+
+    content = _jpeg_bytes(shade=60)
+    digest = hashlib.sha256(content).hexdigest()
+    key = f"{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+    request = {"content_type": "image/jpeg", "size_bytes": len(content)}
+    response = client.post(
+        f"/api/v1/pets/{pet_id}/photos/uploads",
+        headers=_auth_headers(token),
+        json={**request, "sha256": digest},
+    )
+    assert response.status_code == 200, response.text
+    ticket = response.json()
+    upload = ticket["upload"]
+    assert upload["method"] == "PUT"
+
+    response = client.post(
+        f"/api/v1/pets/{pet_id}/photos/uploads/finalize",
+        headers=_auth_headers(token),
+        json={"upload_token": ticket["upload_token"]},
+    )
+    assert response.status_code == 409, response.text
+
+    response = client.put(upload["url"], content=b"tampered", headers=upload["headers"])
+    assert response.status_code == 400, response.text
+    response = client.put(upload["url"], content=content, headers=upload["headers"])
+    assert response.status_code == 204, response.text
+
+    response = client.post(
+        f"/api/v1/pets/{pet_id}/photos/uploads/finalize",
+        headers=_auth_headers(token),
+        json={"upload_token": ticket["upload_token"]},
+    )
+    assert response.status_code == 201, response.text
+    photo = response.json()
+    assert photo["is_primary"] is True
+    assert photo["url"].endswith(f"/{digest}.jpg")
+    media_path = Path(settings.MEDIA_DIR)
+    assert _stored_files(media_path) == [key]
+
+    # The bytes are stored already, so a second ticket needs no upload.
+    response = client.post(
+        f"/api/v1/pets/{pet_id}/photos/uploads",
+        headers=_auth_headers(token),
+        json={**request, "sha256": digest},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["upload"] is None
+
+    response = client.post(
+        f"/api/v1/pets/{pet_id}/photos/uploads",
+        headers=_auth_headers(token),
+        json={**request, "sha256": "not-a-digest"},
+    )
+    assert response.status_code == 422, response.text
+
+
+def test_s3_presign_pins_checksum_and_length() -> None:
+    pytest.importorskip("boto3")
+    from backend.services.media_storage import S3MediaStorage
+
+    storage = S3MediaStorage(
+        bucket="pets",
+        region="eu-central-1",
+        access_key_id="test",
+        secret_access_key="test",
+    )
+    digest = hashlib.sha256(b"bytes").hexdigest()
+    upload = storage.presign_upload(
+        f"{digest}.jpg", content_type="image/jpeg", size=5, sha256=digest
+    )
+    assert upload.method == "POST"
+    assert upload.fields["key"] == f"{digest}.jpg"
+    assert upload.fields["Content-Type"] == "image/jpeg"
+    assert "x-amz-checksum-sha256" in upload.fields
+    assert storage.url(f"{digest}.jpg") == (
+        f"https://pets.s3.amazonaws.com/{digest}.jpg"
+    )
+
+
+def test_media_files_cache_range_and_offload(tmp_path: Path) -> None:
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+
+    from backend.services.media_files import MediaFiles
+
+    content = bytes(range(256)) * 4
+    digest = hashlib.sha256(content).hexdigest()
+    (tmp_path / f"{digest}.jpg").write_bytes(content)
+    (tmp_path / "legacy.jpg").write_bytes(content)
+
+    served = TestClient(
+        Starlette(routes=[Mount("/media", MediaFiles(directory=tmp_path, offload=""))])
+    )
+    response = served.get(f"/media/{digest}.jpg")
+    assert response.status_code == 200
+    assert response.content == content
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["etag"] == f'"{digest}"'
+
+    response = served.get(
+        f"/media/{digest}.jpg", headers={"If-None-Match": f'"{digest}"'}
+    )
+    assert response.status_code == 304
+    response = served.get("/media/legacy.jpg")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == (
+        f"public, max-age={settings.MEDIA_CACHE_MAX_AGE_SECONDS}"
+    )
+    response = served.get(
+        "/media/legacy.jpg",
+        headers={"If-Modified-Since": response.headers["last-modified"]},
+    )
+    assert response.status_code == 304
+
+    response = served.get(f"/media/{digest}.jpg", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == content[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(content)}"
+
+    offloaded = TestClient(
+        Starlette(
+            routes=[
+                Mount(
+                    "/media",
+                    MediaFiles(
+                        directory=tmp_path,
+                        offload="x-accel-redirect",
+                        offload_prefix="/internal/",
+                    ),
+                )
+            ]
+        )
+    )
+    response = offloaded.get(f"/media/{digest}.jpg")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"] == f"/internal/{digest}.jpg"
+    assert response.headers["etag"] == f'"{digest}"'
+    assert response.headers["content-type"] == "image/jpeg"
+
+
+def test_shard_media_layout_moves_flat_files(client: TestClient) -> None:
+    from backend.services.media_layout import shard_media_layout
+
+    email = f"{uuid4().hex}@example.com"
+    password = "SecurePass!234"
+    _signup(client, email, password)
+    token = _login(client, email, password)
+    pet_id = _create_pet(client, token)
+
+    media_path = Path(settings.MEDIA_DIR)
+    media_path.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256(b"shared").hexdigest()
+    (media_path / f"{digest}.jpg").write_bytes(b"shared")
+    (media_path / f"{digest}_200.webp").write_bytes(b"small")
+    (media_path / "legacy-upload.png").write_bytes(b"legacy")
+    with Session(db_module.engine) as session:
+        session.add(
+            MediaBlob(
+                sha256=digest,
+                filename=f"{digest}.jpg",
+                mime_type="image/jpeg",
+                size_bytes=6,
+                ref_count=2,
+            )
+        )
+        for _ in range(2):
+            session.add(
+                Photo(
+                    pet_id=pet_id,
+                    filename=f"{digest}.jpg",
+                    mime_type="image/jpeg",
+                    size_bytes=6,
+                    sha256=digest,
+                    url=f"/media/{digest}.jpg",
+                    derivatives={"200": f"{digest}_200.webp"},
+                )
+            )
+        session.add(
+            Photo(
+                pet_id=pet_id,
+                filename="legacy-upload.png",
+                mime_type="image/png",
+                size_bytes=6,
+                url="/media/legacy-upload.png",
+            )
+        )
+        session.commit()
+
+    progress: list[tuple[int, int]] = []
+    with Session(db_module.engine) as session:
+        moved = shard_media_layout(
+            session, batch_size=2, on_batch=lambda *args: progress.append(args)
+        )
+    assert moved == 2
+    assert len(progress) == 2
+
+    key = f"{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+    legacy_prefix = hashlib.sha256(b"legacy-upload.png").hexdigest()
+    legacy_key = f"{legacy_prefix[:2]}/{legacy_prefix[2:4]}/legacy-upload.png"
+    assert _stored_files(media_path) == sorted(
+        [key, key.replace(".jpg", "_200.webp"), legacy_key]
+    )
+    with Session(db_module.engine) as session:
+        photos = session.exec(select(Photo).order_by(col(Photo.id))).all()
+        assert [photo.filename for photo in photos] == [key, key, legacy_key]
+        assert photos[0].url == f"{settings.MEDIA_BASE_URL}/{key}"
+        assert photos[1].derivatives == {"200": key.replace(".jpg", "_200.webp")}
+        blob = session.get(MediaBlob, digest)
+        assert blob is not None and blob.filename == key
+
+        # Nothing is left to move, so a rerun is a no-op.
+        assert shard_media_layout(session) == 0
+
+
+def test_upload_sniffs_type_and_dimensions(client: TestClient) -> None:
+    email = f"{uuid4().hex}@example.com"
+    password = "SecurePass!234"
+    _signup(client, email, password)
+    token = _login(client, email, password)
+    pet_id = _create_pet(client, token)
+
+    # Declared as JPEG, actually a PNG: the bytes win.
+    photo = _upload_photo(
+        client, token, pet_id, filename="cat.jpg", content=_png_bytes(40, 30)
+    )
+    assert photo["mime_type"] == "image/png"
+    assert (photo["width"], photo["height"]) == (40, 30)
+    assert photo["url"].endswith(".png")
+
+    not_image = client.post(
+        f"/api/v1/pets/{pet_id}/photos",
+        headers=_auth_headers(token),
+        files={"file": ("fake.jpg", b"\xff\xd8\xff\xdb\x00", "image/jpeg")},
+    )
+    assert not_image.status_code == 400, not_image.text
+
+    header = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x01\x00\x00\x00\x01\x00\x00"
+    bomb = client.post(
+        f"/api/v1/pets/{pet_id}/photos",
+        headers=_auth_headers(token),
+        files={"file": ("bomb.png", header + b"\x00" * 1024, "image/png")},
+    )
+    assert bomb.status_code == 422, bomb.text
+    assert _stored_files(Path(settings.MEDIA_DIR)) == [
+        photo["url"].removeprefix(f"{settings.MEDIA_BASE_URL}/")
+    ]
+
+
+def test_batch_upload_adds_all_photos_in_one_go(client: TestClient) -> None:
+    email = f"{uuid4().hex}@example.com"
+    password = "SecurePass!234"
+    _signup(client, email, password)
+    token = _login(client, email, password)
+    pet_id = _create_pet(client, token)
+
+    duplicate = _jpeg_bytes(shade=90)
+    response = client.post(
+        f"/api/v1/pets/{pet_id}/photos/batch",
+        headers=_auth_headers(token),
+        files=[
+            ("files", ("a.jpg", _jpeg_bytes(shade=10), "image/jpeg")),
+            ("files", ("b.png", _png_bytes(20, 10), "image/png")),
+            ("files", ("c.jpg", duplicate, "image/jpeg")),
+            ("files", ("d.jpg", duplicate, "image/jpeg")),
+        ],
+    )
+    assert response.status_code == 201, response.text
+    photos = cast(list[dict[str, Any]], response.json())
+    assert [photo["is_primary"] for photo in photos] == [True, False, False, False]
+    assert photos[2]["url"] == photos[3]["url"]
+    media_path = Path(settings.MEDIA_DIR)
+    assert len(_stored_files(media_path)) == 3
+    with Session(db_module.engine) as session:
+        blob = session.get(MediaBlob, hashlib.sha256(duplicate).hexdigest())
+        assert blob is not None and blob.ref_count == 2
+
+    # One bad file rejects the whole batch.
+    response = client.post(
+        f"/api/v1/pets/{pet_id}/photos/batch",
+        headers=_auth_headers(token),
+        files=[
+            ("files", ("e.jpg", _jpeg_bytes(shade=200), "image/jpeg")),
+            ("files", ("f.txt", b"hello", "text/plain")),
+        ],
+    )
+    assert response.status_code == 400, response.text
+    listed = client.get(f"/api/v1/pets/{pet_id}/photos", headers=_auth_headers(token))
+    assert listed.headers["X-Total-Count"] == "4"
+    assert len(_stored_files(media_path)) == 3
+
+    too_many = client.post(
+        f"/api/v1/pets/{pet_id}/photos/batch",
+        headers=_auth_headers(token),
+        files=[
+            ("files", (f"{idx}.jpg", _jpeg_bytes(), "image/jpeg"))
+            for idx in range(settings.PHOTO_MAX_FILES_PER_REQUEST + 1)
+        ],
+    )
+    assert too_many.status_code == 400, too_many.text
+
+
+def test_reconcile_media_reports_and_deletes(client: TestClient) -> None:
+    from backend.services.media_reconciler import reconcile_media
+
+    email = f"{uuid4().hex}@example.com"
+    password = "SecurePass!234"
+    _signup(client, email, password)
+    token = _login(client, email, password)
+    pet_id = _create_pet(client, token)
+    kept = _upload_photo(
+        client, token, pet_id, filename="kept.jpg", content=_jpeg_bytes(shade=1)
+    )
+    lost = _upload_photo(
+        client, token, pet_id, filename="lost.jpg", content=_jpeg_bytes(shade=2)
+    )
+
+    media_path = Path(settings.MEDIA_DIR)
+    kept_key = kept["url"].removeprefix(f"{settings.MEDIA_BASE_URL}/")
+    lost_key = lost["url"].removeprefix(f"{settings.MEDIA_BASE_URL}/")
+    (media_path / lost_key).unlink()
+    stray_key = f"{kept_key.rsplit('/', 1)[0]}/{'f' * 64}.jpg"
+    (media_path / stray_key).write_bytes(b"stray")
+    (media_path / ".upload-crashed.part").write_bytes(b"partial")
+    (media_path / "legacy-orphan.jpg").write_bytes(b"old")
+    # A derivative of a live photo is not an orphan.
+    derivative_key = kept_key.replace(".jpg", "_200.webp")
+    (media_path / derivative_key).write_bytes(b"small")
+    with Session(db_module.engine) as session:
+        photo = session.get(Photo, kept["id"])
+        assert photo is not None
+        photo.derivatives = {"200": derivative_key}
+        session.add(photo)
+        session.commit()
+
+    findings: list[tuple[str, str]] = []
+    with Session(db_module.engine) as session:
+        report = reconcile_media(
+            session,
+            batch_size=2,
+            grace_seconds=0,
+            on_finding=lambda *finding: findings.append(finding),
+        )
+    assert sorted(findings) == sorted(
+        [
+            ("orphan-file", stray_key),
+            ("orphan-file", ".upload-crashed.part"),
+            ("orphan-file", "legacy-orphan.jpg"),
+            ("dangling-row", f"{lost['id']}:{lost_key}"),
+        ]
+    )
+    assert report.files_scanned == 5
+    assert report.last_id == lost["id"]
+    assert len(_stored_files(media_path)) == 5
+
+    with Session(db_module.engine) as session:
+        # Recent files and rows are left alone: uploads may be in flight.
+        recent = reconcile_media(session)
+        assert (recent.orphan_files, recent.dangling_rows) == (0, 0)
+        report = reconcile_media(session, delete=True, grace_seconds=0)
+    assert (report.orphan_files, report.dangling_rows) == (3, 1)
+    assert _stored_files(media_path) == sorted([kept_key, derivative_key])
+    listed = client.get(f"/api/v1/pets/{pet_id}/photos", headers=_auth_headers(token))
+    assert [photo["id"] for photo in listed.json()] == [kept["id"]]
+
+
+def test_reconcile_media_rechecks_rows_before_deleting(client: TestClient) -> None:
+    from backend.services.media_reconciler import reconcile_media
+
+    email = f"{uuid4().hex}@example.com"
+    password = "SecurePass!234"
+    _signup(client, email, password)
+    token = _login(client, email, password)
+    pet_id = _create_pet(client, token)
+    photo = _upload_photo(
+        client, token, pet_id, filename="late.jpg", content=_jpeg_bytes(shade=3)
+    )
+    stored = Path(settings.MEDIA_DIR) / photo["url"].removeprefix(
+        f"{settings.MEDIA_BASE_URL}/"
+    )
+    content = stored.read_bytes()
+    stored.unlink()
+
+    def store_late(kind: str, key: str) -> None:
+        # The upload's file lands between the check and the delete.
+        stored.write_bytes(content)
+
+    with Session(db_module.engine) as session:
+        report = reconcile_media(
+            session, delete=True, grace_seconds=0, on_finding=store_late
+        )
+    assert report.dangling_rows == 1
+    listed = client.get(f"/api/v1/pets/{pet_id}/photos", headers=_auth_headers(token))
+    assert [item["id"] for item in listed.json()] == [photo["id"]]
+
+
+def test_single_primary_enforced_and_switched_in_place(client: TestClient) -> None:
+    from sqlalchemy.exc import IntegrityError
+
+    email = f"{uuid4().hex}@example.com"
+    password = "SecurePass!234"
+    _signup(client, email, password)
+    token = _login(client, email, password)
+    pet_id = _create_pet(client, token)
+    first, second, third = (
+        _upload_photo(
+            client,
+            token,
+            pet_id,
+            filename=f"{shade}.jpg",
+            content=_jpeg_bytes(shade=shade),
+        )
+        for shade in (5, 6, 7)
+    )
+
+    # Both directions: a newer photo and then an older one than the primary.
+    for photo in (third, second, first):
+        response = client.post(
+            f"/api/v1/photos/{photo['id']}/primary", headers=_auth_headers(token)
+        )
+        assert response.status_code == 200, response.text
+        listed = client.get(
+            f"/api/v1/pets/{pet_id}/photos", headers=_auth_headers(token)
+        )
+        primaries = [item["id"] for item in listed.json() if item["is_primary"]]
+        assert primaries == [photo["id"]]
+
+    with Session(db_module.engine) as session:
+        row = session.get(Photo, second["id"])
+        assert row is not None
+        row.is_primary = True
+        session.add(row)
+        with pytest.raises(IntegrityError):
+            session.commit()
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections.abc import Iterator
+from typing import cast
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+from starlette.websockets import WebSocketDisconnect
+
+import backend.core.db as db_module
+from backend.main import app
+from backend.models.user import User
+
+TEST_DB_FILENAME = "test_realtime.db"
+TEST_DB_URL = f"sqlite:///./{TEST_DB_FILENAME}"
+
+
+def _signup_login(client: TestClient, email: str, password: str) -> str:
+    response = client.post(
+        "/api/v1/auth/signup",
+        json={"email": email, "password": password},
+    )
+    assert response.status_code == 200, response.text
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": email, "password": password},
+    )
+    assert response.status_code == 200, response.text
+    return cast(str, response.json()["access_token"])
+
+
+def _auth_headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _create_pet(client: TestClient, token: str, *, name: str) -> int:
+    response = client.post(
+        "/api/v1/pets",
+        headers=_auth_headers(token),
+        json={"name": name, "species": "cat", "gender": "male"},
+    )
+    assert response.status_code == 200, response.text
+    return int(response.json()["id"])
+
+
+def _get_user_id(email: str) -> int:
+    with Session(db_module.engine) as session:
+        user_id = session.exec(select(User.id).where(User.email == email)).first()
+        assert user_id is not None
+        return int(user_id)
+
+
+@pytest.fixture(scope="module")
+def client() -> Iterator[TestClient]:
+    previous_db_url = os.environ.get("DATABASE_URL")
+    os.environ["DATABASE_URL"] = TEST_DB_URL
+    original_engine = db_module.engine
+    test_engine = create_engine(
+        TEST_DB_URL,
+        connect_args={"check_same_thread": False},
+    )
+    db_module.engine = test_engine
+
+    def override_get_session() -> Iterator[Session]:
+        with Session(test_engine) as session:
+            yield session
+
+    app.dependency_overrides[db_module.get_session] = override_get_session
+    SQLModel.metadata.drop_all(test_engine)
+    SQLModel.metadata.create_all(test_engine)
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+    app.dependency_overrides.pop(db_module.get_session, None)
+    SQLModel.metadata.drop_all(test_engine)
+    test_engine.dispose()
+    if previous_db_url is not None:
+        os.environ["DATABASE_URL"] = previous_db_url
+    else:
+        os.environ.pop("DATABASE_URL", None)
+    db_module.engine = original_engine
+    if os.path.exists(TEST_DB_FILENAME):
+        os.remove(TEST_DB_FILENAME)
+
+
+def _make_pair(client: TestClient, token_a: str, token_b: str) -> int:
+    pet_a = _create_pet(client, token_a, name="Ws-A")
+    pet_b = _create_pet(client, token_b, name="Ws-B")
+    for token, pet_id in ((token_a, pet_b), (token_b, pet_a)):
+        response = client.post(
+            f"/api/v1/matches/{pet_id}/decision",
+            headers=_auth_headers(token),
+            json={"decision": "liked"},
+        )
+        assert response.status_code == 200, response.text
+    response = client.get("/api/v1/pairs", headers=_auth_headers(token_a))
+    return int(response.json()[0]["id"])
+
+
+def test_websocket_receives_pair_messages(client: TestClient) -> None:
+    password = "Aa!123456"
+    email_a = f"a_{uuid4().hex[:8]}@example.com"
+    email_b = f"b_{uuid4().hex[:8]}@example.com"
+    token_a = _signup_login(client, email_a, password)
+    token_b = _signup_login(client, email_b, password)
+    pair_id = _make_pair(client, token_a, token_b)
+
+    with client.websocket_connect(f"/api/v1/ws?token={token_a}") as websocket:
+        response = client.post(
+            "/api/v1/messages",
+            headers=_auth_headers(token_b),
+            json={"pair_id": pair_id, "body": "pushed"},
+        )
+        assert response.status_code == 200, response.text
+
+        event = websocket.receive_json()
+        assert event["type"] == "message"
+        assert event["message"]["id"] == response.json()["id"]
+        assert event["message"]["pair_id"] == pair_id
+        assert event["message"]["sender_user_id"] == _get_user_id(email_b)
+        assert event["message"]["body"] == "pushed"
+
+    with client.websocket_connect(
+        "/api/v1/ws", headers=_auth_headers(token_b)
+    ) as websocket:
+        client.post(
+            "/api/v1/messages",
+            headers=_auth_headers(token_a),
+            json={"pair_id": pair_id, "body": "back"},
+        )
+        assert websocket.receive_json()["message"]["body"] == "back"
+
+
+def test_websocket_rejects_invalid_token(client: TestClient) -> None:
+    with (
+        pytest.raises(WebSocketDisconnect) as exc_info,
+        client.websocket_connect("/api/v1/ws?token=not-a-token"),
+    ):
+        pass
+    assert exc_info.value.code == 1008
+
+
+def test_long_poll_returns_new_messages(client: TestClient) -> None:
+    password = "Aa!123456"
+    token_a = _signup_login(client, f"a_{uuid4().hex[:8]}@example.com", password)
+    token_b = _signup_login(client, f"b_{uuid4().hex[:8]}@example.com", password)
+    pair_id = _make_pair(client, token_a, token_b)
+
+    first = client.post(
+        "/api/v1/messages",
+        headers=_auth_headers(token_b),
+        json={"pair_id": pair_id, "body": "first"},
+    )
+    assert first.status_code == 200, first.text
+    first_id = first.json()["id"]
+
+    started = time.monotonic()
+    response = client.get(
+        "/api/v1/messages",
+        headers=_auth_headers(token_a),
+        params={"pair_id": pair_id, "after_id": 0, "wait": 25},
+    )
+    assert response.status_code == 200, response.text
+    assert [m["body"] for m in response.json()] == ["first"]
+    assert time.monotonic() - started < 5
+
+    response = client.get(
+        "/api/v1/messages",
+        headers=_auth_headers(token_a),
+        params={"pair_id": pair_id, "after_id": first_id, "wait": 1},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json() == []
+
+    def send_later() -> None:
+        time.sleep(0.3)
+        client.post(
+            "/api/v1/messages",
+            headers=_auth_headers(token_b),
+            json={"pair_id": pair_id, "body": "second"},
+        )
+
+    sender = threading.Thread(target=send_later)
+    started = time.monotonic()
+    sender.start()
+    response = client.get(
+        "/api/v1/messages",
+        headers=_auth_headers(token_a),
+        params={"pair_id": pair_id, "after_id": first_id, "wait": 20},
+    )
+    sender.join()
+    assert response.status_code == 200, response.text
+    assert [m["body"] for m in response.json()] == ["second"]
+    assert time.monotonic() - started < 10
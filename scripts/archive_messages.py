@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+from sqlmodel import Session
+
+# --- make project root importable even if CWD is different ---
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.core.db import engine  # type: ignore
+from backend.services.message_archive_service import (  # type: ignore
+    archive_cold_messages,
+)
+
+
+def run() -> None:
+    with Session(engine) as session:
+        moved = archive_cold_messages(session)
+    print(f"[archive] cold messages moved to message_archive. moved={moved}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+from sqlmodel import Session
+
+# --- make project root importable even if CWD is different ---
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.core.db import engine  # type: ignore
+from backend.services.pair_service import rebuild_like_edges  # type: ignore
+
+
+def run() -> None:
+    with Session(engine) as session:
+        total = rebuild_like_edges(session)
+    print(f"[backfill] like_edge rebuilt. edges={total}")
+
+
+if __name__ == "__main__":
+    run()
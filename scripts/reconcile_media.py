@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from sqlmodel import Session
+
+# --- make project root importable even if CWD is different ---
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.core.db import engine  # type: ignore
+from backend.services.media_reconciler import reconcile_media  # type: ignore
+
+
+def _report(kind: str, key: str) -> None:
+    print(f"[media] {kind} {key}")
+
+
+def run(delete: bool, after_key: str | None, after_id: int) -> None:
+    with Session(engine) as session:
+        report = reconcile_media(
+            session,
+            delete=delete,
+            after_key=after_key,
+            after_id=after_id,
+            on_finding=_report,
+        )
+    action = "deleted" if delete else "found"
+    print(
+        f"[media] reconcile done. orphan_files_{action}={report.orphan_files} "
+        f"dangling_rows_{action}={report.dangling_rows} "
+        f"files={report.files_scanned} rows={report.rows_scanned}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Report (or --delete) orphan media files and dangling photos."
+    )
+    parser.add_argument("--delete", action="store_true")
+    parser.add_argument("--after-key", default=None)
+    parser.add_argument("--after-id", type=int, default=0)
+    args = parser.parse_args()
+    run(args.delete, args.after_key, args.after_id)
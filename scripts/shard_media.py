@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from sqlmodel import Session
+
+# --- make project root importable even if CWD is different ---
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.core.db import engine  # type: ignore
+from backend.services.media_layout import shard_media_layout  # type: ignore
+
+
+def _report(last_id: int, moved: int) -> None:
+    print(f"[shard] batch done. moved={moved} resume_with=--after-id {last_id}")
+
+
+def run(after_id: int, batch_size: int | None) -> None:
+    with Session(engine) as session:
+        moved = shard_media_layout(
+            session, after_id=after_id, batch_size=batch_size, on_batch=_report
+        )
+    print(f"[shard] media moved to the ab/cd/<name> layout. moved={moved}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Move flat media files to ab/cd/<name>."
+    )
+    parser.add_argument("--after-id", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+    run(args.after_id, args.batch_size)